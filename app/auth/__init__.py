@@ -1,6 +1,6 @@
 from app.auth.jwt import create_access_token, decode_access_token
 from app.auth.password import hash_password, verify_password
-from app.auth.dependencies import get_current_user, get_user_folder, get_user_file
+from app.auth.dependencies import get_admin_user, get_current_user, get_user_folder, get_user_file
 
 __all__ = [
     "create_access_token",
@@ -8,6 +8,7 @@ __all__ = [
     "hash_password",
     "verify_password",
     "get_current_user",
+    "get_admin_user",
     "get_user_folder",
     "get_user_file",
 ]
@@ -1,17 +1,22 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from app import queries
 from app.auth.jwt import decode_access_token
+from app.config import ADMIN_EMAILS
 from app.database import get_db
+from app.profiling import span
+from app.records import FileRecord, FolderRecord, UserRecord, fetch_one
 
 security = HTTPBearer()
 
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> dict:
+) -> UserRecord:
     token = credentials.credentials
-    user_id = decode_access_token(token)
+    with span("auth.jwt_decode"):
+        user_id = decode_access_token(token)
     
     if user_id is None:
         raise HTTPException(
@@ -19,69 +24,84 @@ def get_current_user(
             detail="Invalid or expired token",
         )
     
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, email FROM users WHERE id = ?", (user_id,))
-        row = cursor.fetchone()
+    with span("auth.user_lookup"), get_db() as conn:
+        user = fetch_one(
+            conn,
+            UserRecord,
+            queries.USER_BY_ID,
+            (user_id,),
+        )
         
-        if row is None:
+        if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found",
             )
         
-        return {"id": row["id"], "email": row["email"]}
+        return user
+
+
+def is_admin(user: UserRecord) -> bool:
+    return user.email.lower() in ADMIN_EMAILS
+
+
+def is_admin_token(token: str) -> bool:
+    """Whether ``token`` is a valid access token of an admin, outside any route."""
+    user_id = decode_access_token(token)
+    if user_id is None:
+        return False
+    with get_db() as conn:
+        user = fetch_one(conn, UserRecord, queries.USER_BY_ID, (user_id,))
+    return user is not None and is_admin(user)
+
+
+def get_admin_user(current_user: UserRecord = Depends(get_current_user)) -> UserRecord:
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    
+    return current_user
 
 
 def get_user_folder(
     folder_id: int,
-    current_user: dict = Depends(get_current_user),
-) -> dict:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, name, parent_folder_id, created_at FROM folders WHERE id = ? AND user_id = ?",
-            (folder_id, current_user["id"]),
+    current_user: UserRecord = Depends(get_current_user),
+) -> FolderRecord:
+    with span("auth.folder_lookup"), get_db() as conn:
+        folder = fetch_one(
+            conn,
+            FolderRecord,
+            queries.FOLDER_FOR_USER,
+            (folder_id, current_user.id),
         )
-        row = cursor.fetchone()
         
-        if row is None:
+        if folder is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Folder not found",
             )
         
-        return {
-            "id": row["id"],
-            "name": row["name"],
-            "parent_folder_id": row["parent_folder_id"],
-            "created_at": row["created_at"],
-        }
+        return folder
 
 
 def get_user_file(
     file_id: int,
-    current_user: dict = Depends(get_current_user),
-) -> dict:
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, name, size, mime_type, parent_folder_id, created_at FROM files WHERE id = ? AND user_id = ?",
-            (file_id, current_user["id"]),
+    current_user: UserRecord = Depends(get_current_user),
+) -> FileRecord:
+    with span("auth.file_lookup"), get_db() as conn:
+        file = fetch_one(
+            conn,
+            FileRecord,
+            queries.FILE_FOR_USER,
+            (file_id, current_user.id),
         )
-        row = cursor.fetchone()
         
-        if row is None:
+        if file is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="File not found",
             )
         
-        return {
-            "id": row["id"],
-            "name": row["name"],
-            "size": row["size"],
-            "mime_type": row["mime_type"],
-            "parent_folder_id": row["parent_folder_id"],
-            "created_at": row["created_at"],
-        }
+        return file
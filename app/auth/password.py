@@ -1,7 +1,9 @@
-import bcrypt
+# bcrypt is imported on first use: only login and registration need it.
 
 
 def hash_password(password: str) -> str:
+    import bcrypt
+    
     password_bytes = password.encode("utf-8")
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password_bytes, salt)
@@ -9,6 +11,8 @@ def hash_password(password: str) -> str:
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    import bcrypt
+    
     password_bytes = plain_password.encode("utf-8")
     hashed_bytes = hashed_password.encode("utf-8")
     return bcrypt.checkpw(password_bytes, hashed_bytes)
@@ -0,0 +1,225 @@
+"""
+Content-defined chunking and the shared chunk store.
+
+Content is cut where the data itself says so rather than at fixed offsets,
+so an edit only changes the chunks around it and every other chunk keeps
+its hash. ``cut_points`` finds candidates at C speed: each byte is mapped
+to one bit with ``bytes.translate``, and ``bytes.find`` looks for a fixed
+8-bit anchor in that bit string (about one candidate per 256 bytes). A
+candidate becomes a cut when the CRC-32 of the ``WINDOW`` bytes before it
+has its low bits clear. Both tests look only at the bytes just before the
+cut, so inserted or deleted data moves the cuts along with it. A
+per-byte rolling hash written in Python measured about 25 times slower.
+
+Chunks are stored once, as blobs named by their SHA-256, with a reference
+count in the ``chunks`` table. Two rules keep concurrent writers and the
+collector safe:
+
+- A row with ``refcount > 0`` has its blob on disk: ``acquire`` only raises
+  a count from zero in a transaction that also makes sure the blob exists.
+- A blob is only unlinked by ``collect``, inside the write transaction
+  that deletes its zero-count row, so no writer can take a reference to it
+  in between.
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+from app import queries
+from app.config import CHUNK_AVG_SIZE, CHUNK_COLLECT_BATCH, CHUNK_MAX_SIZE, CHUNK_MIN_SIZE, DEDUP_METRICS_TTL
+from app.database import get_db
+from app.jobs import enqueue, job_handler
+from app.metrics import REGISTRY
+from app.storage import BlobStore, blob_store
+
+# Fixed forever: changing any of these moves every cut point.
+BIT_TABLE = bytes(hashlib.sha256(bytes([b])).digest()[0] & 1 for b in range(256))
+ANCHOR = b"\x01\x00\x01\x01\x00\x00\x01\x00"
+WINDOW = 48
+
+# SQLite's default limit on bound parameters is well above this.
+LOOKUP_BATCH = 500
+
+
+class Chunk(NamedTuple):
+    hash: str
+    data: bytes
+
+
+def cut_points(
+    data: bytes,
+    min_size: int = CHUNK_MIN_SIZE,
+    avg_size: int = CHUNK_AVG_SIZE,
+    max_size: int = CHUNK_MAX_SIZE,
+) -> List[int]:
+    """End offsets of the chunks of ``data``; the last one is ``len(data)``."""
+    min_size = max(min_size, WINDOW)
+    # Candidates come every 2**len(ANCHOR) bytes on average; keep about one
+    # in 2**k of them so chunks average avg_size including the skipped minimum.
+    spacing = (avg_size - min_size) / 2 ** len(ANCHOR)
+    mask = (1 << max(round(math.log2(spacing)), 0)) - 1 if spacing > 1 else 0
+
+    bits = data.translate(BIT_TABLE)
+    view = memoryview(data)
+    cuts = []
+    start = 0
+    while start < len(data):
+        limit = min(start + max_size, len(data))
+        cut = limit
+        if limit - start > min_size:
+            position = start + min_size - len(ANCHOR)
+            while (position := bits.find(ANCHOR, position, limit)) >= 0:
+                end = position + len(ANCHOR)
+                if not zlib.crc32(view[end - WINDOW:end]) & mask:
+                    cut = end
+                    break
+                position += 1
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+def split(data: bytes) -> List[Chunk]:
+    chunks = []
+    start = 0
+    for end in cut_points(data):
+        piece = data[start:end]
+        chunks.append(Chunk(hashlib.sha256(piece).hexdigest(), piece))
+        start = end
+    return chunks
+
+
+def store(chunks: Sequence[Chunk], blobs: BlobStore = blob_store) -> List[Chunk]:
+    """Write the blobs of chunks that are not stored yet; returns those written.
+
+    Runs before the caller's transaction, so the write lock is not held
+    for the disk I/O. The caller passes the result to ``abandon`` if its
+    transaction fails.
+    """
+    unique = {chunk.hash: chunk for chunk in chunks}
+    live = set()
+    hashes = list(unique)
+    with get_db() as conn:
+        for i in range(0, len(hashes), LOOKUP_BATCH):
+            batch = json.dumps(hashes[i:i + LOOKUP_BATCH])
+            live.update(row["hash"] for row in conn.execute(queries.LIVE_CHUNKS, (batch,)).fetchall())
+
+    written = []
+    for chunk in unique.values():
+        if chunk.hash not in live and not os.path.exists(blobs.path(chunk.hash)):
+            blobs.write(chunk.hash, chunk.data)
+            written.append(chunk)
+    return written
+
+
+def acquire(
+    cursor,
+    references: Iterable[tuple],
+    data: Optional[Mapping[str, bytes]] = None,
+    blobs: BlobStore = blob_store,
+) -> None:
+    """Take one reference per ``(hash, size)`` pair, in the caller's transaction.
+
+    A chunk whose count rises from zero may have been collected since
+    ``store`` looked; its blob is rewritten from ``data`` if it is missing.
+    """
+    counts: Dict[str, int] = Counter()
+    sizes: Dict[str, int] = {}
+    for chunk_hash, size in references:
+        counts[chunk_hash] += 1
+        sizes[chunk_hash] = size
+
+    for chunk_hash, count in counts.items():
+        refcount = cursor.execute(queries.ACQUIRE_CHUNK, (chunk_hash, sizes[chunk_hash], count)).fetchone()[0]
+        if refcount == count and not os.path.exists(blobs.path(chunk_hash)):
+            if data is None or chunk_hash not in data:
+                raise RuntimeError(f"Chunk {chunk_hash} is missing and its content is not available")
+            blobs.write(chunk_hash, data[chunk_hash])
+
+
+def release(cursor, hashes: Iterable[str]) -> None:
+    """Drop one reference per hash, in the caller's transaction.
+
+    Chunks left unreferenced are removed by the ``chunks.collect`` job,
+    which this queues.
+    """
+    counts = Counter(hashes)
+    if not counts:
+        return
+    cursor.executemany(queries.RELEASE_CHUNK, ((count, chunk_hash) for chunk_hash, count in counts.items()))
+    enqueue(cursor, "chunks.collect", {})
+
+
+def abandon(chunks: Sequence[Chunk]) -> None:
+    """Record blobs written for a failed upload so ``collect`` removes them."""
+    if not chunks:
+        return
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(queries.ABANDON_CHUNK, ((chunk.hash, len(chunk.data)) for chunk in chunks))
+        enqueue(cursor, "chunks.collect", {})
+
+
+def collect(limit: int = CHUNK_COLLECT_BATCH, blobs: BlobStore = blob_store) -> int:
+    """Remove up to ``limit`` unreferenced chunks; returns how many."""
+    with get_db() as conn:
+        rows = conn.execute(queries.COLLECT_CHUNKS, (limit,)).fetchall()
+        # Before the commit, while the delete still holds the write lock.
+        for row in rows:
+            blobs.delete(row["hash"])
+    return len(rows)
+
+
+@job_handler("chunks.collect")
+def collect_chunks(payload: dict) -> None:
+    while collect():
+        pass
+
+
+def dedup_report() -> dict:
+    """Logical bytes against stored bytes, for the admin API and metrics."""
+    with get_db() as conn:
+        stats = dict(conn.execute(queries.DEDUP_STATS).fetchone())
+    stats["logical_bytes"] = stats["file_bytes"] + stats["history_bytes"]
+    stats["stored_bytes"] = stats["chunk_bytes"] + stats["blob_bytes"] + stats["inline_bytes"]
+    stats["dedup_ratio"] = stats["logical_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 1.0
+    return stats
+
+
+_report_cache = (0.0, None)
+
+
+def collect_metrics() -> List[str]:
+    # The report scans the files table, so scrapes reuse it for a while.
+    global _report_cache
+    taken, report = _report_cache
+    if report is None or time.monotonic() - taken > DEDUP_METRICS_TTL:
+        try:
+            report = dedup_report()
+        except sqlite3.Error:
+            return []
+        _report_cache = (time.monotonic(), report)
+    return [
+        "# HELP storage_logical_bytes Bytes of current file content and retained revisions",
+        "# TYPE storage_logical_bytes gauge",
+        f"storage_logical_bytes {report['logical_bytes']}",
+        "# HELP storage_stored_bytes Bytes held in chunks, whole-file blobs and inline rows",
+        "# TYPE storage_stored_bytes gauge",
+        f"storage_stored_bytes {report['stored_bytes']}",
+        "# HELP storage_chunks Chunks referenced by at least one revision",
+        "# TYPE storage_chunks gauge",
+        f"storage_chunks {report['chunks']}",
+        "# HELP storage_dedup_ratio Logical bytes per stored byte",
+        "# TYPE storage_dedup_ratio gauge",
+        f"storage_dedup_ratio {report['dedup_ratio']:.4f}",
+    ]
+
+
+REGISTRY.register_collector(collect_metrics)
@@ -1,5 +1,8 @@
 import os
 
+DATABASE_PATH = os.getenv("DATABASE_PATH", "app.db")
+MIGRATION_LOCK_TIMEOUT = float(os.getenv("MIGRATION_LOCK_TIMEOUT", "300"))
+
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -7,3 +10,72 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
 RATE_LIMIT = os.getenv("RATE_LIMIT", "100/minute")
+LOGIN_RATE_LIMIT = os.getenv("LOGIN_RATE_LIMIT", "10/minute")
+UPLOAD_RATE_LIMIT = os.getenv("UPLOAD_RATE_LIMIT", "30/minute")
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "sqlite")
+RATE_LIMIT_DATABASE_PATH = os.getenv("RATE_LIMIT_DATABASE_PATH", "ratelimit.db")
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "local")
+EVENT_DATABASE_PATH = os.getenv("EVENT_DATABASE_PATH", "events.db")
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.05"))
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", str(256 * 1024)))
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SQLITE_CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+
+ADMIN_EMAILS = [e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
+
+BLOB_STORAGE_PATH = os.getenv("BLOB_STORAGE_PATH", "blobs")
+BLOB_CHUNK_SIZE = int(os.getenv("BLOB_CHUNK_SIZE", str(256 * 1024)))
+
+# Content-defined chunking of file content. Changing the sizes only
+# makes new chunks dedupe less with old ones; it never breaks stored data.
+CHUNK_MIN_SIZE = int(os.getenv("CHUNK_MIN_SIZE", str(16 * 1024)))
+CHUNK_AVG_SIZE = int(os.getenv("CHUNK_AVG_SIZE", str(64 * 1024)))
+CHUNK_MAX_SIZE = int(os.getenv("CHUNK_MAX_SIZE", str(256 * 1024)))
+CHUNK_COLLECT_BATCH = int(os.getenv("CHUNK_COLLECT_BATCH", "500"))
+# Seconds /metrics reuses the dedup report, which scans the files table.
+DEDUP_METRICS_TTL = float(os.getenv("DEDUP_METRICS_TTL", "60"))
+
+REVISION_KEEP = int(os.getenv("REVISION_KEEP", "10"))
+REVISION_MAX_AGE_DAYS = float(os.getenv("REVISION_MAX_AGE_DAYS", "30"))
+
+# Trashed items can be restored for this long before they are purged.
+TRASH_RETENTION_DAYS = float(os.getenv("TRASH_RETENTION_DAYS", "30"))
+TRASH_PURGE_BATCH = int(os.getenv("TRASH_PURGE_BATCH", "200"))
+
+DOWNLOAD_CACHE_BYTES = int(os.getenv("DOWNLOAD_CACHE_BYTES", str(32 * 1024 * 1024)))
+DOWNLOAD_CACHE_MAX_FILE_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_FILE_BYTES", str(256 * 1024)))
+
+THUMBNAIL_SIZES = tuple(int(s) for s in os.getenv("THUMBNAIL_SIZES", "64,128,256").split(","))
+THUMBNAIL_CACHE_PATH = os.getenv("THUMBNAIL_CACHE_PATH", "thumbnails")
+THUMBNAIL_CACHE_BYTES = int(os.getenv("THUMBNAIL_CACHE_BYTES", str(256 * 1024 * 1024)))
+THUMBNAIL_RENDER_TIMEOUT = float(os.getenv("THUMBNAIL_RENDER_TIMEOUT", "10"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_MAX_SOURCE_BYTES = int(os.getenv("THUMBNAIL_MAX_SOURCE_BYTES", str(32 * 1024 * 1024)))
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "1"))
+JOB_RETRY_MAX = float(os.getenv("JOB_RETRY_MAX", "300"))
+
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "30"))
+MAINTENANCE_STEP_BUDGET_MS = float(os.getenv("MAINTENANCE_STEP_BUDGET_MS", "50"))
+MAINTENANCE_MAX_IN_FLIGHT = int(os.getenv("MAINTENANCE_MAX_IN_FLIGHT", "0"))
+MAINTENANCE_MIN_FREE_PAGES = int(os.getenv("MAINTENANCE_MIN_FREE_PAGES", "256"))
+
+DEFAULT_STORAGE_QUOTA = int(os.getenv("DEFAULT_STORAGE_QUOTA", str(1024 * 1024 * 1024)))
+# Uploads are assembled in memory; larger ones are rejected before that.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(256 * 1024 * 1024)))
@@ -1,27 +1,221 @@
+import logging
 import os
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from typing import Generator
+from typing import Dict, Generator, List
 
-DATABASE_PATH = os.getenv("DATABASE_PATH", "app.db")
+from app.config import DATABASE_PATH, SLOW_QUERY_MS, SQLITE_BUSY_TIMEOUT, SQLITE_CACHED_STATEMENTS
+from app.profiling import current_profile
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStat:
+    __slots__ = ("sql", "count", "total_time", "max_time", "rows")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_time * 1000, 3),
+            "mean_ms": round(self.total_time * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_time * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+class QueryStats:
+    """Per-statement-template timing aggregates for this process.
+
+    Statements are parameterised, so the whitespace-normalised SQL text is
+    the template.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, QueryStat] = {}
+        self._templates: Dict[str, str] = {}
+
+    def stat_for(self, sql: str) -> QueryStat:
+        template = self._templates.get(sql)
+        if template is None:
+            template = self._templates[sql] = " ".join(sql.split())
+        with self._lock:
+            stat = self._stats.get(template)
+            if stat is None:
+                stat = self._stats[template] = QueryStat(template)
+            stat.count += 1
+        return stat
+
+    def record(self, stat: QueryStat, duration: float, elapsed: float, rows: int) -> None:
+        with self._lock:
+            stat.total_time += duration
+            stat.max_time = max(stat.max_time, elapsed)
+            stat.rows += rows
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            stats = [stat.to_dict() for stat in self._stats.values()]
+        return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, parameters=()) -> List[str]:
+    # A plain sqlite3 cursor keeps EXPLAIN itself out of the statistics.
+    cursor = sqlite3.Connection.cursor(conn)
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    except sqlite3.Error:
+        return []
+    finally:
+        cursor.close()
+
+
+class Cursor(sqlite3.Cursor):
+    """Cursor that aggregates statement timings and feeds the active profile.
+
+    Fetch time and fetched rows are attributed to the statement that
+    produced them.
+    """
+
+    _stat = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        duration = time.perf_counter() - start
+
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = 0.0
+        self._slow_logged = False
+        self._stat = query_stats.stat_for(sql)
+        profile = current_profile()
+        self._span = profile.add_query(sql, 0.0) if profile is not None else None
+        self._record(duration, max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        if self._stat is None:
+            return super().fetchone()
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchall(self):
+        if self._stat is None:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def _record(self, duration: float, rows: int) -> None:
+        self._elapsed += duration
+        query_stats.record(self._stat, duration, self._elapsed, rows)
+        if self._span is not None:
+            self._span.duration += duration
+            self._span.rows += rows
+
+        if not self._slow_logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._slow_logged = True
+            plan = explain_query_plan(self.connection, self._sql, self._parameters)
+            logger.warning(
+                "Slow query (%.1f ms): %s | plan: %s",
+                self._elapsed * 1000,
+                self._stat.sql,
+                "; ".join(plan) or "unavailable",
+            )
+
+
+class Connection(sqlite3.Connection):
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
 
 
 def get_connection() -> sqlite3.Connection:
     """Create a new database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        factory=Connection,
+        timeout=SQLITE_BUSY_TIMEOUT,
+        cached_statements=SQLITE_CACHED_STATEMENTS,
+    )
     conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
+    # WAL lets worker processes read while another one writes.
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+_local = threading.local()
+
+
+def _forget_connections() -> None:
+    # A forked worker must never touch connections inherited from its
+    # parent (e.g. under gunicorn --preload); open fresh ones instead.
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_forget_connections)
+
+
+def thread_connection() -> sqlite3.Connection:
+    """This thread's long-lived connection, opened on first use.
+
+    Keeping the connection open keeps its prepared statement cache warm, so
+    each statement in app.queries is parsed and planned once per thread
+    rather than once per request.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = get_connection()
+        _local.depth = 0
     return conn
 
 
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Context manager for database connections."""
-    conn = get_connection()
+    """Context manager for database connections.
+
+    Borrows the calling thread's connection. The outermost block commits on
+    success and rolls back on any other exit, cancellation included, so no
+    write is left for the thread's next block to commit; nested blocks join
+    its transaction.
+    Do not await inside the block: coroutines on the event loop thread
+    share one connection.
+    """
+    conn = thread_connection()
+    depth = _local.depth
+    _local.depth = depth + 1
     try:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
+        if depth == 0:
+            conn.commit()
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        _local.depth = depth
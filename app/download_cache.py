@@ -0,0 +1,106 @@
+"""
+In-memory cache of small file contents for downloads.
+
+Entries are keyed by ``(file_id, version)``. The version is
+``rev{revision_id}`` for files with revisions, else the storage key of
+files stored before them, or ``inline`` for legacy inline rows. It
+changes whenever the content does, so renames and moves keep their entry
+while a content change simply misses. The route still
+reads the file's metadata row on every request (ownership, name, type,
+version); only reading and decoding the content is skipped. Each worker
+process has its own cache.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.config import DOWNLOAD_CACHE_BYTES, DOWNLOAD_CACHE_MAX_FILE_BYTES
+from app.metrics import REGISTRY, Counter, Gauge
+
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("download_cache_requests_total", "Download cache lookups by result", ("result",))
+)
+CACHE_BYTES = REGISTRY.register(Gauge("download_cache_bytes", "Bytes held by the download cache"))
+
+
+class ContentCache:
+    """Byte-budgeted LRU of decoded file contents.
+
+    Only the latest version seen for a file is kept: a lookup or store with
+    a different version replaces it.
+    """
+
+    def __init__(self, max_bytes: int = DOWNLOAD_CACHE_BYTES, max_item_bytes: int = DOWNLOAD_CACHE_MAX_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cacheable(self, size: int) -> bool:
+        return size <= self.max_item_bytes and self.max_bytes > 0
+
+    def get(self, file_id: int, version: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(file_id)
+                self.hits += 1
+                content = entry[1]
+            else:
+                if entry is not None:
+                    self._drop(file_id)
+                self.misses += 1
+                content = None
+        CACHE_REQUESTS.inc("miss" if content is None else "hit")
+        return content
+
+    def put(self, file_id: int, version: str, content: bytes) -> None:
+        if not self.cacheable(len(content)):
+            return
+        with self._lock:
+            self._drop(file_id)
+            self._entries[file_id] = (version, content)
+            self.total += len(content)
+            while self.total > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.total -= len(evicted)
+            CACHE_BYTES.set(self.total)
+
+    def invalidate(self, file_id: int) -> None:
+        with self._lock:
+            self._drop(file_id)
+
+    def _drop(self, file_id: int) -> None:
+        entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self.total -= len(entry[1])
+            CACHE_BYTES.set(self.total)
+
+    def hit_ratio(self) -> float:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total = 0
+            CACHE_BYTES.set(0)
+
+
+download_cache = ContentCache()
+
+
+def collect_metrics():
+    return [
+        "# HELP download_cache_hit_ratio Share of download cache lookups that hit",
+        "# TYPE download_cache_hit_ratio gauge",
+        f"download_cache_hit_ratio {download_cache.hit_ratio()}",
+    ]
+
+
+REGISTRY.register_collector(collect_metrics)
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Set
+
+from app.config import EVENT_BACKEND, EVENT_BUFFER_SIZE, EVENT_DATABASE_PATH, EVENT_POLL_INTERVAL
+from app.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A single connection's bounded buffer of pending events."""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.dropped = 0
+        self._buffer = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict) -> None:
+        """Queue an event, evicting the oldest one when the buffer is full.
+
+        Must run on the subscription's event loop.
+        """
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for the next event, returning None if the timeout expires.
+
+        A slow consumer that overflowed its buffer first receives a single
+        ``resync`` event telling it to re-list instead of trusting the stream.
+        """
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {"type": "resync", "dropped": dropped}
+        if not self._buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._buffer.popleft()
+
+
+class EventHub:
+    """In-process pub/sub fan-out of change events to each user's connections."""
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.relay: Optional["SQLiteEventRelay"] = None
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a subscription bound to the running event loop."""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, user_id: int, event_type: str, **data) -> None:
+        """Deliver an event to every connection of a user.
+
+        Safe to call from the sync route handlers running in the threadpool;
+        delivery is handed to each subscriber's loop and never blocks. With a
+        relay attached the event goes through it, so connections held by
+        other worker processes receive it too.
+        """
+        event = {"type": event_type, **data}
+        if self.relay is not None:
+            try:
+                self.relay.send(user_id, event)
+                return
+            except sqlite3.Error:
+                logger.warning("Event relay unavailable, delivering %s locally", event_type, exc_info=True)
+        self.deliver(user_id, event)
+
+    def deliver(self, user_id: int, event: dict) -> None:
+        """Hand an event to this process's connections of a user."""
+        with self._lock:
+            subscriptions = tuple(self._subscribers.get(user_id, ()))
+        if not subscriptions:
+            return
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # The subscriber's loop has been closed; drop the connection.
+                self.unsubscribe(subscription)
+
+
+class SQLiteEventRelay:
+    """Carries events between worker processes through a shared SQLite file.
+
+    ``send`` appends to an ``events`` table; a thread in every worker polls
+    for rows past the last id it has seen and delivers them to that
+    worker's own connections. Rows are pruned after ``retention`` seconds.
+    """
+
+    PRUNE_EVERY = 200
+
+    def __init__(
+        self,
+        hub: EventHub,
+        path: str = EVENT_DATABASE_PATH,
+        poll_interval: float = EVENT_POLL_INTERVAL,
+        retention: float = 60.0,
+    ):
+        self.hub = hub
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.last_id = 0
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self) -> None:
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout = 1000")
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Events are transient; losing the tail on power failure is fine.
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def send(self, user_id: int, event: dict) -> None:
+        self._connection().execute(
+            "INSERT INTO events (user_id, payload, created_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(event), time.time()),
+        )
+
+    def poll_once(self) -> int:
+        """Deliver events appended since the last poll; returns how many."""
+        rows = self._connection().execute(
+            "SELECT id, user_id, payload FROM events WHERE id > ? ORDER BY id",
+            (self.last_id,),
+        ).fetchall()
+        for event_id, user_id, payload in rows:
+            self.last_id = event_id
+            self.hub.deliver(user_id, json.loads(payload))
+        return len(rows)
+
+    def prune(self) -> None:
+        self._connection().execute(
+            "DELETE FROM events WHERE created_at < ?", (time.time() - self.retention,)
+        )
+
+    def start(self) -> None:
+        # Only events published from now on; older ones were already delivered.
+        self.last_id = self._connection().execute(
+            "SELECT COALESCE(MAX(id), 0) FROM events"
+        ).fetchone()[0]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        polls = 0
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+                polls += 1
+                if polls % self.PRUNE_EVERY == 0:
+                    self.prune()
+            except sqlite3.Error:
+                logger.warning("Event relay poll failed", exc_info=True)
+
+
+hub = EventHub()
+
+
+def start_event_relay() -> None:
+    """Attach the cross-process relay when ``EVENT_BACKEND=sqlite``."""
+    if EVENT_BACKEND != "sqlite" or hub.relay is not None:
+        return
+    hub.relay = SQLiteEventRelay(hub)
+    hub.relay.start()
+
+
+def stop_event_relay() -> None:
+    if hub.relay is None:
+        return
+    hub.relay.stop()
+    hub.relay = None
+
+
+def collect_metrics():
+    return [
+        "# HELP event_stream_connections Open event stream connections",
+        "# TYPE event_stream_connections gauge",
+        f"event_stream_connections {hub.connection_count()}",
+    ]
+
+
+REGISTRY.register_collector(collect_metrics)
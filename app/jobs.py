@@ -0,0 +1,206 @@
+"""
+Durable background jobs.
+
+Routes enqueue work into the ``jobs`` table with ``enqueue(cursor, ...)``,
+normally inside the same transaction as the change that caused it, so a
+job exists if and only if that change committed. Worker threads in every
+process claim due jobs with a single ``UPDATE ... RETURNING`` that also
+pushes ``run_at`` out by the visibility timeout: if a worker dies mid-job,
+the job becomes due again once the timeout passes. Finished jobs are
+deleted; failed ones are retried with exponential backoff until
+``max_attempts``, then kept with ``status = 'dead'`` for inspection.
+
+Handlers are registered by kind with ``@job_handler("kind")`` and receive
+the decoded JSON payload. They must be idempotent: a job can run more
+than once if its worker stalls past the visibility timeout.
+"""
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app import queries
+from app.config import (
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_RETRY_BASE,
+    JOB_RETRY_MAX,
+    JOB_VISIBILITY_TIMEOUT,
+    JOB_WORKERS,
+    JOBS_ENABLED,
+)
+from app.database import get_db
+from app.metrics import REGISTRY, Counter, HistogramMetric, format_labels
+
+logger = logging.getLogger(__name__)
+
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+JOBS_TOTAL = REGISTRY.register(Counter("jobs_total", "Job runs by outcome", ("kind", "outcome")))
+JOB_WAIT = REGISTRY.register(
+    HistogramMetric("job_wait_seconds", "Time from enqueue to the start of a run", ("kind",), JOB_BUCKETS)
+)
+JOB_DURATION = REGISTRY.register(
+    HistogramMetric("job_run_seconds", "Time spent running a job", ("kind",), JOB_BUCKETS)
+)
+
+Handler = Callable[[dict], None]
+
+handlers: Dict[str, Handler] = {}
+
+# Wakes idle workers in this process when a job is enqueued.
+_wakeup = threading.Event()
+
+
+def job_handler(kind: str) -> Callable[[Handler], Handler]:
+    def register(func: Handler) -> Handler:
+        handlers[kind] = func
+        return func
+    return register
+
+
+def enqueue(
+    cursor: sqlite3.Cursor,
+    kind: str,
+    payload: dict,
+    delay: float = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> int:
+    """Queue a job in the caller's transaction; returns its id."""
+    now = time.time()
+    cursor.execute(
+        queries.INSERT_JOB,
+        (kind, json.dumps(payload), max_attempts, now + delay, now),
+    )
+    _wakeup.set()
+    return cursor.lastrowid
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with +/-10% jitter so failed jobs do not retry in lockstep."""
+    delay = min(JOB_RETRY_BASE * 2 ** (attempts - 1), JOB_RETRY_MAX)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def run_next(visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> bool:
+    """Claim and run one due job; returns False when none was due."""
+    now = time.time()
+    with get_db() as conn:
+        job = conn.execute(queries.CLAIM_JOB, (now + visibility_timeout, now)).fetchone()
+    if job is None:
+        return False
+
+    kind = job["kind"]
+    JOB_WAIT.observe(now - job["created_at"], kind)
+    start = time.perf_counter()
+    try:
+        handler = handlers.get(kind)
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {kind!r}")
+        handler(json.loads(job["payload"]))
+    except Exception as exc:
+        JOB_DURATION.observe(time.perf_counter() - start, kind)
+        error = f"{type(exc).__name__}: {exc}"
+        with get_db() as conn:
+            if job["attempts"] >= job["max_attempts"]:
+                conn.execute(queries.BURY_JOB, (error, job["id"]))
+                JOBS_TOTAL.inc(kind, "dead")
+                logger.error("Job %s (%s) failed permanently: %s", job["id"], kind, error)
+            else:
+                conn.execute(queries.RETRY_JOB, (time.time() + retry_delay(job["attempts"]), error, job["id"]))
+                JOBS_TOTAL.inc(kind, "retry")
+                logger.warning("Job %s (%s) failed, will retry: %s", job["id"], kind, error)
+        return True
+
+    JOB_DURATION.observe(time.perf_counter() - start, kind)
+    with get_db() as conn:
+        conn.execute(queries.COMPLETE_JOB, (job["id"],))
+    JOBS_TOTAL.inc(kind, "ok")
+    return True
+
+
+class JobWorkers:
+    """Threads that run due jobs, polling every ``poll_interval`` when idle."""
+
+    def __init__(self, count: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.count = count
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.count):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if run_next():
+                    continue
+            except sqlite3.Error:
+                logger.warning("Job worker poll failed", exc_info=True)
+            _wakeup.wait(self.poll_interval)
+            _wakeup.clear()
+
+
+workers: Optional[JobWorkers] = None
+
+
+def start_jobs() -> None:
+    global workers
+    if JOBS_ENABLED and workers is None:
+        workers = JobWorkers()
+        workers.start()
+
+
+def stop_jobs() -> None:
+    global workers
+    if workers is not None:
+        workers.stop()
+        workers = None
+
+
+def queue_depth() -> Dict[str, Dict[str, int]]:
+    """``{status: {kind: count}}`` across all processes."""
+    depth: Dict[str, Dict[str, int]] = {}
+    with get_db() as conn:
+        for row in conn.execute(queries.JOB_DEPTH).fetchall():
+            depth.setdefault(row["status"], {})[row["kind"]] = row["count"]
+    return depth
+
+
+def dead_jobs(limit: int = 50) -> List[dict]:
+    with get_db() as conn:
+        return [dict(row) for row in conn.execute(queries.DEAD_JOBS, (limit,)).fetchall()]
+
+
+def collect_metrics():
+    lines = [
+        "# HELP job_queue_depth Jobs in the queue by kind and status",
+        "# TYPE job_queue_depth gauge",
+    ]
+    try:
+        depth = queue_depth()
+    except sqlite3.Error:
+        return lines
+    for status, kinds in sorted(depth.items()):
+        for kind, count in sorted(kinds.items()):
+            lines.append(f"job_queue_depth{format_labels(('kind', 'status'), (kind, status))} {count}")
+    return lines
+
+
+REGISTRY.register_collector(collect_metrics)
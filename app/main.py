@@ -1,20 +1,51 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 
 from app.config import CORS_ORIGINS
-from app.middleware import LoggingMiddleware, limiter
+from app.events import start_event_relay, stop_event_relay
+from app.jobs import start_jobs, stop_jobs
+from app.maintenance import start_maintenance, stop_maintenance
+from app.thumbnails import stop_thumbnails
+from app.middleware import (
+    CompressionMiddleware,
+    LoggingMiddleware,
+    ProfilingMiddleware,
+    RateLimitMiddleware,
+    start_access_log,
+    stop_access_log,
+)
 from app.routes import (
     health_router,
     auth_router,
     folders_router,
     files_router,
+    users_router,
+    events_router,
+    metrics_router,
+    admin_router,
+    trash_router,
 )
 
-app = FastAPI(title="Document Management API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_access_log()
+    start_event_relay()
+    start_maintenance()
+    start_jobs()
+    yield
+    stop_jobs()
+    stop_thumbnails()
+    stop_maintenance()
+    stop_event_relay()
+    stop_access_log()
+
+
+app = FastAPI(title="Document Management API", version="1.0.0", lifespan=lifespan)
 
 
 @app.exception_handler(RequestValidationError)
@@ -31,9 +62,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(
     CORSMiddleware,
@@ -44,9 +75,14 @@ app.add_middleware(
 )
 
 app.include_router(health_router)
+app.include_router(metrics_router)
 app.include_router(auth_router)
 app.include_router(folders_router)
 app.include_router(files_router)
+app.include_router(users_router)
+app.include_router(events_router)
+app.include_router(admin_router)
+app.include_router(trash_router)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+"""
+Storage reclamation.
+
+Deleting files frees SQLite pages but does not shrink the database file.
+With ``auto_vacuum = INCREMENTAL`` free pages can be released with
+``PRAGMA incremental_vacuum(N)``, which moves pages from the end of the
+file into the free slots and truncates it. Each call is a write
+transaction, so the scheduler runs it in steps sized to fit a time budget,
+and only while this worker is serving few enough requests.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from app.config import (
+    DATABASE_PATH,
+    MAINTENANCE_ENABLED,
+    MAINTENANCE_INTERVAL,
+    MAINTENANCE_MAX_IN_FLIGHT,
+    MAINTENANCE_MIN_FREE_PAGES,
+    MAINTENANCE_STEP_BUDGET_MS,
+)
+from app.metrics import REGISTRY, REQUESTS_IN_FLIGHT, Counter, Gauge, HistogramMetric
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+PAGE_COUNT = REGISTRY.register(Gauge("sqlite_page_count", "Pages in the main database file"))
+FREELIST_PAGES = REGISTRY.register(Gauge("sqlite_freelist_pages", "Unused pages in the main database file"))
+RECLAIMED_PAGES = REGISTRY.register(
+    Counter("maintenance_reclaimed_pages_total", "Free pages released by incremental vacuum")
+)
+VACUUM_STEP_DURATION = REGISTRY.register(
+    HistogramMetric("maintenance_vacuum_step_seconds", "Write lock time of one incremental vacuum step")
+)
+
+
+@dataclass
+class StorageStats:
+    page_size: int
+    page_count: int
+    freelist_count: int
+    auto_vacuum: str
+
+    @property
+    def free_ratio(self) -> float:
+        return self.freelist_count / self.page_count if self.page_count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "file_bytes": self.page_count * self.page_size,
+            "free_bytes": self.freelist_count * self.page_size,
+            "free_ratio": round(self.free_ratio, 4),
+        }
+
+
+def storage_stats(conn: sqlite3.Connection) -> StorageStats:
+    def pragma(name):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    return StorageStats(
+        page_size=pragma("page_size"),
+        page_count=pragma("page_count"),
+        freelist_count=pragma("freelist_count"),
+        auto_vacuum=AUTO_VACUUM_MODES.get(pragma("auto_vacuum"), "unknown"),
+    )
+
+
+def fragmentation(conn: sqlite3.Connection) -> Optional[float]:
+    """Share of pages not stored right after the previous page of their table.
+
+    Reads every page through the ``dbstat`` virtual table, so it is meant
+    for on-demand reports rather than the scheduler. Returns None when
+    SQLite was built without ``dbstat``.
+    """
+    try:
+        rows = conn.execute("SELECT name, pageno FROM dbstat")
+    except sqlite3.OperationalError:
+        return None
+    previous = {}
+    pages = jumps = 0
+    for name, pageno in rows:
+        pages += 1
+        if name in previous and pageno != previous[name] + 1:
+            jumps += 1
+        previous[name] = pageno
+    return jumps / pages if pages else 0.0
+
+
+def vacuum_step(conn: sqlite3.Connection, pages: int) -> int:
+    """Release up to ``pages`` free pages in one transaction; returns how many."""
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # executescript steps the pragma to completion; execute() would stop
+    # after the first page.
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+    return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+class VacuumScheduler:
+    """Releases free pages in small steps whenever the worker is idle.
+
+    Every ``interval`` seconds the thread checks the freelist. If the
+    database uses incremental auto-vacuum and at least ``min_free_pages``
+    are free, it runs vacuum steps while ``load()`` stays at or below
+    ``max_in_flight``. Each step holds the write lock for about half of
+    ``step_budget`` seconds: the page count per step is rescaled after
+    every step from how long the last one took. Between steps the lock is
+    left free for at least as long as it was held.
+    """
+
+    MIN_STEP_PAGES = 8
+    MAX_STEP_PAGES = 4096
+
+    def __init__(
+        self,
+        path: str = DATABASE_PATH,
+        interval: float = MAINTENANCE_INTERVAL,
+        step_budget: float = MAINTENANCE_STEP_BUDGET_MS / 1000,
+        min_free_pages: int = MAINTENANCE_MIN_FREE_PAGES,
+        max_in_flight: int = MAINTENANCE_MAX_IN_FLIGHT,
+        load: Callable[[], float] = REQUESTS_IN_FLIGHT.total,
+    ):
+        self.path = path
+        self.interval = interval
+        self.step_budget = step_budget
+        self.min_free_pages = min_free_pages
+        self.max_in_flight = max_in_flight
+        self.load = load
+        self.pages_per_step = 64
+        self.last_run: Optional[float] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # A short busy timeout: if a writer holds the lock, skip rather
+            # than queue behind it.
+            self._conn = sqlite3.connect(
+                self.path, isolation_level=None, timeout=self.step_budget, check_same_thread=False
+            )
+        return self._conn
+
+    def is_idle(self) -> bool:
+        return self.load() <= self.max_in_flight
+
+    def reclaim(self, conn: sqlite3.Connection, should_continue: Callable[[], bool] = lambda: True) -> int:
+        """Run budgeted vacuum steps until the freelist is empty; returns pages freed."""
+        freed = 0
+        while should_continue():
+            start = time.perf_counter()
+            try:
+                released = vacuum_step(conn, self.pages_per_step)
+            except sqlite3.OperationalError:
+                # Busy: a writer has the lock. Try again next time.
+                break
+            elapsed = time.perf_counter() - start
+            VACUUM_STEP_DURATION.observe(elapsed)
+            RECLAIMED_PAGES.inc(amount=released)
+            freed += released
+            self._resize(elapsed)
+            if not released or self._stop.wait(max(elapsed, self.step_budget)):
+                break
+        return freed
+
+    def _resize(self, elapsed: float) -> None:
+        # Aim for half the budget so a slower-than-usual step still fits;
+        # grow at most 2x per step.
+        scale = min(self.step_budget / 2 / elapsed, 2.0) if elapsed > 0 else 2.0
+        pages = int(self.pages_per_step * scale)
+        self.pages_per_step = max(self.MIN_STEP_PAGES, min(pages, self.MAX_STEP_PAGES))
+
+    def run_once(self) -> int:
+        """Check the freelist and reclaim if worthwhile; returns pages freed."""
+        conn = self._connection()
+        stats = self.publish(conn)
+        freed = 0
+        if stats.auto_vacuum == "incremental" and stats.freelist_count >= self.min_free_pages:
+            freed = self.reclaim(conn, lambda: not self._stop.is_set() and self.is_idle())
+            if freed:
+                # Under WAL the file is truncated at checkpoint; PASSIVE
+                # never waits for readers or writers.
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                self.publish(conn)
+        self.last_run = time.time()
+        return freed
+
+    def publish(self, conn: sqlite3.Connection) -> StorageStats:
+        stats = storage_stats(conn)
+        PAGE_COUNT.set(stats.page_count)
+        FREELIST_PAGES.set(stats.freelist_count)
+        return stats
+
+    def status(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "interval": self.interval,
+            "step_budget_ms": self.step_budget * 1000,
+            "pages_per_step": self.pages_per_step,
+            "last_run": self.last_run,
+        }
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vacuum-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except sqlite3.Error:
+                logger.warning("Storage maintenance run failed", exc_info=True)
+
+
+scheduler = VacuumScheduler()
+
+
+def start_maintenance() -> None:
+    if MAINTENANCE_ENABLED and scheduler._thread is None:
+        scheduler.start()
+
+
+def stop_maintenance() -> None:
+    scheduler.stop()
+
+
+def storage_report(path: str = DATABASE_PATH) -> dict:
+    """Freelist, fragmentation and scheduler state for the admin API."""
+    # A plain connection keeps dbstat's full scan out of the query stats.
+    conn = sqlite3.connect(path)
+    try:
+        report = storage_stats(conn).to_dict()
+        report["fragmentation"] = fragmentation(conn)
+    finally:
+        conn.close()
+    report["scheduler"] = scheduler.status()
+    return report
@@ -0,0 +1,208 @@
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def with_label(line: str, pair: str) -> str:
+    """Add ``pair`` (``name="value"``) to one exposition line; comments pass through."""
+    if not line or line.startswith("#"):
+        return line
+    # Label values may contain braces (route templates); the last one closes the set.
+    head, brace, value = line.rpartition("}")
+    if brace:
+        return f"{head},{pair}}}{value}"
+    name, _, value = line.partition(" ")
+    return f"{name}{{{pair}}} {value}"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with bucket-interpolated quantiles."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, self.counts):
+            if seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        # Everything past the last bucket is reported as the last bound.
+        return self.buckets[-1]
+
+
+class Metric:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self, kind: str) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {kind}"]
+
+
+class Counter(Metric):
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header("counter")
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Metric):
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        lines = self.header("gauge")
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class HistogramMetric(Metric):
+    """Labelled histogram, also exported as a p50/p95/p99 summary."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[Tuple[str, ...], Histogram] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = self._histograms[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def quantile(self, q: float, *labels: str) -> float:
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            return histogram.quantile(q) if histogram else 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header("histogram")
+        summary = [
+            f"# HELP {self.name}_quantiles {self.help} (estimated quantiles)",
+            f"# TYPE {self.name}_quantiles summary",
+        ]
+        with self._lock:
+            for labels, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    le = format_labels(self.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = format_labels(self.labelnames, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {histogram.count}")
+                label_str = format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_str} {histogram.sum}")
+                lines.append(f"{self.name}_count{label_str} {histogram.count}")
+
+                for q in QUANTILES:
+                    ql = format_labels(self.labelnames, labels, f'quantile="{q}"')
+                    summary.append(f"{self.name}_quantiles{ql} {histogram.quantile(q)}")
+                summary.append(f"{self.name}_quantiles_sum{label_str} {histogram.sum}")
+                summary.append(f"{self.name}_quantiles_count{label_str} {histogram.count}")
+        return lines + summary
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Add a callable producing exposition lines at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self, worker: Optional[str] = None) -> str:
+        """Exposition text; with ``worker``, every sample is labelled with it."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        if worker is not None:
+            pair = f'worker="{worker}"'
+            lines = [with_label(line, pair) for line in lines]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS_TOTAL = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+)
+REQUEST_DURATION = REGISTRY.register(
+    HistogramMetric("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+)
+REQUESTS_IN_FLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",))
+)
@@ -1,4 +1,13 @@
-from app.middleware.logging import LoggingMiddleware
-from app.middleware.rate_limit import limiter
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.logging import LoggingMiddleware, start_access_log, stop_access_log
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
 
-__all__ = ["LoggingMiddleware", "limiter"]
+__all__ = [
+    "CompressionMiddleware",
+    "LoggingMiddleware",
+    "ProfilingMiddleware",
+    "RateLimitMiddleware",
+    "start_access_log",
+    "stop_access_log",
+]
@@ -0,0 +1,238 @@
+import importlib.util
+import zlib
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import COMPRESSION_MINIMUM_SIZE, COMPRESSION_OFFLOAD_SIZE
+
+
+class GzipCompressor:
+    def __init__(self, level: int = 6):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int = 4):
+        import brotli
+
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int = 3):
+        import zstandard
+
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+def available_encoders() -> Dict[str, type]:
+    """Supported encodings in server preference order.
+
+    The optional codecs are only located here; they are imported by the
+    first response that uses them, keeping them out of startup.
+    """
+    encoders = {}
+    if importlib.util.find_spec("zstandard") is not None:
+        encoders["zstd"] = ZstdCompressor
+    if importlib.util.find_spec("brotli") is not None:
+        encoders["br"] = BrotliCompressor
+    encoders["gzip"] = GzipCompressor
+    return encoders
+
+
+ENCODERS = available_encoders()
+
+# Formats that are already compressed; a second pass only costs CPU.
+INCOMPRESSIBLE_PREFIXES = ("image/", "audio/", "video/", "font/woff", "application/vnd.openxmlformats-")
+INCOMPRESSIBLE_TYPES = frozenset({
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "application/zstd",
+    "application/pdf",
+    "application/java-archive",
+    "application/octet-stream",
+    "text/event-stream",
+})
+COMPRESSIBLE_IMAGES = frozenset({"image/svg+xml", "image/bmp", "image/x-icon"})
+
+
+def is_compressible(content_type: str) -> bool:
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if mime in COMPRESSIBLE_IMAGES:
+        return True
+    if mime in INCOMPRESSIBLE_TYPES or mime.endswith("+zip"):
+        return False
+    return not mime.startswith(INCOMPRESSIBLE_PREFIXES)
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the encoding with the highest q-value, ties going to server preference."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    wildcard = weights.get("*", 0.0)
+    for name in ENCODERS:
+        q = weights.get(name, wildcard)
+        if q > best[0]:
+            best = (q, name)
+    return best[1]
+
+
+class CompressionMiddleware:
+    """Negotiated response compression (zstd, br or gzip).
+
+    zstd and br are offered only when ``zstandard`` / ``brotli`` are
+    installed. Responses are skipped when they are small, already encoded,
+    partial, event streams, or of a type that is already compressed; file
+    downloads carry ``files.mime_type`` as their Content-Type, so stored
+    images, archives and PDFs go out as they are. Streamed bodies are
+    compressed chunk by chunk, and chunks of ``offload_size`` bytes or more
+    are compressed in the threadpool to keep the event loop free.
+
+    An encoded body is a different representation: its ETag is made weak,
+    so If-Range never matches it, and byte ranges are no longer offered,
+    since they would address the identity bytes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        offload_size: int = COMPRESSION_OFFLOAD_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if self.should_compress(message):
+                    start_message = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # e.g. zero-copy file sends: deliver them untouched.
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = ENCODERS[encoding]()
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                self.encoded_representation(headers)
+                if not more_body:
+                    body = await self.compress(compressor, body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start_message)
+
+            body = await self.compress(compressor, body, final=not more_body)
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def should_compress(self, message: Message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 206, 304):
+            return False
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        return is_compressible(headers.get("content-type", ""))
+
+    @staticmethod
+    def encoded_representation(headers: MutableHeaders) -> None:
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+        if "accept-ranges" in headers:
+            del headers["Accept-Ranges"]
+
+    async def compress(self, compressor, body: bytes, final: bool) -> bytes:
+        if len(body) >= self.offload_size:
+            return await run_in_threadpool(self._compress, compressor, body, final)
+        return self._compress(compressor, body, final)
+
+    @staticmethod
+    def _compress(compressor, body: bytes, final: bool) -> bytes:
+        data = compressor.compress(body)
+        if final:
+            data += compressor.flush()
+        return data
@@ -1,22 +1,99 @@
-import time
 import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from app.metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT, REQUESTS_TOTAL
 
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        response = await call_next(request)
-        
-        duration = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} - {response.status_code} - {duration:.3f}s"
-        )
-        
-        return response
+
+# Request threads only enqueue records; formatting and I/O happen on the
+# listener thread so a slow stderr never stalls the event loop.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+
+
+def queued_logger(name: str) -> logging.Logger:
+    """Return a logger whose records are written by the access log listener."""
+    queued = logging.getLogger(name)
+    if not any(isinstance(h, QueueHandler) for h in queued.handlers):
+        queued.addHandler(QueueHandler(_log_queue))
+        queued.propagate = False
+    return queued
+
+
+logger = queued_logger(__name__)
+
+
+def start_access_log() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    _listener = QueueListener(_log_queue, handler)
+    _listener.start()
+
+
+def stop_access_log() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+def route_label(scope: Scope) -> str:
+    """Return the matched route template, keeping metric cardinality bounded."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def is_event_stream(message: Message) -> bool:
+    return any(
+        name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+        for name, value in message.get("headers", ())
+    )
+
+
+class LoggingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        streaming = False
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # An open event stream is not load: once it starts it no
+                # longer keeps the worker from being idle (see
+                # app.maintenance). event_stream_connections counts it.
+                if is_event_stream(message):
+                    streaming = True
+                    REQUESTS_IN_FLIGHT.dec(method)
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            if not streaming:
+                REQUESTS_IN_FLIGHT.dec(method)
+
+            route = route_label(scope)
+            REQUEST_DURATION.observe(duration, method, route)
+            REQUESTS_TOTAL.inc(method, route, str(status_code))
+            logger.info("%s %s - %s - %.3fs", method, scope["path"], status_code, duration)
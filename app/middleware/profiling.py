@@ -0,0 +1,97 @@
+import json
+import random
+import time
+from typing import Optional
+
+import anyio
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth.dependencies import is_admin_token
+from app.config import PROFILE_HEADER_ENABLED, PROFILE_SAMPLE_RATE
+from app.middleware.logging import queued_logger, route_label
+from app.profiling import Profile, activate
+
+logger = queued_logger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+AUTHORIZATION_HEADER = b"authorization"
+
+
+class ProfilingMiddleware:
+    """Opt-in per-request span collection.
+
+    A request is profiled when an admin sends it with ``X-Profile: 1`` (if
+    enabled) or it is picked by ``PROFILE_SAMPLE_RATE``. Every profile is
+    logged as a structured record with every span. Only admins' requests
+    get a ``Server-Timing`` header: timings tell a client how the request
+    was served.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        header_enabled: bool = PROFILE_HEADER_ENABLED,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+
+    def header_token(self, scope: Scope) -> Optional[str]:
+        """The bearer token of a request that asks for ``X-Profile: 1``."""
+        if not self.header_enabled:
+            return None
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) != b"1":
+            return None
+        scheme, _, token = headers.get(AUTHORIZATION_HEADER, b"").decode("latin-1").partition(" ")
+        return token if scheme.lower() == "bearer" and token else None
+
+    def sampled(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = self.header_token(scope)
+        # The user lookup is a query: keep it off the event loop.
+        show_timing = token is not None and await anyio.to_thread.run_sync(is_admin_token, token)
+        if not show_timing and not self.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile()
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if show_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", profile.server_timing(time.perf_counter() - start_time))
+            await send(message)
+
+        with activate(profile):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                duration = time.perf_counter() - start_time
+                logger.info(
+                    "%s",
+                    json.dumps(
+                        {
+                            "event": "request_profile",
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "route": route_label(scope),
+                            "status": status_code,
+                            "duration_ms": round(duration * 1000, 3),
+                            "spans": [s.to_dict() for s in profile.spans],
+                        }
+                    ),
+                )
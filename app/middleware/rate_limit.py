@@ -1,6 +1,262 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import abc
+import importlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Pattern, Tuple
 
-from app.config import RATE_LIMIT
+import anyio
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-limiter = Limiter(key_func=get_remote_address, default_limits=[RATE_LIMIT])
+from app.auth.jwt import decode_access_token
+from app.config import (
+    LOGIN_RATE_LIMIT,
+    RATE_LIMIT,
+    RATE_LIMIT_DATABASE_PATH,
+    RATE_LIMIT_STORAGE,
+    UPLOAD_RATE_LIMIT,
+)
+from app.metrics import REGISTRY, Counter
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+EXEMPT_PATHS = {"/health", "/metrics"}
+
+FAIL_OPEN = REGISTRY.register(
+    Counter("rate_limit_fail_open_total", "Requests let through because the bucket store was unavailable")
+)
+
+
+class Limit:
+    """A token bucket refilling ``amount`` tokens per ``period`` seconds."""
+
+    def __init__(self, spec: str):
+        amount, _, period = spec.partition("/")
+        self.spec = spec
+        self.capacity = float(amount)
+        self.period = PERIODS[period.strip().rstrip("s")]
+        self.rate = self.capacity / self.period
+
+
+class RateLimitBackend(abc.ABC):
+    """Bucket storage; ``take`` must consume a token atomically.
+
+    ``take`` is called in the threadpool unless ``blocking`` is False, so
+    it may do I/O.
+    """
+
+    blocking = True
+
+    @abc.abstractmethod
+    def take(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        """Try to consume one token, returning ``(allowed, tokens_left)``."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process buckets, for tests and single-worker development."""
+
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens
+
+
+class SQLiteBackend(RateLimitBackend):
+    """Buckets in a SQLite file shared by every worker on the host.
+
+    Each request costs a single upsert that refills, consumes and reports in
+    one statement, so concurrent workers never race on a bucket. Counters are
+    disposable, hence WAL with ``synchronous=OFF`` to keep the write off disk.
+    """
+
+    # Every SET expression sees the row as it was before the update.
+    TAKE_SQL = """
+        INSERT INTO rate_limits (key, tokens, updated_at, allowed)
+        VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            tokens = CASE
+                WHEN MIN(:capacity, tokens + (:now - updated_at) * :rate) >= 1
+                THEN MIN(:capacity, tokens + (:now - updated_at) * :rate) - 1
+                ELSE MIN(:capacity, tokens + (:now - updated_at) * :rate)
+            END,
+            allowed = MIN(:capacity, tokens + (:now - updated_at) * :rate) >= 1,
+            updated_at = :now
+        RETURNING allowed, tokens
+    """
+
+    PRUNE_EVERY = 10000
+
+    def __init__(self, path: str = RATE_LIMIT_DATABASE_PATH, busy_timeout_ms: int = 50):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._calls = 0
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self) -> None:
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    allowed INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = self._connection().execute(
+                self.TAKE_SQL,
+                {"key": key, "capacity": limit.capacity, "rate": limit.rate, "now": now},
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Fail open rather than hold up the request on a locked store.
+            FAIL_OPEN.inc()
+            return True, 0.0
+
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            self.prune(now)
+        return bool(allowed), tokens
+
+    def prune(self, now: float) -> None:
+        """Drop buckets idle for a day; they would be full again anyway."""
+        try:
+            self._connection().execute(
+                "DELETE FROM rate_limits WHERE updated_at < ?", (now - PERIODS["day"],)
+            )
+        except sqlite3.OperationalError:
+            pass
+
+
+def build_backend(storage: str = RATE_LIMIT_STORAGE) -> RateLimitBackend:
+    """Create the backend named by ``RATE_LIMIT_STORAGE``.
+
+    ``memory`` and ``sqlite`` are built in; any other value is imported as a
+    ``package.module:ClassName`` RateLimitBackend subclass.
+    """
+    if storage == "memory":
+        return MemoryBackend()
+    if storage == "sqlite":
+        return SQLiteBackend()
+    module_name, _, class_name = storage.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def path_pattern(template: str) -> Pattern:
+    """Match paths of a route template such as ``/files/{file_id}/content``."""
+    segments = (
+        "[^/]+" if segment.startswith("{") and segment.endswith("}") else re.escape(segment)
+        for segment in template.split("/")
+    )
+    return re.compile("/".join(segments) + "$")
+
+
+def client_identity(scope: Scope) -> str:
+    """Key by authenticated user when a valid token is present, else by IP."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                user_id = decode_access_token(token)
+                if user_id is not None:
+                    return f"user:{user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting with separate buckets for expensive routes."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: Optional[RateLimitBackend] = None,
+        default_limit: str = RATE_LIMIT,
+        rules: Optional[List[Tuple[str, str, str, str]]] = None,
+    ):
+        self.app = app
+        self.backend = backend or build_backend()
+        self.default_limit = Limit(default_limit)
+        if rules is None:
+            rules = [
+                ("POST", "/auth/login", "login", LOGIN_RATE_LIMIT),
+                ("POST", "/auth/register", "login", LOGIN_RATE_LIMIT),
+                ("POST", "/files", "upload", UPLOAD_RATE_LIMIT),
+                ("PUT", "/files/{file_id}/content", "upload", UPLOAD_RATE_LIMIT),
+            ]
+        # Routing has not happened yet, so templated paths are matched here.
+        self.rules: Dict[Tuple[str, str], Tuple[str, Limit]] = {}
+        self.template_rules: List[Tuple[str, Pattern, Tuple[str, Limit]]] = []
+        for method, path, group, spec in rules:
+            if "{" in path:
+                self.template_rules.append((method, path_pattern(path), (group, Limit(spec))))
+            else:
+                self.rules[(method, path)] = (group, Limit(spec))
+
+    def limit_for(self, scope: Scope) -> Tuple[str, Limit]:
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        rule = self.rules.get((method, path))
+        if rule is not None:
+            return rule
+        for rule_method, pattern, rule in self.template_rules:
+            if rule_method == method and pattern.match(path):
+                return rule
+        return ("default", self.default_limit)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        group, limit = self.limit_for(scope)
+        key = f"{group}:{client_identity(scope)}"
+        if self.backend.blocking:
+            allowed, tokens = await anyio.to_thread.run_sync(self.backend.take, key, limit, time.time())
+        else:
+            allowed, tokens = self.backend.take(key, limit, time.time())
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = max(1, math.ceil((1 - tokens) / limit.rate))
+        body = json.dumps({"detail": f"Rate limit exceeded: {limit.spec}"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
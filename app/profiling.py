@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+
+class Span:
+    __slots__ = ("name", "duration", "sql", "rows")
+
+    def __init__(self, name: str, duration: float = 0.0, sql: Optional[str] = None):
+        self.name = name
+        self.duration = duration
+        self.sql = sql
+        self.rows = 0
+
+    def to_dict(self) -> dict:
+        data = {"name": self.name, "duration_ms": round(self.duration * 1000, 3)}
+        if self.sql is not None:
+            data["sql"] = self.sql
+            data["rows"] = self.rows
+        return data
+
+
+class Profile:
+    """Spans collected while serving a single profiled request."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.query_count = 0
+
+    def add(self, name: str, duration: float) -> Span:
+        span = Span(name, duration)
+        self.spans.append(span)
+        return span
+
+    def add_query(self, sql: str, duration: float) -> Span:
+        self.query_count += 1
+        span = Span(f"sql.{self.query_count}", duration, " ".join(sql.split()))
+        self.spans.append(span)
+        return span
+
+    def server_timing(self, total: float) -> str:
+        # Durations only: statement text stays in the server-side log.
+        entries = [f"{span.name};dur={span.duration * 1000:.3f}" for span in self.spans]
+        entries.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(entries)
+
+
+_current_profile: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+
+def current_profile() -> Optional[Profile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def activate(profile: Profile) -> Iterator[Profile]:
+    """Make ``profile`` the collector for code running in this context.
+
+    Sync dependencies and handlers run in the threadpool with a copy of the
+    request context, so spans recorded there land on the same profile.
+    """
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as a named span; a no-op when profiling is off."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
@@ -0,0 +1,364 @@
+"""
+SQL statements used by the application.
+
+Every statement the routes run lives here as a module-level constant, so
+each one is a single, stable string. SQLite's per-connection statement
+cache is keyed on the exact SQL text, and connections are long-lived (see
+app.database.get_db), so a statement is parsed and planned once per
+connection and reused for every later request.
+"""
+
+from app.records import FileRecord, FolderRecord, UserRecord
+
+# Users
+
+USER_BY_ID = f"SELECT {UserRecord.COLUMNS} FROM users WHERE id = ?"
+
+USER_ID_BY_EMAIL = "SELECT id FROM users WHERE email = ?"
+
+USER_CREDENTIALS_BY_EMAIL = "SELECT id, password_hash FROM users WHERE email = ?"
+
+INSERT_USER = "INSERT INTO users (email, password_hash) VALUES (?, ?)"
+
+USER_USAGE = "SELECT storage_used, COALESCE(storage_quota, ?) AS storage_quota FROM users WHERE id = ?"
+
+RESERVE_STORAGE = """
+    UPDATE users SET storage_used = storage_used + ?
+    WHERE id = ? AND storage_used + ? <= COALESCE(storage_quota, ?)
+"""
+
+RELEASE_STORAGE = "UPDATE users SET storage_used = MAX(storage_used - ?, 0) WHERE id = ?"
+
+# Trash: deleted_at is set on the root of a trashed subtree only. A look-up
+# by id walks up the folder chain from the row (?1) and finds it only if
+# neither it nor any ancestor is trashed, at a cost of one primary-key step
+# per level. Listings need no walk: they start from a live folder.
+_LIVE_CHAIN = """
+    WITH RECURSIVE chain(folder_id, trashed) AS (
+        SELECT parent_folder_id, deleted_at IS NOT NULL FROM {table} WHERE id = ?1
+        UNION ALL
+        SELECT folders.parent_folder_id, folders.deleted_at IS NOT NULL
+        FROM folders JOIN chain ON folders.id = chain.folder_id
+        WHERE NOT chain.trashed
+    )
+"""
+
+_NOT_TRASHED = "NOT EXISTS (SELECT 1 FROM chain WHERE trashed)"
+
+# Folders
+
+FOLDER_BY_ID = f"SELECT {FolderRecord.COLUMNS} FROM folders WHERE id = ?"
+
+FOLDER_FOR_USER = _LIVE_CHAIN.format(table="folders") + (
+    f"SELECT {FolderRecord.COLUMNS} FROM folders WHERE id = ?1 AND user_id = ?2 AND {_NOT_TRASHED}"
+)
+
+FOLDER_EXISTS_FOR_USER = _LIVE_CHAIN.format(table="folders") + (
+    f"SELECT id FROM folders WHERE id = ?1 AND user_id = ?2 AND {_NOT_TRASHED}"
+)
+
+ROOT_FOLDERS = (
+    f"SELECT {FolderRecord.COLUMNS} FROM folders "
+    "WHERE parent_folder_id IS NULL AND user_id = ? AND deleted_at IS NULL"
+)
+
+SUBFOLDERS = (
+    f"SELECT {FolderRecord.COLUMNS} FROM folders "
+    "WHERE parent_folder_id = ? AND user_id = ? AND deleted_at IS NULL"
+)
+
+INSERT_FOLDER = "INSERT INTO folders (name, user_id, parent_folder_id) VALUES (?, ?, ?)"
+
+RENAME_FOLDER = "UPDATE folders SET name = ? WHERE id = ?"
+
+TRASH_FOLDER = "UPDATE folders SET deleted_at = CURRENT_TIMESTAMP WHERE id = ? AND deleted_at IS NULL"
+
+# Files
+
+FILE_BY_ID = f"SELECT {FileRecord.COLUMNS} FROM files WHERE id = ?"
+
+FILE_FOR_USER = _LIVE_CHAIN.format(table="files") + (
+    f"SELECT {FileRecord.COLUMNS} FROM files WHERE id = ?1 AND user_id = ?2 AND {_NOT_TRASHED}"
+)
+
+# storage_key is NULL for rows whose content is still inline base64.
+FILE_DOWNLOAD_FOR_USER = _LIVE_CHAIN.format(table="files") + (
+    "SELECT name, size, mime_type, storage_key, revision_id, sha256 FROM files "
+    f"WHERE id = ?1 AND user_id = ?2 AND {_NOT_TRASHED}"
+)
+
+FILE_PREVIEW_SOURCE = _LIVE_CHAIN.format(table="files") + (
+    f"SELECT mime_type, storage_key, revision_id FROM files WHERE id = ?1 AND user_id = ?2 AND {_NOT_TRASHED}"
+)
+
+FILE_CONTENT_STATE = "SELECT storage_key, revision_id, size FROM files WHERE id = ?"
+
+FILE_INLINE_CONTENT = "SELECT content FROM files WHERE id = ?"
+
+ROOT_FILES = (
+    f"SELECT {FileRecord.COLUMNS} FROM files "
+    "WHERE parent_folder_id IS NULL AND user_id = ? AND deleted_at IS NULL"
+)
+
+FOLDER_FILES = (
+    f"SELECT {FileRecord.COLUMNS} FROM files "
+    "WHERE parent_folder_id = ? AND user_id = ? AND deleted_at IS NULL"
+)
+
+INSERT_FILE = (
+    "INSERT INTO files (name, content, size, mime_type, user_id, parent_folder_id, storage_key, sha256) "
+    "VALUES (?, '', ?, ?, ?, ?, ?, ?)"
+)
+
+# Instant upload: a new row with the content of one of the user's files with
+# the same hash. Done as one statement so the source row cannot be deleted,
+# and its content released, between finding it and referencing it. A row
+# copied from a versioned file briefly points at the source's revision until
+# the caller gives it a copy of its own.
+INSERT_FILE_FROM_CONTENT = (
+    "INSERT INTO files (name, content, size, mime_type, user_id, parent_folder_id, storage_key, revision_id, sha256) "
+    "SELECT ?, '', size, ?, user_id, ?, storage_key, revision_id, sha256 FROM files "
+    "WHERE user_id = ? AND sha256 = ? AND (storage_key IS NOT NULL OR revision_id IS NOT NULL) LIMIT 1 "
+    "RETURNING id, revision_id"
+)
+
+CONTENT_SIZE_FOR_USER = (
+    "SELECT size FROM files "
+    "WHERE user_id = ? AND sha256 = ? AND (storage_key IS NOT NULL OR revision_id IS NOT NULL) LIMIT 1"
+)
+
+UPDATE_FILE = "UPDATE files SET name = ?, mime_type = ?, parent_folder_id = ? WHERE id = ?"
+
+TRASH_FILE = "UPDATE files SET deleted_at = CURRENT_TIMESTAMP WHERE id = ? AND deleted_at IS NULL"
+
+BLOB_IN_USE = "SELECT 1 FROM files WHERE storage_key = ? LIMIT 1"
+
+# Points the file at a new revision, provided its content is still what the
+# caller read; rowcount 0 means another request changed it first.
+SET_FILE_REVISION = (
+    "UPDATE files SET revision_id = ?, storage_key = NULL, content = '', size = ?, sha256 = ? "
+    "WHERE id = ? AND revision_id IS ? AND storage_key IS ?"
+)
+
+# Revisions
+
+INSERT_REVISION = "INSERT INTO file_revisions (file_id, size, sha256) VALUES (?, ?, ?)"
+
+INSERT_REVISION_CHUNK = "INSERT INTO revision_chunks (revision_id, position, chunk_hash, size) VALUES (?, ?, ?, ?)"
+
+COPY_REVISION = (
+    "INSERT INTO file_revisions (file_id, size, sha256) "
+    "SELECT ?, size, sha256 FROM file_revisions WHERE id = ? AND file_id = ?"
+)
+
+COPY_REVISION_CHUNKS = (
+    "INSERT INTO revision_chunks (revision_id, position, chunk_hash, size) "
+    "SELECT ?, position, chunk_hash, size FROM revision_chunks WHERE revision_id = ?"
+)
+
+REVISION_BY_ID = "SELECT id, file_id, size, sha256 FROM file_revisions WHERE id = ?"
+
+REVISION_CHUNKS = "SELECT chunk_hash, size FROM revision_chunks WHERE revision_id = ? ORDER BY position"
+
+FILE_REVISIONS = "SELECT id, size, sha256, created_at FROM file_revisions WHERE file_id = ? ORDER BY id DESC"
+
+# Everything but the current revision and the newest ? ones, plus anything
+# older than datetime('now', ?) (a NULL modifier disables the age limit).
+PRUNE_REVISIONS = """
+    DELETE FROM file_revisions
+    WHERE file_id = ?
+      AND id IS NOT (SELECT revision_id FROM files WHERE id = ?)
+      AND (
+        id NOT IN (SELECT id FROM file_revisions WHERE file_id = ? ORDER BY id DESC LIMIT ?)
+        OR created_at < datetime('now', ?)
+      )
+    RETURNING id
+"""
+
+DELETE_FILE_REVISIONS = "DELETE FROM file_revisions WHERE file_id = ? RETURNING id"
+
+DELETE_REVISION_CHUNKS = "DELETE FROM revision_chunks WHERE revision_id = ? RETURNING chunk_hash"
+
+# Chunks
+
+# The hashes are passed as one JSON array so the statement text is fixed.
+LIVE_CHUNKS = "SELECT hash FROM chunks JOIN json_each(?) ON hash = value WHERE refcount > 0"
+
+# Which of the hashes (a JSON array) are chunks of the user's stored revisions.
+USER_CHUNKS = """
+    SELECT DISTINCT revision_chunks.chunk_hash AS hash, revision_chunks.size AS size
+    FROM json_each(?)
+    JOIN revision_chunks ON revision_chunks.chunk_hash = json_each.value
+    JOIN file_revisions ON file_revisions.id = revision_chunks.revision_id
+    JOIN files ON files.id = file_revisions.file_id
+    WHERE files.user_id = ?
+"""
+
+ACQUIRE_CHUNK = (
+    "INSERT INTO chunks (hash, size, refcount) VALUES (?, ?, ?) "
+    "ON CONFLICT (hash) DO UPDATE SET refcount = refcount + excluded.refcount "
+    "RETURNING refcount"
+)
+
+RELEASE_CHUNK = "UPDATE chunks SET refcount = refcount - ? WHERE hash = ?"
+
+# Blobs written for an upload that failed: recorded unreferenced for collection.
+ABANDON_CHUNK = "INSERT OR IGNORE INTO chunks (hash, size, refcount) VALUES (?, ?, 0)"
+
+COLLECT_CHUNKS = (
+    "DELETE FROM chunks WHERE hash IN (SELECT hash FROM chunks WHERE refcount = 0 LIMIT ?) RETURNING hash"
+)
+
+# Bytes a store without deduplication would hold (current content plus
+# older revisions) against the bytes actually stored.
+DEDUP_STATS = """
+    SELECT
+        (SELECT COUNT(*) FROM files) AS files,
+        (SELECT COALESCE(SUM(size), 0) FROM files) AS file_bytes,
+        (SELECT COALESCE(SUM(file_revisions.size), 0) FROM file_revisions
+         JOIN files ON files.id = file_revisions.file_id
+         WHERE file_revisions.id IS NOT files.revision_id) AS history_bytes,
+        (SELECT COUNT(*) FROM chunks WHERE refcount > 0) AS chunks,
+        (SELECT COALESCE(SUM(size), 0) FROM chunks WHERE refcount > 0) AS chunk_bytes,
+        (SELECT COALESCE(SUM(size), 0) FROM
+            (SELECT MAX(size) AS size FROM files WHERE storage_key IS NOT NULL GROUP BY storage_key)
+        ) AS blob_bytes,
+        (SELECT COALESCE(SUM(size), 0) FROM files
+         WHERE storage_key IS NULL AND revision_id IS NULL) AS inline_bytes
+"""
+
+# Trash listing and restore. Items past the retention period are left to
+# the purger: they are neither listed nor restorable.
+
+TRASHED_FOLDERS = (
+    f"SELECT {FolderRecord.COLUMNS}, deleted_at FROM folders "
+    "WHERE user_id = ? AND deleted_at IS NOT NULL AND deleted_at > datetime('now', ?) ORDER BY deleted_at DESC"
+)
+
+TRASHED_FILES = (
+    f"SELECT {FileRecord.COLUMNS}, deleted_at FROM files "
+    "WHERE user_id = ? AND deleted_at IS NOT NULL AND deleted_at > datetime('now', ?) ORDER BY deleted_at DESC"
+)
+
+TRASHED_FOLDER = (
+    "SELECT parent_folder_id FROM folders "
+    "WHERE id = ? AND user_id = ? AND deleted_at IS NOT NULL AND deleted_at > datetime('now', ?)"
+)
+
+TRASHED_FILE = (
+    "SELECT parent_folder_id FROM files "
+    "WHERE id = ? AND user_id = ? AND deleted_at IS NOT NULL AND deleted_at > datetime('now', ?)"
+)
+
+RESTORE_FOLDER = (
+    "UPDATE folders SET deleted_at = NULL, parent_folder_id = ? "
+    "WHERE id = ? AND deleted_at IS NOT NULL AND deleted_at > datetime('now', ?)"
+)
+
+RESTORE_FILE = (
+    "UPDATE files SET deleted_at = NULL, parent_folder_id = ? "
+    "WHERE id = ? AND deleted_at IS NOT NULL AND deleted_at > datetime('now', ?)"
+)
+
+# Emptying the trash backdates it so the purger takes it at once.
+EXPIRE_TRASHED_FOLDERS = (
+    "UPDATE folders SET deleted_at = '1970-01-01 00:00:00' WHERE user_id = ? AND deleted_at IS NOT NULL"
+)
+
+EXPIRE_TRASHED_FILES = (
+    "UPDATE files SET deleted_at = '1970-01-01 00:00:00' WHERE user_id = ? AND deleted_at IS NOT NULL"
+)
+
+# Purging, in batches of at most ? rows, of trash deleted at or before
+# datetime('now', ?). Children of an expired folder are trashed with the
+# folder's own deleted_at, so they expire with it; the folder is deleted
+# once nothing is left in it.
+
+PURGE_FILES = """
+    DELETE FROM files WHERE id IN (
+        SELECT id FROM files WHERE deleted_at IS NOT NULL AND deleted_at <= datetime('now', ?) LIMIT ?
+    )
+    RETURNING id, user_id, size, storage_key, revision_id
+"""
+
+EXPIRE_FOLDER_FILES = """
+    UPDATE files SET deleted_at = (SELECT deleted_at FROM folders WHERE folders.id = files.parent_folder_id)
+    WHERE id IN (
+        SELECT files.id FROM folders
+        JOIN files ON files.user_id = folders.user_id AND files.parent_folder_id = folders.id
+        WHERE folders.deleted_at IS NOT NULL AND folders.deleted_at <= datetime('now', ?)
+          AND files.deleted_at IS NULL
+        LIMIT ?
+    )
+"""
+
+EXPIRE_SUBFOLDERS = """
+    UPDATE folders SET deleted_at = (
+        SELECT parent.deleted_at FROM folders AS parent WHERE parent.id = folders.parent_folder_id
+    )
+    WHERE id IN (
+        SELECT child.id FROM folders AS parent
+        JOIN folders AS child ON child.user_id = parent.user_id AND child.parent_folder_id = parent.id
+        WHERE parent.deleted_at IS NOT NULL AND parent.deleted_at <= datetime('now', ?)
+          AND child.deleted_at IS NULL
+        LIMIT ?
+    )
+"""
+
+PURGE_EMPTY_FOLDERS = """
+    DELETE FROM folders WHERE id IN (
+        SELECT id FROM folders AS folder
+        WHERE deleted_at IS NOT NULL AND deleted_at <= datetime('now', ?)
+          AND NOT EXISTS (SELECT 1 FROM files WHERE user_id = folder.user_id
+                          AND parent_folder_id = folder.id AND deleted_at IS NULL)
+          AND NOT EXISTS (SELECT 1 FROM files WHERE user_id = folder.user_id
+                          AND parent_folder_id = folder.id AND deleted_at IS NOT NULL)
+          AND NOT EXISTS (SELECT 1 FROM folders WHERE user_id = folder.user_id
+                          AND parent_folder_id = folder.id AND deleted_at IS NULL)
+          AND NOT EXISTS (SELECT 1 FROM folders WHERE user_id = folder.user_id
+                          AND parent_folder_id = folder.id AND deleted_at IS NOT NULL)
+        LIMIT ?
+    )
+"""
+
+# Seconds until the oldest item left in the trash expires, or NULL.
+NEXT_TRASH_EXPIRY = """
+    SELECT (julianday(MIN(deleted_at)) - julianday('now', ?)) * 86400 AS delay FROM (
+        SELECT MIN(deleted_at) AS deleted_at FROM folders WHERE deleted_at IS NOT NULL
+        UNION ALL
+        SELECT MIN(deleted_at) FROM files WHERE deleted_at IS NOT NULL
+    )
+"""
+
+# A purge queued by a delete and not yet started (claimed jobs have attempts > 0).
+PURGE_QUEUED = (
+    "SELECT 1 FROM jobs WHERE status = 'queued' AND kind = 'trash.purge' AND attempts = 0 AND run_at <= ? LIMIT 1"
+)
+
+# Jobs
+
+INSERT_JOB = (
+    "INSERT INTO jobs (kind, payload, max_attempts, run_at, created_at) VALUES (?, ?, ?, ?, ?)"
+)
+
+# Claims the oldest due job by pushing run_at out by the visibility timeout.
+CLAIM_JOB = """
+    UPDATE jobs SET attempts = attempts + 1, run_at = ?
+    WHERE id = (
+        SELECT id FROM jobs WHERE status = 'queued' AND run_at <= ? ORDER BY run_at LIMIT 1
+    )
+    RETURNING id, kind, payload, attempts, max_attempts, created_at
+"""
+
+COMPLETE_JOB = "DELETE FROM jobs WHERE id = ?"
+
+RETRY_JOB = "UPDATE jobs SET run_at = ?, last_error = ? WHERE id = ?"
+
+BURY_JOB = "UPDATE jobs SET status = 'dead', last_error = ? WHERE id = ?"
+
+JOB_DEPTH = "SELECT kind, status, COUNT(*) AS count FROM jobs GROUP BY kind, status"
+
+DEAD_JOBS = (
+    "SELECT id, kind, payload, attempts, created_at, last_error FROM jobs "
+    "WHERE status = 'dead' ORDER BY id DESC LIMIT ?"
+)
@@ -0,0 +1,66 @@
+import sqlite3
+
+from fastapi import HTTPException, status
+
+from app import queries
+from app.config import DEFAULT_STORAGE_QUOTA, MAX_UPLOAD_BYTES
+
+
+def base64_decoded_size(content: str) -> int:
+    """Size of the decoded payload, computed from the base64 text alone."""
+    content = content.rstrip()
+    padding = len(content) - len(content.rstrip("="))
+    return max(len(content) * 3 // 4 - padding, 0)
+
+
+def get_usage(cursor: sqlite3.Cursor, user_id: int) -> dict:
+    cursor.execute(
+        queries.USER_USAGE,
+        (DEFAULT_STORAGE_QUOTA, user_id),
+    )
+    row = cursor.fetchone()
+    used, quota = row["storage_used"], row["storage_quota"]
+    return {"used": used, "quota": quota, "available": max(quota - used, 0)}
+
+
+def check_storage_available(cursor: sqlite3.Cursor, user_id: int, size: int) -> None:
+    """Reject an upload up front, before its content is decoded or stored."""
+    if size > get_usage(cursor, user_id)["available"]:
+        raise quota_exceeded()
+
+
+def check_upload_size(size: int) -> None:
+    """Reject an upload that would be too large to assemble, before it is."""
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload larger than {MAX_UPLOAD_BYTES} bytes",
+        )
+
+
+def reserve_storage(cursor: sqlite3.Cursor, user_id: int, size: int) -> None:
+    """Charge ``size`` bytes to the user, atomically with the quota check.
+
+    Runs in the same transaction as the write it accounts for, so usage can
+    never drift from the stored files.
+    """
+    cursor.execute(
+        queries.RESERVE_STORAGE,
+        (size, user_id, size, DEFAULT_STORAGE_QUOTA),
+    )
+    if cursor.rowcount == 0:
+        raise quota_exceeded()
+
+
+def release_storage(cursor: sqlite3.Cursor, user_id: int, size: int) -> None:
+    cursor.execute(
+        queries.RELEASE_STORAGE,
+        (size, user_id),
+    )
+
+
+def quota_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Storage quota exceeded",
+    )
@@ -0,0 +1,64 @@
+import sqlite3
+from dataclasses import dataclass
+from typing import ClassVar, List, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class UserRecord:
+    COLUMNS: ClassVar[str] = "id, email"
+
+    id: int
+    email: str
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> "UserRecord":
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class FolderRecord:
+    COLUMNS: ClassVar[str] = "id, name, parent_folder_id, created_at"
+
+    id: int
+    name: str
+    parent_folder_id: Optional[int]
+    created_at: str
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> "FolderRecord":
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class FileRecord:
+    COLUMNS: ClassVar[str] = "id, name, size, mime_type, parent_folder_id, created_at, sha256"
+
+    id: int
+    name: str
+    size: int
+    mime_type: Optional[str]
+    parent_folder_id: Optional[int]
+    created_at: str
+    sha256: Optional[str]
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> "FileRecord":
+        return cls(*row)
+
+
+def fetch_one(conn: sqlite3.Connection, record: Type[T], sql: str, parameters=()) -> Optional[T]:
+    """Run ``sql`` and build a record straight from the row tuple.
+
+    The statement must select ``record.COLUMNS`` in order.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = record.from_row
+    return cursor.execute(sql, parameters).fetchone()
+
+
+def fetch_all(conn: sqlite3.Connection, record: Type[T], sql: str, parameters=()) -> List[T]:
+    cursor = conn.cursor()
+    cursor.row_factory = record.from_row
+    return cursor.execute(sql, parameters).fetchall()
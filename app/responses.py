@@ -0,0 +1,165 @@
+"""
+Responses that stream stored blobs.
+
+``BlobResponse`` serves a file from the blob store without buffering it in
+the Python heap:
+
+- When the server offers the ASGI ``http.response.zerocopysend``
+  extension, the open file is handed to the server, which sends it with
+  ``os.sendfile``. uvicorn does not offer it, so this path does not run
+  in the shipped deployment.
+- Otherwise the file is read in ``BLOB_CHUNK_SIZE`` slices with
+  ``os.pread``. Memory use stays at one chunk per download. Like
+  Starlette's FileResponse, opening and reading run in the threadpool:
+  on a cold page cache a read waits for the disk, and that must not
+  stall the event loop and every other connection on the worker.
+
+A single ``Range: bytes=...`` is answered with ``206 Partial Content``
+(reading only that part). Several ranges are answered with the whole
+file, which RFC 9110 allows.
+
+``ChunkedResponse`` does the same for content stored as several files,
+such as a revision's chunks, sending each one in turn.
+"""
+
+import os
+import re
+from typing import Iterator, Mapping, Optional, Sequence, Tuple
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.config import BLOB_CHUNK_SIZE
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return ``(start, end)`` (end exclusive) for a single byte range, or None for the whole file."""
+    if not header:
+        return None
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if match is None:
+        # Multiple or non-byte ranges: serve the whole representation.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class ChunkedResponse(Response):
+    """Sends stored files back to back as one body, e.g. a revision's chunks."""
+
+    def __init__(
+        self,
+        segments: Sequence[Tuple[str, int]],
+        media_type: str = "application/octet-stream",
+        headers: Optional[Mapping[str, str]] = None,
+        range_header: Optional[str] = None,
+        etag: Optional[str] = None,
+        if_range: Optional[str] = None,
+        chunk_size: int = BLOB_CHUNK_SIZE,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.media_type = media_type
+        self.background = background
+        self.size = sum(size for _, size in segments)
+
+        # If-Range: only honour the range if the client's copy is current.
+        if if_range is not None and if_range != etag:
+            range_header = None
+
+        self.status_code = 200
+        self.start, self.end = 0, self.size
+        content_range = None
+        try:
+            byte_range = parse_range(range_header, self.size)
+        except RangeNotSatisfiable:
+            self.status_code = 416
+            self.start = self.end = 0
+            content_range = f"bytes */{self.size}"
+        else:
+            if byte_range is not None:
+                self.status_code = 206
+                self.start, self.end = byte_range
+                content_range = f"bytes {self.start}-{self.end - 1}/{self.size}"
+
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.end - self.start)
+        self.headers["accept-ranges"] = "bytes"
+        if etag is not None:
+            self.headers["etag"] = etag
+        if content_range is not None:
+            self.headers["content-range"] = content_range
+
+    def pieces(self) -> Iterator[Tuple[str, int, int]]:
+        """``(path, offset, count)`` for the parts of each segment in the range."""
+        segment_start = 0
+        for path, size in self.segments:
+            segment_end = segment_start + size
+            if segment_end > self.start and segment_start < self.end:
+                offset = max(self.start - segment_start, 0)
+                yield path, offset, min(segment_end, self.end) - segment_start - offset
+            segment_start = segment_end
+            if segment_start >= self.end:
+                break
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        remaining = self.end - self.start
+        if remaining == 0:
+            await send({"type": "http.response.body", "body": b""})
+        for path, offset, count in self.pieces():
+            remaining -= count
+            f = await anyio.to_thread.run_sync(open, path, "rb")
+            try:
+                if zerocopy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": offset,
+                        "count": count,
+                        "more_body": remaining > 0,
+                    })
+                    continue
+                position, end = offset, offset + count
+                while position < end:
+                    chunk_end = min(position + self.chunk_size, end)
+                    body = await anyio.to_thread.run_sync(os.pread, f.fileno(), chunk_end - position, position)
+                    await send({
+                        "type": "http.response.body",
+                        "body": body,
+                        "more_body": chunk_end < end or remaining > 0,
+                    })
+                    position = chunk_end
+            finally:
+                f.close()
+
+        if self.background is not None:
+            await self.background()
+
+
+class BlobResponse(ChunkedResponse):
+    def __init__(self, path: str, **kwargs):
+        super().__init__([(path, os.stat(path).st_size)], **kwargs)
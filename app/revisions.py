@@ -0,0 +1,152 @@
+"""
+File revisions.
+
+A revision is an immutable list of chunks (see app.chunks). Replacing a
+file's content adds a revision and points ``files.revision_id`` at it.
+Chunks that did not change are shared with the earlier revisions, so
+storage grows with the bytes that changed rather than with the file size.
+Restoring copies an old revision's chunk list into a new revision.
+
+After every change a ``revisions.prune`` job drops revisions beyond the
+newest ``REVISION_KEEP`` and those older than ``REVISION_MAX_AGE_DAYS``.
+The current revision is always kept.
+
+Every upload is stored as the file's first revision. Files stored before
+that have no revisions until their content is replaced; their content is
+a single blob (``storage_key``) or a legacy inline row.
+"""
+
+import json
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app import queries
+from app.chunks import LOOKUP_BATCH, Chunk, acquire, release
+from app.config import REVISION_KEEP, REVISION_MAX_AGE_DAYS
+from app.database import get_db
+from app.jobs import job_handler
+from app.storage import blob_store
+
+# (path, size) of one stored piece of a file, in order.
+Segment = Tuple[str, int]
+
+
+def add_revision(cursor, file_id: int, chunks: Sequence[Chunk], sha256: str) -> int:
+    """Insert a revision made of ``chunks`` in the caller's transaction; returns its id."""
+    cursor.execute(queries.INSERT_REVISION, (file_id, sum(len(chunk.data) for chunk in chunks), sha256))
+    revision_id = cursor.lastrowid
+
+    rows = []
+    position = 0
+    for chunk in chunks:
+        rows.append((revision_id, position, chunk.hash, len(chunk.data)))
+        position += len(chunk.data)
+    cursor.executemany(queries.INSERT_REVISION_CHUNK, rows)
+
+    acquire(
+        cursor,
+        ((chunk.hash, len(chunk.data)) for chunk in chunks),
+        {chunk.hash: chunk.data for chunk in chunks},
+    )
+    return revision_id
+
+
+def copy_revision(cursor, file_id: int, revision_id: int, source_file_id: Optional[int] = None) -> Optional[int]:
+    """Give the file a copy of one of its revisions, or of ``source_file_id``'s.
+
+    Returns the copy's id, or None if that file has no such revision.
+    """
+    source_file_id = file_id if source_file_id is None else source_file_id
+    cursor.execute(queries.COPY_REVISION, (file_id, revision_id, source_file_id))
+    if cursor.rowcount == 0:
+        return None
+    copy_id = cursor.lastrowid
+    cursor.execute(queries.COPY_REVISION_CHUNKS, (copy_id, revision_id))
+    acquire(cursor, chunk_list(cursor, copy_id))
+    return copy_id
+
+
+def owned_chunks(conn, user_id: int, hashes: Sequence[str]) -> Dict[str, int]:
+    """Size by hash of those ``hashes`` that are chunks of the user's stored revisions."""
+    owned = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), LOOKUP_BATCH):
+        batch = json.dumps(hashes[i:i + LOOKUP_BATCH])
+        owned.update((row["hash"], row["size"]) for row in conn.execute(queries.USER_CHUNKS, (batch, user_id)))
+    return owned
+
+
+def revision_exists(revision_id: int) -> bool:
+    with get_db() as conn:
+        return conn.execute(queries.REVISION_BY_ID, (revision_id,)).fetchone() is not None
+
+
+def chunk_list(conn, revision_id: int) -> List[Tuple[str, int]]:
+    """``(hash, size)`` of the revision's chunks, in order."""
+    return [(row["chunk_hash"], row["size"]) for row in conn.execute(queries.REVISION_CHUNKS, (revision_id,))]
+
+
+def segments(conn, revision_id: int) -> List[Segment]:
+    return [(blob_store.path(chunk_hash), size) for chunk_hash, size in chunk_list(conn, revision_id)]
+
+
+def read_revision(revision_id: int, limit: Optional[int] = None) -> bytes:
+    """The revision's content, or its first ``limit`` bytes."""
+    with get_db() as conn:
+        pieces = segments(conn, revision_id)
+
+    parts = []
+    remaining = limit
+    for path, _ in pieces:
+        if remaining is not None and remaining <= 0:
+            break
+        with open(path, "rb") as f:
+            part = f.read() if remaining is None else f.read(remaining)
+        parts.append(part)
+        if remaining is not None:
+            remaining -= len(part)
+    return b"".join(parts)
+
+
+def revision_source(revision_id: int) -> Callable[[int], bytes]:
+    def read(limit: int) -> bytes:
+        return read_revision(revision_id, limit)
+    return read
+
+
+def release_revisions(cursor, revision_ids: Sequence[int]) -> None:
+    """Delete the chunk lists of deleted revisions and drop their references."""
+    hashes = []
+    for revision_id in revision_ids:
+        rows = cursor.execute(queries.DELETE_REVISION_CHUNKS, (revision_id,)).fetchall()
+        hashes.extend(row["chunk_hash"] for row in rows)
+    release(cursor, hashes)
+
+
+def delete_revisions(cursor, file_id: int) -> List[int]:
+    """Delete every revision of the file in the caller's transaction; returns their ids."""
+    revision_ids = [row["id"] for row in cursor.execute(queries.DELETE_FILE_REVISIONS, (file_id,)).fetchall()]
+    release_revisions(cursor, revision_ids)
+    return revision_ids
+
+
+def prune(file_id: int, keep: int = REVISION_KEEP, max_age_days: float = REVISION_MAX_AGE_DAYS) -> int:
+    """Apply the retention policy to one file; returns the number of revisions removed."""
+    max_age = f"-{max_age_days} days" if max_age_days > 0 else None
+    with get_db() as conn:
+        cursor = conn.cursor()
+        pruned = cursor.execute(
+            queries.PRUNE_REVISIONS,
+            (file_id, file_id, file_id, max(keep, 1), max_age),
+        ).fetchall()
+        release_revisions(cursor, [row["id"] for row in pruned])
+    
+    # Imported here: app.thumbnails reads revisions through this module.
+    from app.thumbnails import preview_key, thumbnails
+    for row in pruned:
+        thumbnails.discard(preview_key(file_id, None, row["id"]))
+    return len(pruned)
+
+
+@job_handler("revisions.prune")
+def prune_revisions(payload: dict) -> None:
+    prune(payload["file_id"])
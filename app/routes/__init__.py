@@ -2,10 +2,20 @@ from app.routes.health import router as health_router
 from app.routes.auth import router as auth_router
 from app.routes.folders import router as folders_router
 from app.routes.files import router as files_router
+from app.routes.users import router as users_router
+from app.routes.events import router as events_router
+from app.routes.metrics import router as metrics_router
+from app.routes.admin import router as admin_router
+from app.routes.trash import router as trash_router
 
 __all__ = [
     "health_router",
     "auth_router",
     "folders_router",
     "files_router",
+    "users_router",
+    "events_router",
+    "metrics_router",
+    "admin_router",
+    "trash_router",
 ]
@@ -0,0 +1,42 @@
+import os
+
+from fastapi import APIRouter, Depends, status
+
+from app.auth.dependencies import get_admin_user
+from app.chunks import dedup_report
+from app.config import SLOW_QUERY_MS
+from app.database import query_stats
+from app.jobs import dead_jobs, queue_depth
+from app.maintenance import storage_report
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_admin_user)])
+
+
+@router.get("/query-stats")
+def get_query_stats():
+    """Per-statement timing aggregates for this worker, slowest total first."""
+    return {"worker": os.getpid(), "slow_query_ms": SLOW_QUERY_MS, "statements": query_stats.snapshot()}
+
+
+@router.delete("/query-stats", status_code=status.HTTP_204_NO_CONTENT)
+def reset_query_stats():
+    query_stats.reset()
+    return None
+
+
+@router.get("/storage")
+def get_storage():
+    """Database size, freelist and fragmentation, and the reclaim scheduler's state."""
+    return storage_report()
+
+
+@router.get("/jobs")
+def get_jobs():
+    """Queue depth by status and kind, and the most recent dead jobs."""
+    return {"depth": queue_depth(), "dead": dead_jobs()}
+
+
+@router.get("/dedup")
+def get_dedup():
+    """Logical bytes stored by users against the bytes the deduplicated store holds."""
+    return dedup_report()
@@ -3,6 +3,7 @@ import re
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, EmailStr, field_validator
 
+from app import queries
 from app.database import get_db
 from app.auth.password import hash_password, verify_password
 from app.auth.jwt import create_access_token
@@ -56,7 +57,7 @@ def register(user: UserRegister):
     with get_db() as conn:
         cursor = conn.cursor()
         
-        cursor.execute("SELECT id FROM users WHERE email = ?", (user.email,))
+        cursor.execute(queries.USER_ID_BY_EMAIL, (user.email,))
         if cursor.fetchone():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -65,7 +66,7 @@ def register(user: UserRegister):
         
         password_hash = hash_password(user.password)
         cursor.execute(
-            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            queries.INSERT_USER,
             (user.email, password_hash),
         )
         user_id = cursor.lastrowid
@@ -79,7 +80,7 @@ def login(user: UserLogin):
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT id, password_hash FROM users WHERE email = ?",
+            queries.USER_CREDENTIALS_BY_EMAIL,
             (user.email,),
         )
         row = cursor.fetchone()
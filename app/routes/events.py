@@ -0,0 +1,37 @@
+import json
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.auth.dependencies import get_current_user
+from app.config import EVENT_HEARTBEAT_SECONDS
+from app.events import hub
+from app.records import UserRecord
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+def format_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("")
+async def stream_events(current_user: UserRecord = Depends(get_current_user)):
+    async def event_stream():
+        subscription = hub.subscribe(current_user.id)
+        try:
+            yield ": connected\n\n"
+            while True:
+                event = await subscription.get(timeout=EVENT_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield format_event(event)
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
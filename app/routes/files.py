@@ -1,21 +1,60 @@
 import base64
+import hashlib
 import mimetypes
-from typing import Optional
+import re
+from concurrent.futures import TimeoutError as RenderTimeout
+from dataclasses import asdict
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import Response
 from pydantic import BaseModel
 
+from app import queries
+from app.config import THUMBNAIL_RENDER_TIMEOUT, THUMBNAIL_SIZES
 from app.database import get_db
+from app.download_cache import download_cache
 from app.auth.dependencies import get_current_user, get_user_file
+from app.chunks import abandon as abandon_chunks, split, store as store_chunks
+from app.events import hub
+from app.jobs import enqueue
+from app.profiling import span
+from app.responses import BlobResponse, ChunkedResponse
+from app.quotas import base64_decoded_size, check_storage_available, check_upload_size, release_storage, reserve_storage
+from app.records import FileRecord, UserRecord, fetch_one
+from app.revisions import (
+    add_revision,
+    chunk_list,
+    copy_revision,
+    owned_chunks,
+    read_revision,
+    revision_source,
+    segments,
+)
+from app.storage import blob_store
+from app.trash import schedule_purge
+from app.thumbnails import file_source, preview_key, preview_kind, thumbnails
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 
+class ChunkUpload(BaseModel):
+    # The chunk's base64 content, or the hex SHA-256 of a chunk of one of the
+    # user's files (see GET /files/{file_id}/chunks).
+    content: Optional[str] = None
+    sha256: Optional[str] = None
+
+
 class FileCreate(BaseModel):
     name: str
-    content: str
+    content: Optional[str] = None
+    # Instead of content: the content as a list of new and already stored chunks.
+    chunks: Optional[List[ChunkUpload]] = None
     parent_folder_id: Optional[int] = None
+    # Hex SHA-256 of the decoded content. Sent with content, the upload is
+    # rejected if it does not match; sent alone, the file is created from
+    # content the user already stores.
+    sha256: Optional[str] = None
 
 
 class FileUpdate(BaseModel):
@@ -23,6 +62,25 @@ class FileUpdate(BaseModel):
     parent_folder_id: Optional[int] = None
 
 
+class ContentUpdate(BaseModel):
+    content: Optional[str] = None
+    chunks: Optional[List[ChunkUpload]] = None
+    sha256: Optional[str] = None
+
+
+class ChunkResponse(BaseModel):
+    sha256: str
+    size: int
+
+
+class RevisionResponse(BaseModel):
+    id: int
+    size: int
+    sha256: str
+    created_at: str
+    current: bool
+
+
 class FileResponse(BaseModel):
     id: int
     name: str
@@ -30,76 +88,292 @@ class FileResponse(BaseModel):
     mime_type: Optional[str]
     parent_folder_id: Optional[int]
     created_at: str
+    sha256: Optional[str]
 
 
-@router.post("", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
-def create_file(
-    file: FileCreate,
-    current_user: dict = Depends(get_current_user),
-):
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def parse_sha256(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = value.lower()
+    if SHA256_PATTERN.fullmatch(value) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sha256 must be 64 hexadecimal characters",
+        )
+    return value
+
+
+def decode_base64(content: str) -> bytes:
     try:
-        decoded_content = base64.b64decode(file.content)
-        size = len(decoded_content)
+        with span("files.base64_decode"):
+            return base64.b64decode(content)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid base64 content",
         )
+
+
+def check_sha256(content: bytes, expected_sha256: Optional[str]) -> str:
+    with span("files.sha256"):
+        sha256 = hashlib.sha256(content).hexdigest()
+    if expected_sha256 is not None and expected_sha256 != sha256:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Content does not match sha256",
+        )
+    return sha256
+
+
+def decode_content(content: str, expected_sha256: Optional[str]) -> Tuple[bytes, str]:
+    """Decode uploaded base64 content; returns it with its SHA-256."""
+    decoded = decode_base64(content)
+    return decoded, check_sha256(decoded, expected_sha256)
+
+
+def check_upload(user_id: int, size: int, current_size: int) -> None:
+    """Reject content of this size before it is decoded or assembled.
+
+    Only growth over ``current_size`` is charged against the quota.
+    """
+    check_upload_size(size)
+    if size > current_size:
+        with get_db() as conn:
+            check_storage_available(conn.cursor(), user_id, size - current_size)
+
+
+def assemble_chunks(
+    uploads: List[ChunkUpload],
+    user_id: int,
+    expected_sha256: Optional[str],
+    current_size: int,
+) -> Tuple[bytes, str]:
+    """Rebuild delta-uploaded content from new chunks and the user's stored ones.
+
+    Only chunks of the user's own files may be referenced, so a hash reveals
+    nothing about other users' content. The size is known from the stored
+    chunks, so it is checked before any of them is read. The result is
+    chunked again like any upload, so the client's chunk boundaries do not
+    matter.
+    """
+    references = []
+    for upload in uploads:
+        if (upload.content is None) == (upload.sha256 is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Each chunk needs either content or sha256",
+            )
+        if upload.sha256 is not None:
+            references.append(parse_sha256(upload.sha256))
+    
+    with get_db() as conn:
+        sizes = owned_chunks(conn, user_id, set(references))
+    unknown = set(references) - sizes.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown chunk {min(unknown)}",
+        )
+    
+    size = sum(sizes[chunk_hash] for chunk_hash in references)
+    size += sum(base64_decoded_size(upload.content) for upload in uploads if upload.content is not None)
+    check_upload(user_id, size, current_size)
     
+    parts = []
+    pending = iter(references)
+    for upload in uploads:
+        if upload.content is not None:
+            parts.append(decode_base64(upload.content))
+            continue
+        chunk_hash = next(pending)
+        try:
+            parts.append(blob_store.read(chunk_hash))
+        except FileNotFoundError:
+            # Its last file was deleted since the check above.
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Chunk {chunk_hash} is no longer stored; retry",
+            )
+    content = b"".join(parts)
+    return content, check_sha256(content, expected_sha256)
+
+
+def uploaded_content(
+    content: Optional[str],
+    chunks: Optional[List[ChunkUpload]],
+    expected_sha256: Optional[str],
+    user_id: int,
+    current_size: int = 0,
+) -> Tuple[bytes, str]:
+    """Decode or assemble uploaded content, once its size has been checked.
+
+    ``current_size`` is the size of the content being replaced, if any.
+    """
+    if (content is None) == (chunks is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Send either content or chunks",
+        )
+    if chunks is not None:
+        return assemble_chunks(chunks, user_id, expected_sha256, current_size)
+    check_upload(user_id, base64_decoded_size(content), current_size)
+    return decode_content(content, expected_sha256)
+
+
+def check_parent_folder(cursor, folder_id: Optional[int], user_id: int) -> None:
+    if folder_id is None:
+        return
+    cursor.execute(
+        queries.FOLDER_EXISTS_FOR_USER,
+        (folder_id, user_id),
+    )
+    if cursor.fetchone() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Parent folder not found",
+        )
+
+
+def create_from_known_content(file: FileCreate, sha256: str, user_id: int) -> Optional[FileRecord]:
+    """Create the file from the content of the user's file with this hash.
+
+    A blob is shared; a revision is copied, sharing its chunks. Returns
+    None if the user has no such file.
+    """
     mime_type, _ = mimetypes.guess_type(file.name)
     
     with get_db() as conn:
         cursor = conn.cursor()
         
-        if file.parent_folder_id is not None:
+        check_parent_folder(cursor, file.parent_folder_id, user_id)
+        
+        row = cursor.execute(
+            queries.INSERT_FILE_FROM_CONTENT,
+            (file.name, mime_type, file.parent_folder_id, user_id, sha256),
+        ).fetchone()
+        if row is None:
+            return None
+        
+        if row["revision_id"] is not None:
+            source = cursor.execute(queries.REVISION_BY_ID, (row["revision_id"],)).fetchone()
+            revision_id = copy_revision(cursor, row["id"], source["id"], source["file_id"])
             cursor.execute(
-                "SELECT id FROM folders WHERE id = ? AND user_id = ?",
-                (file.parent_folder_id, current_user["id"]),
+                queries.SET_FILE_REVISION,
+                (revision_id, source["size"], source["sha256"], row["id"], source["id"], None),
             )
-            if cursor.fetchone() is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Parent folder not found",
-                )
-        
-        cursor.execute(
-            "INSERT INTO files (name, content, size, mime_type, user_id, parent_folder_id) VALUES (?, ?, ?, ?, ?, ?)",
-            (file.name, file.content, size, mime_type, current_user["id"], file.parent_folder_id),
-        )
-        file_id = cursor.lastrowid
+            queue_preview(cursor, row["id"], revision_id, mime_type)
         
-        cursor.execute(
-            "SELECT id, name, size, mime_type, parent_folder_id, created_at FROM files WHERE id = ?",
-            (file_id,),
+        created = fetch_one(
+            conn,
+            FileRecord,
+            queries.FILE_BY_ID,
+            (row["id"],),
         )
-        row = cursor.fetchone()
-        
-        return {
-            "id": row["id"],
-            "name": row["name"],
-            "size": row["size"],
-            "mime_type": row["mime_type"],
-            "parent_folder_id": row["parent_folder_id"],
-            "created_at": row["created_at"],
-        }
+        # Each file counts against the quota, shared blob or not.
+        reserve_storage(cursor, user_id, created.size)
+    
+    return created
+
+
+@router.post("", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
+def create_file(
+    file: FileCreate,
+    current_user: UserRecord = Depends(get_current_user),
+):
+    expected_sha256 = parse_sha256(file.sha256)
+    
+    if file.content is None and file.chunks is None:
+        if expected_sha256 is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Either content or sha256 must be provided",
+            )
+        created = create_from_known_content(file, expected_sha256, current_user.id)
+        if created is None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="No file with this sha256; upload the content",
+            )
+        hub.publish(current_user.id, "file.created", **asdict(created))
+        return created
+    
+    decoded_content, sha256 = uploaded_content(file.content, file.chunks, expected_sha256, current_user.id)
+    size = len(decoded_content)
+    
+    # Content the user already stores is not written again. If the other
+    # file is deleted in the meantime, fall through and store it.
+    with get_db() as conn:
+        known = conn.execute(queries.CONTENT_SIZE_FOR_USER, (current_user.id, sha256)).fetchone()
+    if known is not None:
+        created = create_from_known_content(file, sha256, current_user.id)
+        if created is not None:
+            hub.publish(current_user.id, "file.created", **asdict(created))
+            return created
+    
+    mime_type, _ = mimetypes.guess_type(file.name)
+    
+    with span("files.chunk"):
+        chunks = split(decoded_content)
+    
+    # New chunks are written before the transaction so the write lock is not
+    # held for the disk I/O; they are left to the collector if the insert fails.
+    with span("files.blob_write"):
+        written = store_chunks(chunks)
+    
+    try:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            
+            check_parent_folder(cursor, file.parent_folder_id, current_user.id)
+            
+            reserve_storage(cursor, current_user.id, size)
+            
+            cursor.execute(
+                queries.INSERT_FILE,
+                (file.name, size, mime_type, current_user.id, file.parent_folder_id, None, sha256),
+            )
+            file_id = cursor.lastrowid
+            
+            # The upload is the file's first revision.
+            revision_id = add_revision(cursor, file_id, chunks, sha256)
+            cursor.execute(queries.SET_FILE_REVISION, (revision_id, size, sha256, file_id, None, None))
+            
+            queue_preview(cursor, file_id, revision_id, mime_type)
+            
+            created = fetch_one(
+                conn,
+                FileRecord,
+                queries.FILE_BY_ID,
+                (file_id,),
+            )
+    except BaseException:
+        abandon_chunks(written)
+        raise
+    
+    hub.publish(current_user.id, "file.created", **asdict(created))
+    return created
 
 
 @router.get("/{file_id}", response_model=FileResponse)
-def get_file(file: dict = Depends(get_user_file)):
+def get_file(file: FileRecord = Depends(get_user_file)):
     return file
 
 
 @router.get("/{file_id}/download")
 def download_file(
     file_id: int,
-    current_user: dict = Depends(get_current_user),
+    request: Request,
+    current_user: UserRecord = Depends(get_current_user),
 ):
     with get_db() as conn:
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT name, content, mime_type FROM files WHERE id = ? AND user_id = ?",
-            (file_id, current_user["id"]),
+            queries.FILE_DOWNLOAD_FOR_USER,
+            (file_id, current_user.id),
         )
         row = cursor.fetchone()
         
@@ -109,28 +383,162 @@ def download_file(
                 detail="File not found",
             )
         
+        revision_id = row["revision_id"]
+        if revision_id is not None:
+            pieces = segments(conn, revision_id)
+    
+    headers = {"Content-Disposition": f'attachment; filename="{row["name"]}"'}
+    media_type = row["mime_type"] or "application/octet-stream"
+    storage_key = row["storage_key"]
+    range_header = request.headers.get("range")
+    # Range requests on stored files are sliced from disk instead of the cache.
+    ranged = range_header is not None and (storage_key is not None or revision_id is not None)
+    cacheable = download_cache.cacheable(row["size"]) and not ranged
+    
+    # The storage key or revision changes with the content, so it versions the entry.
+    version = f"rev{revision_id}" if revision_id is not None else storage_key or "inline"
+    content = download_cache.get(file_id, version) if cacheable else None
+    if content is not None:
+        return Response(content=content, media_type=media_type, headers=headers)
+    
+    if revision_id is not None:
+        if not cacheable:
+            return ChunkedResponse(
+                pieces,
+                media_type=media_type,
+                headers=headers,
+                range_header=range_header,
+                etag=f'"{row["sha256"]}"',
+                if_range=request.headers.get("if-range"),
+            )
+        content = read_revision(revision_id)
+    elif storage_key is not None:
+        if not cacheable:
+            return BlobResponse(
+                blob_store.path(storage_key),
+                media_type=media_type,
+                headers=headers,
+                range_header=range_header,
+                etag=f'"{storage_key}"',
+                if_range=request.headers.get("if-range"),
+            )
+        content = blob_store.read(storage_key)
+    else:
+        # Legacy rows not yet moved out by migrate_blobs.py.
+        with get_db() as conn:
+            inline = conn.execute(queries.FILE_INLINE_CONTENT, (file_id,)).fetchone()
+        if inline is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found",
+            )
         try:
-            decoded_content = base64.b64decode(row["content"])
+            with span("files.base64_decode"):
+                content = base64.b64decode(inline["content"])
         except Exception:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to decode file content",
             )
-        
-        return Response(
-            content=decoded_content,
-            media_type=row["mime_type"] or "application/octet-stream",
-            headers={
-                "Content-Disposition": f'attachment; filename="{row["name"]}"'
-            },
+    
+    if cacheable:
+        download_cache.put(file_id, version, content)
+    
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def queue_preview(cursor, file_id: int, revision_id: int, mime_type: Optional[str]) -> None:
+    """Queue rendering of the revision's previews, in the caller's transaction.
+
+    Committed with the change, so the job exists exactly when the content does.
+    """
+    if preview_kind(mime_type) is not None:
+        enqueue(cursor, "thumbnails.render", {
+            "revision_id": revision_id,
+            "source_key": preview_key(file_id, None, revision_id),
+            "mime_type": mime_type,
+        })
+
+
+def inline_source(file_id: int):
+    def read(limit: int) -> bytes:
+        with get_db() as conn:
+            row = conn.execute(queries.FILE_INLINE_CONTENT, (file_id,)).fetchone()
+        return base64.b64decode(row["content"])[:limit] if row else b""
+    return read
+
+
+@router.get("/{file_id}/thumbnail")
+def get_thumbnail(
+    file_id: int,
+    request: Request,
+    size: int = Query(128),
+    current_user: UserRecord = Depends(get_current_user),
+):
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"size must be one of {', '.join(map(str, THUMBNAIL_SIZES))}",
         )
+    
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            queries.FILE_PREVIEW_SOURCE,
+            (file_id, current_user.id),
+        )
+        row = cursor.fetchone()
+    
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+    
+    source_key = preview_key(file_id, row["storage_key"], row["revision_id"])
+    # The key changes whenever the content does, so it doubles as the ETag.
+    headers = {
+        "Cache-Control": "private, max-age=86400",
+        "ETag": f'"{thumbnails.key(source_key, size)}"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if row["revision_id"] is not None:
+        source = revision_source(row["revision_id"])
+    elif row["storage_key"] is not None:
+        source = file_source(blob_store.path(row["storage_key"]))
+    else:
+        source = inline_source(file_id)
+    
+    try:
+        with span("files.thumbnail"):
+            derivative = thumbnails.get(source_key, row["mime_type"], size, source, THUMBNAIL_RENDER_TIMEOUT)
+    except RenderTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Preview is still being generated",
+            headers={"Retry-After": "1"},
+        )
+    
+    if derivative is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No preview available for this file",
+        )
+    
+    return BlobResponse(derivative.path, media_type=derivative.media_type, headers=headers)
 
 
 @router.patch("/{file_id}", response_model=FileResponse)
 def update_file(
     file_update: FileUpdate,
-    file: dict = Depends(get_user_file),
-    current_user: dict = Depends(get_current_user),
+    file: FileRecord = Depends(get_user_file),
+    current_user: UserRecord = Depends(get_current_user),
 ):
     if file_update.name is None and file_update.parent_folder_id is None:
         raise HTTPException(
@@ -141,14 +549,14 @@ def update_file(
     with get_db() as conn:
         cursor = conn.cursor()
         
-        new_name = file_update.name if file_update.name else file["name"]
-        new_parent = file_update.parent_folder_id if file_update.parent_folder_id is not None else file["parent_folder_id"]
+        new_name = file_update.name if file_update.name else file.name
+        new_parent = file_update.parent_folder_id if file_update.parent_folder_id is not None else file.parent_folder_id
         
         if file_update.parent_folder_id is not None:
             if file_update.parent_folder_id != 0:
                 cursor.execute(
-                    "SELECT id FROM folders WHERE id = ? AND user_id = ?",
-                    (file_update.parent_folder_id, current_user["id"]),
+                    queries.FOLDER_EXISTS_FOR_USER,
+                    (file_update.parent_folder_id, current_user.id),
                 )
                 if cursor.fetchone() is None:
                     raise HTTPException(
@@ -161,29 +569,212 @@ def update_file(
         mime_type, _ = mimetypes.guess_type(new_name)
         
         cursor.execute(
-            "UPDATE files SET name = ?, mime_type = ?, parent_folder_id = ? WHERE id = ?",
-            (new_name, mime_type, new_parent, file["id"]),
+            queries.UPDATE_FILE,
+            (new_name, mime_type, new_parent, file.id),
         )
         
-        cursor.execute(
-            "SELECT id, name, size, mime_type, parent_folder_id, created_at FROM files WHERE id = ?",
-            (file["id"],),
+        updated = fetch_one(
+            conn,
+            FileRecord,
+            queries.FILE_BY_ID,
+            (file.id,),
         )
-        row = cursor.fetchone()
+    
+    if updated.name != file.name:
+        hub.publish(current_user.id, "file.renamed", **asdict(updated))
+    if updated.parent_folder_id != file.parent_folder_id:
+        hub.publish(current_user.id, "file.moved", **asdict(updated))
+    return updated
+
+
+def stored_content(file_id: int, storage_key: Optional[str]) -> bytes:
+    """Content of a file that has no revisions yet."""
+    if storage_key is not None:
+        try:
+            return blob_store.read(storage_key)
+        except FileNotFoundError:
+            # Deleted since the caller looked it up.
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found",
+            )
+    with get_db() as conn:
+        row = conn.execute(queries.FILE_INLINE_CONTENT, (file_id,)).fetchone()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+    return base64.b64decode(row["content"])
+
+
+def switch_revision(cursor, file_id: int, user_id: int, state, revision_id: int, size: int, sha256: str) -> None:
+    """Make ``revision_id`` current, provided the file still has the content in ``state``."""
+    cursor.execute(
+        queries.SET_FILE_REVISION,
+        (revision_id, size, sha256, file_id, state["revision_id"], state["storage_key"]),
+    )
+    if cursor.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File content was changed by another request; retry",
+        )
+    
+    if size > state["size"]:
+        reserve_storage(cursor, user_id, size - state["size"])
+    elif size < state["size"]:
+        release_storage(cursor, user_id, state["size"] - size)
+    
+    enqueue(cursor, "revisions.prune", {"file_id": file_id})
+
+
+def content_replaced(file: FileRecord, state, blob_shared: bool) -> None:
+    """Drop what the previous content left behind, once the change is committed."""
+    # Only the current content is previewed; an older revision's previews are stale.
+    if state["revision_id"] is not None:
+        thumbnails.discard(preview_key(file.id, None, state["revision_id"]))
+    # Content from before the file had revisions: a blob or a legacy inline row.
+    elif not blob_shared:
+        if state["storage_key"] is not None:
+            blob_store.delete(state["storage_key"])
+        thumbnails.discard(preview_key(file.id, state["storage_key"]))
+    download_cache.invalidate(file.id)
+
+
+@router.put("/{file_id}/content", response_model=FileResponse)
+def update_file_content(
+    update: ContentUpdate,
+    file: FileRecord = Depends(get_user_file),
+    current_user: UserRecord = Depends(get_current_user),
+):
+    # Only growth is charged, checked before decoding or assembling.
+    decoded_content, sha256 = uploaded_content(
+        update.content, update.chunks, parse_sha256(update.sha256), current_user.id, file.size
+    )
+    
+    # Checked again against the size the content has now.
+    with get_db() as conn:
+        state = conn.execute(queries.FILE_CONTENT_STATE, (file.id,)).fetchone()
+        if state is not None and len(decoded_content) > state["size"]:
+            check_storage_available(conn.cursor(), current_user.id, len(decoded_content) - state["size"])
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+    
+    with span("files.chunk"):
+        chunks = split(decoded_content)
+        # The first update keeps the content the file had as its first revision.
+        base_chunks = None
+        if state["revision_id"] is None:
+            base_content = stored_content(file.id, state["storage_key"])
+            base_chunks = split(base_content)
+            base_sha256 = hashlib.sha256(base_content).hexdigest()
+    
+    # Like create_file, new chunks are written before the transaction.
+    with span("files.blob_write"):
+        written = store_chunks(chunks + (base_chunks or []))
+    
+    try:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            
+            if base_chunks is not None:
+                add_revision(cursor, file.id, base_chunks, base_sha256)
+            revision_id = add_revision(cursor, file.id, chunks, sha256)
+            switch_revision(cursor, file.id, current_user.id, state, revision_id, len(decoded_content), sha256)
+            
+            blob_shared = (
+                state["storage_key"] is not None
+                and cursor.execute(queries.BLOB_IN_USE, (state["storage_key"],)).fetchone() is not None
+            )
+            queue_preview(cursor, file.id, revision_id, file.mime_type)
+            
+            updated = fetch_one(
+                conn,
+                FileRecord,
+                queries.FILE_BY_ID,
+                (file.id,),
+            )
+    except BaseException:
+        abandon_chunks(written)
+        raise
+    
+    content_replaced(file, state, blob_shared)
+    hub.publish(current_user.id, "file.updated", **asdict(updated))
+    return updated
+
+
+@router.get("/{file_id}/chunks", response_model=List[ChunkResponse])
+def list_chunks(file: FileRecord = Depends(get_user_file)):
+    """The current content's chunks in order; empty for files stored before chunking."""
+    with get_db() as conn:
+        state = conn.execute(queries.FILE_CONTENT_STATE, (file.id,)).fetchone()
+        if state is None or state["revision_id"] is None:
+            return []
+        return [{"sha256": chunk_hash, "size": size} for chunk_hash, size in chunk_list(conn, state["revision_id"])]
+
+
+@router.get("/{file_id}/revisions", response_model=List[RevisionResponse])
+def list_revisions(file: FileRecord = Depends(get_user_file)):
+    with get_db() as conn:
+        state = conn.execute(queries.FILE_CONTENT_STATE, (file.id,)).fetchone()
+        rows = conn.execute(queries.FILE_REVISIONS, (file.id,)).fetchall()
+    
+    current = state["revision_id"] if state is not None else None
+    return [{**dict(row), "current": row["id"] == current} for row in rows]
+
+
+@router.post("/{file_id}/revisions/{revision_id}/restore", response_model=FileResponse)
+def restore_revision(
+    revision_id: int,
+    file: FileRecord = Depends(get_user_file),
+    current_user: UserRecord = Depends(get_current_user),
+):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        
+        state = cursor.execute(queries.FILE_CONTENT_STATE, (file.id,)).fetchone()
+        restored_id = copy_revision(cursor, file.id, revision_id) if state is not None else None
+        if restored_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Revision not found",
+            )
+        
+        restored = cursor.execute(queries.REVISION_BY_ID, (restored_id,)).fetchone()
+        switch_revision(cursor, file.id, current_user.id, state, restored_id, restored["size"], restored["sha256"])
+        queue_preview(cursor, file.id, restored_id, file.mime_type)
         
-        return {
-            "id": row["id"],
-            "name": row["name"],
-            "size": row["size"],
-            "mime_type": row["mime_type"],
-            "parent_folder_id": row["parent_folder_id"],
-            "created_at": row["created_at"],
-        }
+        updated = fetch_one(
+            conn,
+            FileRecord,
+            queries.FILE_BY_ID,
+            (file.id,),
+        )
+    
+    content_replaced(file, state, blob_shared=False)
+    hub.publish(current_user.id, "file.updated", **asdict(updated))
+    return updated
 
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_file(file: dict = Depends(get_user_file)):
+def delete_file(
+    file: FileRecord = Depends(get_user_file),
+    current_user: UserRecord = Depends(get_current_user),
+):
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM files WHERE id = ?", (file["id"],))
-        return None
+        cursor.execute(queries.TRASH_FILE, (file.id,))
+        schedule_purge(cursor)
+    
+    download_cache.invalidate(file.id)
+    
+    hub.publish(
+        current_user.id,
+        "file.deleted",
+        id=file.id,
+        parent_folder_id=file.parent_folder_id,
+    )
+    return None
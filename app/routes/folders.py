@@ -1,10 +1,17 @@
+from dataclasses import asdict
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
+from app import queries
 from app.database import get_db
 from app.auth.dependencies import get_current_user, get_user_folder
+from app.events import hub
+from app.records import FileRecord, FolderRecord, UserRecord, fetch_all, fetch_one
+from app.routes.files import FileResponse
+from app.trash import schedule_purge
 
 router = APIRouter(prefix="/folders", tags=["folders"])
 
@@ -30,65 +37,50 @@ class FolderContentsResponse(BaseModel):
     name: str
     parent_folder_id: Optional[int]
     created_at: str
-    subfolders: List[dict]
-    files: List[dict]
+    subfolders: List[FolderResponse]
+    files: List[FileResponse]
 
 
 class RootContentsResponse(BaseModel):
-    folders: List[dict]
-    files: List[dict]
+    folders: List[FolderResponse]
+    files: List[FileResponse]
 
 
-@router.get("/root", response_model=RootContentsResponse)
-def get_root_contents(current_user: dict = Depends(get_current_user)):
+# Listings can hold thousands of rows built straight from the database, so
+# they skip response_model validation and are serialized with orjson; the
+# models still document the response schema.
+@router.get("/root", response_model=RootContentsResponse, response_class=ORJSONResponse)
+def get_root_contents(current_user: UserRecord = Depends(get_current_user)):
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT id, name, parent_folder_id, created_at FROM folders WHERE parent_folder_id IS NULL AND user_id = ?",
-            (current_user["id"],),
+        folders = fetch_all(
+            conn,
+            FolderRecord,
+            queries.ROOT_FOLDERS,
+            (current_user.id,),
         )
-        folders = [
-            {
-                "id": row["id"],
-                "name": row["name"],
-                "parent_folder_id": row["parent_folder_id"],
-                "created_at": row["created_at"],
-            }
-            for row in cursor.fetchall()
-        ]
         
-        cursor.execute(
-            "SELECT id, name, size, mime_type, parent_folder_id, created_at FROM files WHERE parent_folder_id IS NULL AND user_id = ?",
-            (current_user["id"],),
+        files = fetch_all(
+            conn,
+            FileRecord,
+            queries.ROOT_FILES,
+            (current_user.id,),
         )
-        files = [
-            {
-                "id": row["id"],
-                "name": row["name"],
-                "size": row["size"],
-                "mime_type": row["mime_type"],
-                "parent_folder_id": row["parent_folder_id"],
-                "created_at": row["created_at"],
-            }
-            for row in cursor.fetchall()
-        ]
         
-        return {"folders": folders, "files": files}
+        return ORJSONResponse({"folders": folders, "files": files})
 
 
 @router.post("", response_model=FolderResponse, status_code=status.HTTP_201_CREATED)
 def create_folder(
     folder: FolderCreate,
-    current_user: dict = Depends(get_current_user),
+    current_user: UserRecord = Depends(get_current_user),
 ):
     with get_db() as conn:
         cursor = conn.cursor()
         
         if folder.parent_folder_id is not None:
             cursor.execute(
-                "SELECT id FROM folders WHERE id = ? AND user_id = ?",
-                (folder.parent_folder_id, current_user["id"]),
+                queries.FOLDER_EXISTS_FOR_USER,
+                (folder.parent_folder_id, current_user.id),
             )
             if cursor.fetchone() is None:
                 raise HTTPException(
@@ -97,128 +89,90 @@ def create_folder(
                 )
         
         cursor.execute(
-            "INSERT INTO folders (name, user_id, parent_folder_id) VALUES (?, ?, ?)",
-            (folder.name, current_user["id"], folder.parent_folder_id),
+            queries.INSERT_FOLDER,
+            (folder.name, current_user.id, folder.parent_folder_id),
         )
-        folder_id = cursor.lastrowid
-        
-        cursor.execute(
-            "SELECT id, name, parent_folder_id, created_at FROM folders WHERE id = ?",
-            (folder_id,),
+        created = fetch_one(
+            conn,
+            FolderRecord,
+            queries.FOLDER_BY_ID,
+            (cursor.lastrowid,),
         )
-        row = cursor.fetchone()
-        
-        return {
-            "id": row["id"],
-            "name": row["name"],
-            "parent_folder_id": row["parent_folder_id"],
-            "created_at": row["created_at"],
-        }
+    
+    hub.publish(current_user.id, "folder.created", **asdict(created))
+    return created
 
 
-@router.get("/{folder_id}", response_model=FolderContentsResponse)
+@router.get("/{folder_id}", response_model=FolderContentsResponse, response_class=ORJSONResponse)
 def get_folder(
-    folder: dict = Depends(get_user_folder),
-    current_user: dict = Depends(get_current_user),
+    folder: FolderRecord = Depends(get_user_folder),
+    current_user: UserRecord = Depends(get_current_user),
 ):
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT id, name, parent_folder_id, created_at FROM folders WHERE parent_folder_id = ? AND user_id = ?",
-            (folder["id"], current_user["id"]),
+        subfolders = fetch_all(
+            conn,
+            FolderRecord,
+            queries.SUBFOLDERS,
+            (folder.id, current_user.id),
         )
-        subfolders = [
-            {
-                "id": row["id"],
-                "name": row["name"],
-                "parent_folder_id": row["parent_folder_id"],
-                "created_at": row["created_at"],
-            }
-            for row in cursor.fetchall()
-        ]
         
-        cursor.execute(
-            "SELECT id, name, size, mime_type, parent_folder_id, created_at FROM files WHERE parent_folder_id = ? AND user_id = ?",
-            (folder["id"], current_user["id"]),
+        files = fetch_all(
+            conn,
+            FileRecord,
+            queries.FOLDER_FILES,
+            (folder.id, current_user.id),
         )
-        files = [
-            {
-                "id": row["id"],
-                "name": row["name"],
-                "size": row["size"],
-                "mime_type": row["mime_type"],
-                "parent_folder_id": row["parent_folder_id"],
-                "created_at": row["created_at"],
-            }
-            for row in cursor.fetchall()
-        ]
         
-        return {
-            "id": folder["id"],
-            "name": folder["name"],
-            "parent_folder_id": folder["parent_folder_id"],
-            "created_at": folder["created_at"],
+        return ORJSONResponse({
+            "id": folder.id,
+            "name": folder.name,
+            "parent_folder_id": folder.parent_folder_id,
+            "created_at": folder.created_at,
             "subfolders": subfolders,
             "files": files,
-        }
+        })
 
 
 @router.patch("/{folder_id}", response_model=FolderResponse)
 def update_folder(
     folder_update: FolderUpdate,
-    folder: dict = Depends(get_user_folder),
+    folder: FolderRecord = Depends(get_user_folder),
+    current_user: UserRecord = Depends(get_current_user),
 ):
     with get_db() as conn:
         cursor = conn.cursor()
         
         cursor.execute(
-            "UPDATE folders SET name = ? WHERE id = ?",
-            (folder_update.name, folder["id"]),
+            queries.RENAME_FOLDER,
+            (folder_update.name, folder.id),
         )
         
-        cursor.execute(
-            "SELECT id, name, parent_folder_id, created_at FROM folders WHERE id = ?",
-            (folder["id"],),
+        updated = fetch_one(
+            conn,
+            FolderRecord,
+            queries.FOLDER_BY_ID,
+            (folder.id,),
         )
-        row = cursor.fetchone()
-        
-        return {
-            "id": row["id"],
-            "name": row["name"],
-            "parent_folder_id": row["parent_folder_id"],
-            "created_at": row["created_at"],
-        }
+    
+    hub.publish(current_user.id, "folder.renamed", **asdict(updated))
+    return updated
 
 
 @router.delete("/{folder_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_folder(
-    folder: dict = Depends(get_user_folder),
-    current_user: dict = Depends(get_current_user),
+    folder: FolderRecord = Depends(get_user_folder),
+    current_user: UserRecord = Depends(get_current_user),
 ):
+    # Moves the whole subtree to the trash; see app.trash.
     with get_db() as conn:
         cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT COUNT(*) as count FROM folders WHERE parent_folder_id = ?",
-            (folder["id"],),
-        )
-        if cursor.fetchone()["count"] > 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Folder is not empty. Delete subfolders first.",
-            )
-        
-        cursor.execute(
-            "SELECT COUNT(*) as count FROM files WHERE parent_folder_id = ?",
-            (folder["id"],),
-        )
-        if cursor.fetchone()["count"] > 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Folder is not empty. Delete files first.",
-            )
-        
-        cursor.execute("DELETE FROM folders WHERE id = ?", (folder["id"],))
-        
-        return None
+        cursor.execute(queries.TRASH_FOLDER, (folder.id,))
+        schedule_purge(cursor)
+    
+    hub.publish(
+        current_user.id,
+        "folder.deleted",
+        id=folder.id,
+        parent_folder_id=folder.parent_folder_id,
+    )
+    return None
@@ -0,0 +1,19 @@
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of the process metrics.
+
+    Each worker process keeps its own metrics, so every sample carries the
+    worker's pid: a scrape that reaches another worker adds series instead
+    of making counters jump back.
+    """
+    return PlainTextResponse(REGISTRY.render(worker=str(os.getpid())), media_type=CONTENT_TYPE)
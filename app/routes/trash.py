@@ -0,0 +1,130 @@
+from dataclasses import asdict
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+
+from app import queries
+from app.database import get_db
+from app.auth.dependencies import get_current_user
+from app.events import hub
+from app.records import FileRecord, FolderRecord, UserRecord, fetch_one
+from app.routes.files import FileResponse
+from app.routes.folders import FolderResponse
+from app.trash import retention, schedule_purge
+
+router = APIRouter(prefix="/trash", tags=["trash"])
+
+
+class TrashedFolderResponse(FolderResponse):
+    deleted_at: str
+
+
+class TrashedFileResponse(FileResponse):
+    deleted_at: str
+
+
+class TrashResponse(BaseModel):
+    folders: List[TrashedFolderResponse]
+    files: List[TrashedFileResponse]
+
+
+@router.get("", response_model=TrashResponse)
+def get_trash(current_user: UserRecord = Depends(get_current_user)):
+    """Items the user deleted that can still be restored, newest first.
+
+    Only the deleted folder is listed, not what it contains.
+    """
+    with get_db() as conn:
+        folders = conn.execute(queries.TRASHED_FOLDERS, (current_user.id, retention())).fetchall()
+        files = conn.execute(queries.TRASHED_FILES, (current_user.id, retention())).fetchall()
+    
+    return {"folders": [dict(row) for row in folders], "files": [dict(row) for row in files]}
+
+
+def restore_parent(cursor, parent_folder_id, user_id: int):
+    """The folder to restore into: the original one if it is not trashed, else the root."""
+    if parent_folder_id is None:
+        return None
+    cursor.execute(
+        queries.FOLDER_EXISTS_FOR_USER,
+        (parent_folder_id, user_id),
+    )
+    return parent_folder_id if cursor.fetchone() is not None else None
+
+
+@router.post("/folders/{folder_id}/restore", response_model=FolderResponse)
+def restore_folder(
+    folder_id: int,
+    current_user: UserRecord = Depends(get_current_user),
+):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        
+        trashed = cursor.execute(
+            queries.TRASHED_FOLDER,
+            (folder_id, current_user.id, retention()),
+        ).fetchone()
+        if trashed is not None:
+            parent_folder_id = restore_parent(cursor, trashed["parent_folder_id"], current_user.id)
+            cursor.execute(queries.RESTORE_FOLDER, (parent_folder_id, folder_id, retention()))
+        # Restored or purged by another request in the meantime.
+        if trashed is None or cursor.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Folder not in trash",
+            )
+        
+        restored = fetch_one(
+            conn,
+            FolderRecord,
+            queries.FOLDER_BY_ID,
+            (folder_id,),
+        )
+    
+    hub.publish(current_user.id, "folder.restored", **asdict(restored))
+    return restored
+
+
+@router.post("/files/{file_id}/restore", response_model=FileResponse)
+def restore_file(
+    file_id: int,
+    current_user: UserRecord = Depends(get_current_user),
+):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        
+        trashed = cursor.execute(
+            queries.TRASHED_FILE,
+            (file_id, current_user.id, retention()),
+        ).fetchone()
+        if trashed is not None:
+            parent_folder_id = restore_parent(cursor, trashed["parent_folder_id"], current_user.id)
+            cursor.execute(queries.RESTORE_FILE, (parent_folder_id, file_id, retention()))
+        if trashed is None or cursor.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not in trash",
+            )
+        
+        restored = fetch_one(
+            conn,
+            FileRecord,
+            queries.FILE_BY_ID,
+            (file_id,),
+        )
+    
+    hub.publish(current_user.id, "file.restored", **asdict(restored))
+    return restored
+
+
+@router.delete("", status_code=status.HTTP_204_NO_CONTENT)
+def empty_trash(current_user: UserRecord = Depends(get_current_user)):
+    """Purge everything in the user's trash now, in the background."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(queries.EXPIRE_TRASHED_FOLDERS, (current_user.id,))
+        cursor.execute(queries.EXPIRE_TRASHED_FILES, (current_user.id,))
+        schedule_purge(cursor, delay=0)
+    
+    return None
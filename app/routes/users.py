@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+
+from app.auth.dependencies import get_current_user
+from app.records import UserRecord
+from app.database import get_db
+from app.quotas import get_usage
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+class UsageResponse(BaseModel):
+    used: int
+    quota: int
+    available: int
+
+
+@router.get("/me/usage", response_model=UsageResponse)
+def get_my_usage(current_user: UserRecord = Depends(get_current_user)):
+    with get_db() as conn:
+        return get_usage(conn.cursor(), current_user.id)
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Generator, Tuple
+
+from app.config import BLOB_STORAGE_PATH
+
+
+class BlobWriter:
+    """Streams a blob to a temporary file and hashes it on the way."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self._tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+
+    def commit(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class BlobStore:
+    """File content kept on the filesystem instead of in ``files.content``.
+
+    Blobs are addressed by an opaque key and sharded into two levels of
+    directories by key prefix, so no directory grows past a few thousand
+    entries. Writes go to a temporary file that is renamed into place, so a
+    reader never sees a partial blob.
+    """
+
+    def __init__(self, root: str = BLOB_STORAGE_PATH):
+        self.root = root
+
+    @staticmethod
+    def new_key() -> str:
+        return uuid.uuid4().hex
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    @contextmanager
+    def writer(self, key: str) -> Generator[BlobWriter, None, None]:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writer = BlobWriter(path)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+    def write(self, key: str, data: bytes) -> Tuple[int, str]:
+        """Store ``data`` under ``key``; returns ``(size, sha256 hex)``."""
+        with self.writer(key) as writer:
+            writer.write(data)
+        return writer.size, writer.sha256.hexdigest()
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def read(self, key: str) -> bytes:
+        with self.open(key) as f:
+            return f.read()
+
+    def checksum(self, key: str, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with self.open(key) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+blob_store = BlobStore()
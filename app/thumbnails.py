@@ -0,0 +1,374 @@
+"""
+Thumbnails and previews.
+
+Derivatives are generated by a small thread pool: for every configured
+size by a background job queued with each upload (see app.jobs), and on
+demand when a size is requested before it exists. Concurrent requests for the same derivative
+share one job. Results are kept in a size-bounded LRU directory on disk
+(``THUMBNAIL_CACHE_PATH``), keyed by the revision they show (see
+``preview_key``). They are discarded when the file's content changes and
+when the revision is pruned or purged.
+
+Images are scaled with Pillow, imported on first use so startup does not
+pay for it. Text previews are rendered as SVG.
+"""
+
+import glob
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from app.config import (
+    THUMBNAIL_CACHE_BYTES,
+    THUMBNAIL_CACHE_PATH,
+    THUMBNAIL_MAX_SOURCE_BYTES,
+    THUMBNAIL_SIZES,
+    THUMBNAIL_WORKERS,
+)
+from app.jobs import job_handler
+from app.metrics import REGISTRY, Counter, Gauge, HistogramMetric
+from app.revisions import revision_exists, revision_source
+from app.storage import blob_store
+
+logger = logging.getLogger(__name__)
+
+IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff"})
+TEXT_TYPES = frozenset({
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-sh",
+    "application/x-yaml",
+    "application/toml",
+})
+MEDIA_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".svg": "image/svg+xml"}
+
+# Text previews only need the first screenful.
+TEXT_PREVIEW_BYTES = 8192
+
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("thumbnail_cache_requests_total", "Thumbnail lookups by result", ("result",))
+)
+CACHE_BYTES = REGISTRY.register(Gauge("thumbnail_cache_bytes", "Bytes held by the derivative cache"))
+RENDER_DURATION = REGISTRY.register(
+    HistogramMetric("thumbnail_render_seconds", "Time to render one derivative", ("kind",))
+)
+
+# Returns up to ``limit`` bytes of the original file.
+Source = Callable[[int], bytes]
+
+
+def preview_kind(mime_type: Optional[str]) -> Optional[str]:
+    """``"image"``, ``"text"`` or None when no preview can be made."""
+    if mime_type in IMAGE_TYPES:
+        return "image"
+    if mime_type and (mime_type.startswith("text/") or mime_type in TEXT_TYPES):
+        return "text"
+    return None
+
+
+def render_image(data: bytes, size: int) -> Tuple[bytes, str]:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        # draft() lets the JPEG decoder downscale while decoding.
+        image.draft("RGB", (size, size))
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(out, "PNG", optimize=True)
+            return out.getvalue(), ".png"
+        image.convert("RGB").save(out, "JPEG", quality=80)
+        return out.getvalue(), ".jpg"
+
+
+def render_text(data: bytes, size: int) -> Tuple[bytes, str]:
+    font_size = max(6, size // 16)
+    line_height = font_size * 1.25
+    columns = int(size / (font_size * 0.6))
+    rows = int((size - font_size) / line_height)
+
+    text = data.decode("utf-8", errors="replace").expandtabs(4)
+    lines = []
+    for line in text.splitlines()[:rows]:
+        # Control characters are not allowed in XML.
+        line = "".join(ch for ch in line[:columns] if ch >= " ")
+        lines.append(escape(line))
+
+    body = "".join(
+        f'<text x="{font_size / 2}" y="{font_size + i * line_height:.1f}" xml:space="preserve">{line}</text>'
+        for i, line in enumerate(lines)
+    )
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
+        f'<rect width="100%" height="100%" fill="#fff" stroke="#ddd"/>'
+        f'<g font-family="monospace" font-size="{font_size}" fill="#333">{body}</g></svg>'
+    )
+    return svg.encode(), ".svg"
+
+
+def render(kind: str, data: bytes, size: int) -> Tuple[bytes, str]:
+    start = time.perf_counter()
+    try:
+        return render_image(data, size) if kind == "image" else render_text(data, size)
+    finally:
+        RENDER_DURATION.observe(time.perf_counter() - start, kind)
+
+
+class CachedDerivative:
+    __slots__ = ("path", "size", "media_type")
+
+    def __init__(self, path: str, size: int, media_type: str):
+        self.path = path
+        self.size = size
+        self.media_type = media_type
+
+
+class DerivativeCache:
+    """Byte-bounded LRU of derived files in a directory.
+
+    Keys are ``<source>-<variant>``. A source's files share a subdirectory
+    named by a hash of the source, so sources spread evenly over the
+    subdirectories and a source's files can be found without an index.
+
+    Worker processes share the directory. Each keeps an index of it in
+    memory, rebuilt from the directory on first use and again when eviction
+    is due or ``max_bytes // RESCAN_DIVISOR`` bytes were written since, so
+    the budget covers what every worker wrote. Hits touch the file, so the
+    least recently used file by any worker is evicted first. A file another
+    worker evicted is treated as a miss.
+    """
+
+    RESCAN_DIVISOR = 8
+
+    def __init__(self, root: str = THUMBNAIL_CACHE_PATH, max_bytes: int = THUMBNAIL_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._entries: "OrderedDict[str, CachedDerivative]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._written = 0
+
+    def _load(self) -> None:
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                key, ext = os.path.splitext(filename)
+                if ext not in MEDIA_TYPES:
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, key, CachedDerivative(path, stat.st_size, MEDIA_TYPES[ext])))
+        self._entries.clear()
+        self.total = 0
+        for _, key, entry in sorted(found, key=lambda item: item[0]):
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                # Left in another subdirectory by an earlier layout.
+                self.total -= previous.size
+                os.remove(previous.path)
+            self._entries[key] = entry
+            self.total += entry.size
+        self._loaded = True
+        self._written = 0
+
+    def get(self, key: str) -> Optional[CachedDerivative]:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._evict()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            try:
+                os.utime(entry.path)
+            except FileNotFoundError:
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def shard(self, key: str) -> str:
+        source = key.rpartition("-")[0] or key
+        return os.path.join(self.root, hashlib.sha256(source.encode()).hexdigest()[:2])
+
+    def put(self, key: str, data: bytes, ext: str) -> CachedDerivative:
+        path = os.path.join(self.shard(key), key + ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        entry = CachedDerivative(path, len(data), MEDIA_TYPES[ext])
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            previous = self._entries.get(key)
+            if previous is not None and previous.path != path:
+                os.remove(previous.path)
+            self._forget(key)
+            self._entries[key] = entry
+            self.total += entry.size
+            self._written += entry.size
+            self._evict()
+        return entry
+
+    def discard(self, prefix: str) -> None:
+        """Drop every derivative whose key starts with ``prefix``, whichever worker stored it.
+
+        ``prefix`` must include the source's trailing ``-``.
+        """
+        pattern = os.path.join(self.shard(prefix), glob.escape(prefix) + "*")
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._forget(key)
+            for path in glob.glob(pattern):
+                if os.path.splitext(path)[1] not in MEDIA_TYPES:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _forget(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total -= entry.size
+            CACHE_BYTES.set(self.total)
+
+    def _evict(self) -> None:
+        if self._written and (self.total > self.max_bytes or self._written >= self.max_bytes // self.RESCAN_DIVISOR):
+            # Other workers write to the same directory.
+            self._load()
+        while self.total > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.total -= entry.size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        CACHE_BYTES.set(self.total)
+
+
+class ThumbnailPipeline:
+    """Renders derivatives on a thread pool and stores them in the cache."""
+
+    def __init__(self, cache: DerivativeCache, workers: int = THUMBNAIL_WORKERS):
+        self.cache = cache
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source_key: str, size: int) -> str:
+        return f"{source_key}-{size}"
+
+    def _submit(self, key: str, kind: str, source: Source, size: int) -> Future:
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="thumbnail")
+                job = self._jobs[key] = self._pool.submit(self._render, key, kind, source, size)
+            return job
+
+    def _render(self, key: str, kind: str, source: Source, size: int) -> Optional[CachedDerivative]:
+        try:
+            if kind == "text":
+                data = source(TEXT_PREVIEW_BYTES)
+            else:
+                # One byte over the limit tells an oversized image apart.
+                data = source(THUMBNAIL_MAX_SOURCE_BYTES + 1)
+                if len(data) > THUMBNAIL_MAX_SOURCE_BYTES:
+                    return None
+            return self.cache.put(key, *render(kind, data, size))
+        except Exception:
+            logger.warning("Could not render thumbnail %s", key, exc_info=True)
+            return None
+        finally:
+            with self._lock:
+                self._jobs.pop(key, None)
+
+    def render_all(self, source_key: str, mime_type: Optional[str], source: Source) -> None:
+        """Render every configured size that is not cached yet."""
+        kind = preview_kind(mime_type)
+        if kind is None:
+            return
+        for size in THUMBNAIL_SIZES:
+            key = self.key(source_key, size)
+            if self.cache.get(key) is None:
+                self._submit(key, kind, source, size).result()
+
+    def get(self, source_key: str, mime_type: Optional[str], size: int, source: Source,
+            timeout: Optional[float] = None) -> Optional[CachedDerivative]:
+        """Cached derivative, rendering it first if needed."""
+        key = self.key(source_key, size)
+        entry = self.cache.get(key)
+        if entry is not None:
+            CACHE_REQUESTS.inc("hit")
+            return entry
+        kind = preview_kind(mime_type)
+        if kind is None:
+            return None
+        CACHE_REQUESTS.inc("miss")
+        return self._submit(key, kind, source, size).result(timeout)
+
+    def discard(self, source_key: str) -> None:
+        self.cache.discard(f"{source_key}-")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def file_source(path: str) -> Source:
+    def read(limit: int) -> bytes:
+        with open(path, "rb") as f:
+            return f.read(limit)
+    return read
+
+
+def preview_key(file_id: int, storage_key: Optional[str], revision_id: Optional[int] = None) -> str:
+    """The key a file's previews are cached under."""
+    if revision_id is not None:
+        return f"rev{revision_id}"
+    # Legacy inline rows have no storage key; their previews go by id.
+    return storage_key if storage_key is not None else f"file{file_id}"
+
+
+thumbnails = ThumbnailPipeline(DerivativeCache())
+
+
+def stop_thumbnails() -> None:
+    thumbnails.shutdown()
+
+
+@job_handler("thumbnails.render")
+def render_thumbnails(payload: dict) -> None:
+    if "revision_id" in payload:
+        if not revision_exists(payload["revision_id"]):
+            # Pruned or deleted before the job ran.
+            return
+        thumbnails.render_all(payload["source_key"], payload["mime_type"], revision_source(payload["revision_id"]))
+        return
+    path = blob_store.path(payload["storage_key"])
+    if not os.path.exists(path):
+        # Deleted before the job ran.
+        return
+    thumbnails.render_all(payload["storage_key"], payload["mime_type"], file_source(path))
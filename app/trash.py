@@ -0,0 +1,96 @@
+"""
+Trash.
+
+Deleting a file or folder only sets its ``deleted_at``: one indexed update
+however large the subtree. Everything below a trashed folder is hidden
+because the look-ups in app.queries walk up the folder chain.
+
+Trashed items can be restored for ``TRASH_RETENTION_DAYS``. After that, or
+once the user empties the trash, the ``trash.purge`` job deletes them in
+transactions of at most ``TRASH_PURGE_BATCH`` rows per statement, so a
+large tree never holds the write lock for long. Files count against the
+quota until they are purged. A purge that leaves items in the trash queues
+the next one for when the oldest of them expires, so nothing is left
+behind if a scheduled run came too early or was lost.
+"""
+
+import time
+
+from app import queries
+from app.config import TRASH_PURGE_BATCH, TRASH_RETENTION_DAYS
+from app.database import get_db
+from app.download_cache import download_cache
+from app.jobs import enqueue, job_handler
+from app.quotas import release_storage
+from app.revisions import delete_revisions
+from app.storage import blob_store
+from app.thumbnails import preview_key, thumbnails
+
+# deleted_at has whole seconds; a purge runs this much after the expiry.
+PURGE_MARGIN = 1.0
+
+
+def retention(days: float = TRASH_RETENTION_DAYS) -> str:
+    """SQLite datetime modifier for the start of the retention period."""
+    return f"-{days} days"
+
+
+def schedule_purge(cursor, delay: float = TRASH_RETENTION_DAYS * 86400 + PURGE_MARGIN) -> None:
+    """Queue a purge for when an item trashed now expires, in the caller's transaction."""
+    enqueue(cursor, "trash.purge", {}, delay=delay)
+
+
+def purge_batch(limit: int = TRASH_PURGE_BATCH, days: float = TRASH_RETENTION_DAYS) -> int:
+    """Run one bounded purge transaction; returns the number of rows changed."""
+    modifier = retention(days)
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        purged = cursor.execute(queries.PURGE_FILES, (modifier, limit)).fetchall()
+        revisions = []
+        for row in purged:
+            release_storage(cursor, row["user_id"], row["size"])
+            revisions.extend((row["id"], revision_id) for revision_id in delete_revisions(cursor, row["id"]))
+        # Files with the same content share one blob.
+        unshared = [
+            row for row in purged
+            if row["storage_key"] is None
+            or cursor.execute(queries.BLOB_IN_USE, (row["storage_key"],)).fetchone() is None
+        ]
+
+        changed = len(purged)
+        changed += cursor.execute(queries.EXPIRE_FOLDER_FILES, (modifier, limit)).rowcount
+        changed += cursor.execute(queries.EXPIRE_SUBFOLDERS, (modifier, limit)).rowcount
+        changed += cursor.execute(queries.PURGE_EMPTY_FOLDERS, (modifier, limit)).rowcount
+
+    # Only after the commit: a rolled-back purge must keep the content.
+    for row in purged:
+        download_cache.invalidate(row["id"])
+    for row in unshared:
+        if row["storage_key"] is not None:
+            blob_store.delete(row["storage_key"])
+        if row["revision_id"] is None:
+            thumbnails.discard(preview_key(row["id"], row["storage_key"]))
+    for file_id, revision_id in revisions:
+        thumbnails.discard(preview_key(file_id, None, revision_id))
+    return changed
+
+
+def reschedule(days: float = TRASH_RETENTION_DAYS) -> None:
+    """Queue a purge for the oldest item left in the trash, unless one is queued by then."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        delay = cursor.execute(queries.NEXT_TRASH_EXPIRY, (retention(days),)).fetchone()["delay"]
+        if delay is None:
+            return
+        delay = max(delay, 0) + PURGE_MARGIN
+        # A purge queued up to a margin later does as well.
+        if cursor.execute(queries.PURGE_QUEUED, (time.time() + delay + PURGE_MARGIN,)).fetchone() is None:
+            schedule_purge(cursor, delay=delay)
+
+
+@job_handler("trash.purge")
+def purge_trash(payload: dict) -> None:
+    while purge_batch():
+        pass
+    reschedule()
@@ -0,0 +1,59 @@
+"""
+Compare two load test result files and flag regressions.
+
+Exits with status 1 when any scenario's throughput drops, or its p95/p99
+latency grows, by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    print(f"{'scenario':<16}{'metric':<8}{'baseline':>12}{'current':>12}{'change':>10}")
+    print("-" * 58)
+    for name, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"{name:<16}(new scenario)")
+            continue
+        rows = [
+            ("rps", old["rps"], new["rps"], -1),
+            ("p95 ms", old["latency_ms"]["p95"], new["latency_ms"]["p95"], 1),
+            ("p99 ms", old["latency_ms"]["p99"], new["latency_ms"]["p99"], 1),
+        ]
+        for metric, old_value, new_value, worse_sign in rows:
+            delta = change(old_value, new_value)
+            flag = ""
+            if delta * worse_sign > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, metric, delta))
+            print(f"{name:<16}{metric:<8}{old_value:>12}{new_value:>12}{delta:>+9.1f}%{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare load test results")
+    parser.add_argument("baseline", help="Result JSON of the reference commit")
+    parser.add_argument("current", help="Result JSON to check")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print(f"baseline {baseline['commit']} vs current {current['commit']}\n")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold}%")
+        sys.exit(1)
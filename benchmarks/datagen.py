@@ -0,0 +1,165 @@
+"""
+Benchmark Data Generator
+
+Creates a fresh database with users, nested folder trees and files of
+configurable sizes, and writes a manifest describing what was created so
+the load test scenarios can address it. File content is stored the way
+uploads store it: split into content-defined chunks written to a blob
+directory, as each file's first revision, with its SHA-256 and the
+owner's storage_used filled in.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth.password import hash_password
+from app.chunks import split
+from app.storage import BlobStore
+
+PASSWORD = "BenchPass123!"
+
+
+def migrate(database_path):
+    """Build the schema with the real migrations."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DATABASE_PATH=database_path)
+    subprocess.run(
+        [sys.executable, os.path.join(root, "migrate.py"), "upgrade"],
+        check=True,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def insert_file(cursor, blobs, user_id, parent_folder_id, name, size, rng):
+    content = rng.randbytes(size)
+    sha256 = hashlib.sha256(content).hexdigest()
+    cursor.execute(
+        "INSERT INTO files (name, content, size, mime_type, user_id, parent_folder_id, sha256) "
+        "VALUES (?, '', ?, ?, ?, ?, ?)",
+        (name, size, "application/octet-stream", user_id, parent_folder_id, sha256),
+    )
+    file_id = cursor.lastrowid
+
+    cursor.execute("INSERT INTO file_revisions (file_id, size, sha256) VALUES (?, ?, ?)", (file_id, size, sha256))
+    revision_id = cursor.lastrowid
+    position = 0
+    for chunk in split(content):
+        # Random content: every chunk is new.
+        blobs.write(chunk.hash, chunk.data)
+        cursor.execute(
+            "INSERT INTO chunks (hash, size, refcount) VALUES (?, ?, 1) "
+            "ON CONFLICT (hash) DO UPDATE SET refcount = refcount + 1",
+            (chunk.hash, len(chunk.data)),
+        )
+        cursor.execute(
+            "INSERT INTO revision_chunks (revision_id, position, chunk_hash, size) VALUES (?, ?, ?, ?)",
+            (revision_id, position, chunk.hash, len(chunk.data)),
+        )
+        position += len(chunk.data)
+    cursor.execute("UPDATE files SET revision_id = ? WHERE id = ?", (revision_id, file_id))
+    return file_id
+
+
+def generate(args):
+    if os.path.exists(args.database):
+        os.remove(args.database)
+    shutil.rmtree(args.blobs, ignore_errors=True)
+    migrate(args.database)
+    blobs = BlobStore(args.blobs)
+
+    rng = random.Random(args.seed)
+    # bcrypt is deliberately slow; every user shares one hash.
+    password_hash = hash_password(PASSWORD)
+
+    conn = sqlite3.connect(args.database)
+    cursor = conn.cursor()
+    manifest = {"password": PASSWORD, "users": []}
+
+    for u in range(args.users):
+        email = f"bench{u}@example.com"
+        cursor.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            (email, password_hash),
+        )
+        user_id = cursor.lastrowid
+
+        # One chain of nested folders, the deepest of which holds the big listing.
+        parent = None
+        folder_ids = []
+        for depth in range(args.depth):
+            for sibling in range(args.fanout):
+                cursor.execute(
+                    "INSERT INTO folders (name, user_id, parent_folder_id) VALUES (?, ?, ?)",
+                    (f"folder-{depth}-{sibling}", user_id, parent),
+                )
+                folder_ids.append(cursor.lastrowid)
+                if sibling == 0:
+                    next_parent = cursor.lastrowid
+            parent = next_parent
+        deepest = parent
+
+        small_files = [
+            insert_file(cursor, blobs, user_id, deepest, f"small-{i}.bin", args.small_size, rng)
+            for i in range(args.files)
+        ]
+        large_files = [
+            insert_file(cursor, blobs, user_id, None, f"large-{i}.bin", args.large_size, rng)
+            for i in range(args.large_files)
+        ]
+
+        cursor.execute(
+            "UPDATE users SET storage_used = (SELECT COALESCE(SUM(size), 0) FROM files WHERE user_id = ?) WHERE id = ?",
+            (user_id, user_id),
+        )
+        manifest["users"].append(
+            {
+                "id": user_id,
+                "email": email,
+                "folders": folder_ids,
+                "deepest_folder": deepest,
+                "small_files": small_files,
+                "large_files": large_files,
+            }
+        )
+
+    conn.commit()
+    conn.close()
+
+    manifest["config"] = vars(args)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(
+        f"Generated {args.users} users, {args.depth * args.fanout} folders and "
+        f"{args.files + args.large_files} files each in {args.database}"
+    )
+    return manifest
+
+
+def add_arguments(parser):
+    parser.add_argument("--database", default="bench.db", help="Database file to create")
+    parser.add_argument("--manifest", default="bench_manifest.json", help="Manifest output path")
+    parser.add_argument("--blobs", default="bench_blobs", help="Blob directory to create")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=8, help="Folder nesting depth")
+    parser.add_argument("--fanout", type=int, default=3, help="Folders per level")
+    parser.add_argument("--files", type=int, default=500, help="Small files in the deepest folder")
+    parser.add_argument("--small-size", type=int, default=2048, help="Small file size in bytes")
+    parser.add_argument("--large-files", type=int, default=2)
+    parser.add_argument("--large-size", type=int, default=4 * 1024 * 1024, help="Large file size in bytes")
+    parser.add_argument("--seed", type=int, default=1234)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate benchmark data")
+    add_arguments(parser)
+    generate(parser.parse_args())
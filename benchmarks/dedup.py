@@ -0,0 +1,96 @@
+"""
+Deduplication of edited copies.
+
+Generates a random file and --versions copies of it, each made from the
+previous one with --edits small random inserts, deletes and overwrites:
+the "slightly edited version saved under a new name" pattern. Every
+version is split with the server's content-defined chunker
+(app.chunks.split) and, for comparison, into fixed-size blocks of
+CHUNK_AVG_SIZE. Reports logical bytes, unique chunk bytes, the dedup ratio
+and chunking throughput. No server or database is involved.
+
+    python benchmarks/dedup.py --size 32 --versions 10 --edits 5
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.chunks import split
+from app.config import CHUNK_AVG_SIZE
+
+MIB = 1024 * 1024
+
+
+def edit(data, rng, edits):
+    data = bytearray(data)
+    for _ in range(edits):
+        position = rng.randrange(len(data))
+        length = rng.randint(1, 256)
+        kind = rng.choice(("insert", "delete", "overwrite"))
+        if kind == "insert":
+            data[position:position] = rng.randbytes(length)
+        elif kind == "delete":
+            del data[position:position + length]
+        else:
+            data[position:position + length] = rng.randbytes(length)
+    return bytes(data)
+
+
+def fixed_blocks(data, size=CHUNK_AVG_SIZE):
+    return [(hashlib.sha256(data[i:i + size]).hexdigest(), len(data[i:i + size])) for i in range(0, len(data), size)]
+
+
+def content_defined(data):
+    return [(chunk.hash, len(chunk.data)) for chunk in split(data)]
+
+
+def measure(versions, chunker):
+    unique = {}
+    logical = 0
+    elapsed = 0.0
+    for data in versions:
+        start = time.perf_counter()
+        chunks = chunker(data)
+        elapsed += time.perf_counter() - start
+        logical += len(data)
+        unique.update(chunks)
+    stored = sum(unique.values())
+    return {
+        "logical_mib": logical / MIB,
+        "stored_mib": stored / MIB,
+        "chunks": len(unique),
+        "ratio": logical / stored,
+        "mib_per_second": logical / MIB / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dedup ratio of edited copies")
+    parser.add_argument("--size", type=int, default=32, help="File size in MiB")
+    parser.add_argument("--versions", type=int, default=10)
+    parser.add_argument("--edits", type=int, default=5, help="Edits between consecutive versions")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    versions = [rng.randbytes(args.size * MIB)]
+    for _ in range(args.versions - 1):
+        versions.append(edit(versions[-1], rng, args.edits))
+
+    print(f"{'chunking':<16} {'logical MiB':>12} {'stored MiB':>11} {'chunks':>8} {'ratio':>7} {'MiB/s':>8}")
+    for name, chunker in (("content-defined", content_defined), ("fixed", fixed_blocks)):
+        result = measure(versions, chunker)
+        print(
+            f"{name:<16} {result['logical_mib']:>12.1f} {result['stored_mib']:>11.1f} {result['chunks']:>8} "
+            f"{result['ratio']:>7.2f} {result['mib_per_second']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
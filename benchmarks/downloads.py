@@ -0,0 +1,189 @@
+"""
+Large download throughput and server memory.
+
+Creates a scratch database with one large file stored two ways: as a
+legacy inline base64 row (decoded into memory on every download) and as a
+blob in the blob store (streamed from a memory mapping by BlobResponse).
+For each mode it starts a fresh uvicorn, downloads the file --requests
+times with --concurrency clients, and reports MiB/s together with the
+server's memory from /proc/<pid>/status: VmHWM (peak RSS, which also
+counts page-cache pages touched through the mapping) and the peak of
+RssAnon sampled during the run (heap and other private memory).
+
+    python benchmarks/downloads.py --size 64 --requests 40 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth.password import hash_password
+from app.storage import BlobStore
+from benchmarks import datagen
+from benchmarks.loadtest import free_port, server_env
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL = "downloads@example.com"
+PASSWORD = "BenchPass123!"
+MIB = 1024 * 1024
+
+
+def build(database, blob_root, size):
+    """Create the user and both copies of the file; returns {mode: file_id}."""
+    datagen.migrate(database)
+    content = os.urandom(size)
+
+    conn = sqlite3.connect(database)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+        (EMAIL, hash_password(PASSWORD)),
+    )
+    user_id = cursor.lastrowid
+
+    file_ids = {}
+    cursor.execute(
+        "INSERT INTO files (name, content, size, mime_type, user_id) VALUES (?, ?, ?, ?, ?)",
+        ("inline.bin", base64.b64encode(content).decode(), size, "application/octet-stream", user_id),
+    )
+    file_ids["inline"] = cursor.lastrowid
+
+    store = BlobStore(blob_root)
+    key = store.new_key()
+    store.write(key, content)
+    cursor.execute(
+        "INSERT INTO files (name, content, size, mime_type, user_id, storage_key) VALUES (?, '', ?, ?, ?, ?)",
+        ("blob.bin", size, "application/octet-stream", user_id, key),
+    )
+    file_ids["blob"] = cursor.lastrowid
+
+    conn.commit()
+    conn.close()
+    return file_ids
+
+
+def memory_kib(pid):
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmHWM", "VmRSS", "RssAnon"):
+                values[name] = int(value.split()[0])
+    return values
+
+
+def start_server(database, blob_root):
+    port = free_port()
+    env = dict(server_env(database, blob_root), DOWNLOAD_CACHE_BYTES="0")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 30s")
+
+
+async def sample_anon(pid, peak, interval=0.02):
+    while True:
+        peak[0] = max(peak[0], memory_kib(pid)["RssAnon"])
+        await asyncio.sleep(interval)
+
+
+async def download_all(base_url, pid, file_id, requests, concurrency):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        remaining = iter(range(requests))
+        received = 0
+
+        async def worker():
+            nonlocal received
+            for _ in remaining:
+                async with client.stream("GET", f"/files/{file_id}/download", headers=headers) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+
+        peak_anon = [0]
+        sampler = asyncio.create_task(sample_anon(pid, peak_anon))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        return received, elapsed, peak_anon[0]
+
+
+def run_mode(mode, file_id, args, database, blob_root):
+    process, base_url = start_server(database, blob_root)
+    try:
+        baseline = memory_kib(process.pid)["VmRSS"]
+        received, elapsed, peak_anon = asyncio.run(
+            download_all(base_url, process.pid, file_id, args.requests, args.concurrency)
+        )
+        memory = memory_kib(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "mode": mode,
+        "mib_per_second": received / MIB / elapsed,
+        "rss_start_mib": baseline / 1024,
+        "rss_peak_mib": memory["VmHWM"] / 1024,
+        "rss_end_mib": memory["VmRSS"] / 1024,
+        "anon_peak_mib": peak_anon / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline and blob download paths")
+    parser.add_argument("--size", type=int, default=64, help="File size in MiB")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="downloads-bench-")
+    try:
+        database = os.path.join(workdir, "bench.db")
+        blob_root = os.path.join(workdir, "blobs")
+        file_ids = build(database, blob_root, args.size * MIB)
+        results = [run_mode(mode, file_id, args, database, blob_root) for mode, file_id in file_ids.items()]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'mode':<8} {'MiB/s':>10} {'RSS start':>10} {'RSS peak':>10} {'RSS end':>10} {'Anon peak':>10}")
+    for result in results:
+        print(
+            f"{result['mode']:<8} {result['mib_per_second']:>10.1f} {result['rss_start_mib']:>10.1f} "
+            f"{result['rss_peak_mib']:>10.1f} {result['rss_end_mib']:>10.1f} {result['anon_peak_mib']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
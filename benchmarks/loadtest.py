@@ -0,0 +1,314 @@
+"""
+API Load Test
+
+Starts a local uvicorn against a generated database (see datagen.py), runs
+the scenarios and reports throughput and latency percentiles. Results are
+written as JSON so runs from different commits can be compared with
+compare.py.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import datagen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if count else 0.0,
+        },
+    }
+
+
+class Context:
+    """Generated data plus a bearer token per user."""
+
+    def __init__(self, manifest, tokens, upload_size):
+        self.manifest = manifest
+        self.users = manifest["users"]
+        self.tokens = tokens
+        self.upload_content = base64.b64encode(os.urandom(upload_size)).decode()
+
+    def user(self, rng):
+        user = rng.choice(self.users)
+        return user, {"Authorization": f"Bearer {self.tokens[user['email']]}"}
+
+
+async def login_storm(client, ctx, rng):
+    user = rng.choice(ctx.users)
+    return await client.post(
+        "/auth/login", json={"email": user["email"], "password": ctx.manifest["password"]}
+    )
+
+
+async def deep_listing(client, ctx, rng):
+    user, headers = ctx.user(rng)
+    if rng.random() < 0.8:
+        return await client.get(f"/folders/{user['deepest_folder']}", headers=headers)
+    return await client.get(f"/folders/{rng.choice(user['folders'])}", headers=headers)
+
+
+async def large_upload(client, ctx, rng):
+    user, headers = ctx.user(rng)
+    response = await client.post(
+        "/files",
+        json={"name": "upload.bin", "content": ctx.upload_content},
+        headers=headers,
+    )
+    if response.status_code == 201:
+        # Keep the database size and quota usage stable across the run.
+        await client.delete(f"/files/{response.json()['id']}", headers=headers)
+    return response
+
+
+async def large_download(client, ctx, rng):
+    user, headers = ctx.user(rng)
+    return await client.get(f"/files/{rng.choice(user['large_files'])}/download", headers=headers)
+
+
+async def mixed(client, ctx, rng):
+    user, headers = ctx.user(rng)
+    roll = rng.random()
+    if roll < 0.35:
+        return await client.get(f"/files/{rng.choice(user['small_files'])}", headers=headers)
+    if roll < 0.55:
+        return await client.get(f"/files/{rng.choice(user['small_files'])}/download", headers=headers)
+    if roll < 0.75:
+        return await client.get(f"/folders/{rng.choice(user['folders'])}", headers=headers)
+    if roll < 0.85:
+        return await client.get("/folders/root", headers=headers)
+    if roll < 0.95:
+        file_id = rng.choice(user["small_files"])
+        return await client.patch(
+            f"/files/{file_id}", json={"name": f"renamed-{rng.randrange(1000)}.bin"}, headers=headers
+        )
+    return await client.post(
+        "/folders",
+        json={"name": "bench-new", "parent_folder_id": rng.choice(user["folders"])},
+        headers=headers,
+    )
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "deep_listing": deep_listing,
+    "large_upload": large_upload,
+    "large_download": large_download,
+    "mixed": mixed,
+}
+
+
+async def run_scenario(base_url, name, ctx, requests, concurrency, seed):
+    operation = SCENARIOS[name]
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker(worker_id):
+        nonlocal errors, remaining
+        rng = random.Random(seed * 1000 + worker_id)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await operation(client, ctx, rng)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def login_all(base_url, manifest):
+    tokens = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for user in manifest["users"]:
+            response = await client.post(
+                "/auth/login", json={"email": user["email"], "password": manifest["password"]}
+            )
+            response.raise_for_status()
+            tokens[user["email"]] = response.json()["access_token"]
+    return tokens
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env(database, blobs):
+    """Environment for the server under test; rate limits would skew results."""
+    return dict(
+        os.environ,
+        DATABASE_PATH=os.path.abspath(database),
+        BLOB_STORAGE_PATH=os.path.abspath(blobs),
+        RATE_LIMIT="100000000/second",
+        LOGIN_RATE_LIMIT="100000000/second",
+        UPLOAD_RATE_LIMIT="100000000/second",
+        RATE_LIMIT_STORAGE="memory",
+        EVENT_DATABASE_PATH=os.path.abspath(database) + "-events",
+        DEFAULT_STORAGE_QUOTA=str(2 ** 62),
+    )
+
+
+def server_command(args, port):
+    if args.server == "gunicorn":
+        return [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers), "--log-level", "warning",
+        ]
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    if args.workers > 1:
+        command += ["--workers", str(args.workers)]
+    return command
+
+
+def start_server(args):
+    port = free_port()
+    process = subprocess.Popen(
+        server_command(args, port),
+        cwd=ROOT,
+        env=server_env(args.database, args.blobs),
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.server_log else subprocess.DEVNULL,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 30s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results):
+    print(f"\n{'scenario':<16}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print("-" * 74)
+    for name, r in results["scenarios"].items():
+        lat = r["latency_ms"]
+        print(
+            f"{name:<16}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10}"
+            f"{lat['p50']:>10}{lat['p95']:>10}{lat['p99']:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run API load test scenarios")
+    datagen.add_arguments(parser)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--upload-size", type=int, default=1024 * 1024, help="Bytes per large upload")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--server-log", action="store_true", help="Show the server's log output")
+    parser.add_argument("--url", help="Use an already running server instead of starting one")
+    parser.add_argument("--skip-datagen", action="store_true", help="Reuse an existing database and manifest")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    if args.skip_datagen:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+    else:
+        manifest = datagen.generate(args)
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(args)
+
+    try:
+        tokens = asyncio.run(login_all(base_url, manifest))
+        ctx = Context(manifest, tokens, args.upload_size)
+        results = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "workers": args.workers,
+                "server": args.server,
+                "upload_size": args.upload_size,
+                "data": manifest["config"],
+            },
+            "scenarios": {},
+        }
+        for name in args.scenarios.split(","):
+            results["scenarios"][name] = asyncio.run(
+                run_scenario(base_url, name, ctx, args.requests, args.concurrency, args.seed)
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_report(results)
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Memory cost of materializing a large listing.
+
+Builds a scratch database with one folder of --rows files and measures,
+with tracemalloc, the peak and retained allocations of loading the listing
+as sqlite3.Row objects copied into dicts (the previous route code) versus
+FileRecord instances built directly by the row factory.
+
+    python benchmarks/memory.py --rows 100000
+"""
+
+import argparse
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.records import FileRecord, fetch_all
+
+LISTING_SQL = f"SELECT {FileRecord.COLUMNS} FROM files WHERE parent_folder_id = ?"
+
+
+def build_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mime_type TEXT,
+            parent_folder_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sha256 TEXT
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO files (name, size, mime_type, parent_folder_id) VALUES (?, 1024, 'text/plain', 1)",
+        ((f"file-{i}.txt",) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def load_dicts(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(LISTING_SQL, (1,))
+    files = [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "size": row["size"],
+            "mime_type": row["mime_type"],
+            "parent_folder_id": row["parent_folder_id"],
+            "created_at": row["created_at"],
+        }
+        for row in cursor.fetchall()
+    ]
+    conn.close()
+    return files
+
+
+def load_records(path):
+    conn = sqlite3.connect(path)
+    files = fetch_all(conn, FileRecord, LISTING_SQL, (1,))
+    conn.close()
+    return files
+
+
+def measure(loader, path):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = loader(path)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), retained, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure listing materialization memory")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dms-memory-") as scratch:
+        path = os.path.join(scratch, "memory.db")
+        build_database(path, args.rows)
+
+        print(f"{'loader':<12}{'rows':>10}{'retained MiB':>15}{'peak MiB':>12}{'bytes/row':>12}{'ms':>10}")
+        print("-" * 71)
+        for name, loader in (("row+dict", load_dicts), ("records", load_records)):
+            rows, retained, peak, elapsed = measure(loader, path)
+            print(
+                f"{name:<12}{rows:>10}{retained / 2 ** 20:>15.1f}{peak / 2 ** 20:>12.1f}"
+                f"{retained // max(rows, 1):>12}{elapsed * 1000:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
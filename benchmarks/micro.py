@@ -0,0 +1,213 @@
+"""
+Micro-benchmarks for per-request hot paths.
+
+Each benchmark is timed with timeit over several repeats against a scratch
+database. Use --save to store a baseline and --compare to fail (exit 1)
+when any benchmark's median got slower than the threshold, e.g. in CI:
+
+    python benchmarks/micro.py --save benchmarks/results/micro_baseline.json
+    python benchmarks/micro.py --compare benchmarks/results/micro_baseline.json --threshold 25
+"""
+
+import argparse
+import atexit
+import base64
+import json
+import os
+import shutil
+import statistics
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.database reads DATABASE_PATH at import time.
+SCRATCH_DIR = tempfile.mkdtemp(prefix="dms-micro-")
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+os.environ["DATABASE_PATH"] = os.path.join(SCRATCH_DIR, "micro.db")
+
+import mimetypes
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth.dependencies import get_current_user, get_user_file
+from app.auth.jwt import create_access_token, decode_access_token
+from app.database import DATABASE_PATH
+from app.records import FolderRecord, UserRecord
+from app.routes.folders import RootContentsResponse, get_folder
+
+BENCHMARKS = {}
+
+LISTING_SIZE = 1000
+
+
+def benchmark(name):
+    """Register a setup function returning the zero-argument callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def build_database():
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "migrate.py"), "upgrade"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (email, password_hash) VALUES ('micro@example.com', 'x')")
+    user_id = cursor.lastrowid
+    cursor.execute("INSERT INTO folders (name, user_id) VALUES ('listing', ?)", (user_id,))
+    folder_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO files (name, content, size, mime_type, user_id, parent_folder_id) VALUES (?, '', 0, 'text/plain', ?, ?)",
+        [(f"file-{i}.txt", user_id, folder_id) for i in range(LISTING_SIZE)],
+    )
+    file_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return UserRecord(user_id, "micro@example.com"), folder_id, file_id
+
+
+USER, FOLDER_ID, FILE_ID = None, None, None
+
+
+@benchmark("decode_access_token")
+def bench_decode_access_token():
+    token = create_access_token(USER.id)
+    return lambda: decode_access_token(token)
+
+
+@benchmark("get_current_user")
+def bench_get_current_user():
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(USER.id))
+    return lambda: get_current_user(credentials)
+
+
+@benchmark("get_user_file")
+def bench_get_user_file():
+    return lambda: get_user_file(FILE_ID, USER)
+
+
+@benchmark("base64_decode_64k")
+def bench_base64_decode():
+    content = base64.b64encode(os.urandom(64 * 1024)).decode()
+    return lambda: base64.b64decode(content)
+
+
+@benchmark(f"get_folder_{LISTING_SIZE}_files")
+def bench_get_folder():
+    folder = FolderRecord(FOLDER_ID, "listing", None, "")
+    return lambda: get_folder(folder, USER)
+
+
+def listing_payload(size):
+    return {
+        "folders": [],
+        "files": [
+            {
+                "id": i,
+                "name": f"file-{i}.txt",
+                "size": 1024,
+                "mime_type": "text/plain",
+                "parent_folder_id": 1,
+                "created_at": "2024-01-01 00:00:00",
+                "sha256": "0" * 64,
+            }
+            for i in range(size)
+        ],
+    }
+
+
+@benchmark(f"listing_{LISTING_SIZE}_validated_json")
+def bench_listing_validated():
+    # What FastAPI does for a returned dict: validate, dump, stdlib encode.
+    payload = listing_payload(LISTING_SIZE)
+    return lambda: JSONResponse(
+        RootContentsResponse.model_validate(payload).model_dump(mode="json")
+    ).body
+
+
+@benchmark(f"listing_{LISTING_SIZE}_orjson")
+def bench_listing_orjson():
+    payload = listing_payload(LISTING_SIZE)
+    return lambda: ORJSONResponse(payload).body
+
+
+@benchmark("mimetypes_guess_type")
+def bench_guess_type():
+    return lambda: mimetypes.guess_type("quarterly-report.final.pdf")
+
+
+def measure(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_us": round(min(per_call) * 1e6, 3),
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "mean_us": round(statistics.mean(per_call) * 1e6, 3),
+        "ops_per_s": round(1 / statistics.median(per_call), 1),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def compare(baseline, results, threshold):
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        delta = (result["median_us"] - old["median_us"]) / old["median_us"] * 100
+        if delta > threshold:
+            regressions.append(name)
+            print(f"REGRESSION {name}: {old['median_us']}us -> {result['median_us']}us ({delta:+.1f}%)")
+    return regressions
+
+
+def main():
+    global USER, FOLDER_ID, FILE_ID
+
+    parser = argparse.ArgumentParser(description="Run hot-path micro-benchmarks")
+    parser.add_argument("-k", dest="filter", default="", help="Only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed median slowdown in percent")
+    args = parser.parse_args()
+
+    USER, FOLDER_ID, FILE_ID = build_database()
+
+    results = {}
+    print(f"{'benchmark':<28}{'min us':>12}{'median us':>12}{'ops/s':>14}")
+    print("-" * 66)
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(setup(), args.repeat)
+        r = results[name]
+        print(f"{name:<28}{r['min_us']:>12}{r['median_us']:>12}{r['ops_per_s']:>14}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
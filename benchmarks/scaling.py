@@ -0,0 +1,107 @@
+"""
+Multi-worker Scaling Benchmark
+
+Runs the same load test scenarios against gunicorn with 1, 2, ... N worker
+processes on one machine and reports throughput and speedup relative to a
+single worker.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import datagen, loadtest
+
+
+def worker_counts(maximum):
+    counts = []
+    n = 1
+    while n < maximum:
+        counts.append(n)
+        n *= 2
+    counts.append(maximum)
+    return counts
+
+
+def run_with_workers(args, manifest, workers):
+    args.workers = workers
+    process, base_url = loadtest.start_server(args)
+    try:
+        tokens = asyncio.run(loadtest.login_all(base_url, manifest))
+        ctx = loadtest.Context(manifest, tokens, args.upload_size)
+        return {
+            name: asyncio.run(
+                loadtest.run_scenario(base_url, name, ctx, args.requests, args.concurrency, args.seed)
+            )
+            for name in args.scenarios.split(",")
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def print_report(results):
+    print(f"\n{'scenario':<16}{'workers':>8}{'rps':>10}{'speedup':>9}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    print("-" * 71)
+    for name, runs in results["scenarios"].items():
+        base = runs[0]["rps"] or 1
+        for run in runs:
+            lat = run["latency_ms"]
+            print(
+                f"{name:<16}{run['workers']:>8}{run['rps']:>10}{run['rps'] / base:>8.2f}x"
+                f"{lat['p95']:>10}{lat['p99']:>10}{run['errors']:>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput scaling across worker processes")
+    datagen.add_arguments(parser)
+    parser.add_argument("--max-workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--scenarios", default="mixed,deep_listing", help="Comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=4000, help="Requests per scenario and worker count")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--upload-size", type=int, default=1024 * 1024, help="Bytes per large upload")
+    parser.add_argument("--server-log", action="store_true", help="Show the server's log output")
+    parser.add_argument("--skip-datagen", action="store_true", help="Reuse an existing database and manifest")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/scaling-<commit>.json)")
+    args = parser.parse_args()
+    args.server = "gunicorn"
+
+    if args.skip_datagen:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+    else:
+        manifest = datagen.generate(args)
+
+    results = {
+        "commit": loadtest.git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "data": manifest["config"],
+        },
+        "scenarios": {name: [] for name in args.scenarios.split(",")},
+    }
+    for workers in worker_counts(args.max_workers):
+        print(f"Running with {workers} worker(s)...")
+        for name, summary in run_with_workers(args, manifest, workers).items():
+            results["scenarios"][name].append({"workers": workers, **summary})
+
+    print_report(results)
+    output = args.output or os.path.join(loadtest.RESULTS_DIR, f"scaling-{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
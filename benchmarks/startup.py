@@ -0,0 +1,136 @@
+"""
+Startup Profile
+
+Measures how long a fresh replica takes to become ready:
+
+- the import-time profile of ``app.main`` (``python -X importtime``),
+  grouped by top-level package and listing the slowest app modules
+- ``migrate.py upgrade`` against a database that is already current
+- process start until ``GET /health`` answers
+
+Each measurement runs in a new interpreter and the median of --runs is
+reported.
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import free_port
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """Yield ``(module, self_us, cumulative_us, depth)`` from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = head.replace("import time:", "")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield name.strip(), int(self_us), int(cumulative_us), depth
+
+
+def import_profile(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    packages = defaultdict(int)
+    app_modules = {}
+    total = 0
+    for name, self_us, cumulative_us, depth in parse_importtime(result.stderr):
+        packages[name.split(".")[0]] += self_us
+        if name.startswith("app"):
+            app_modules[name] = self_us
+        if name == "app.main":
+            total = cumulative_us
+    return total, packages, app_modules
+
+
+def timed(command, env):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def time_to_ready(env):
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            # http.client keeps the probe itself cheap (no client/TLS setup).
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            try:
+                conn.request("GET", "/health")
+                if conn.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                pass
+            finally:
+                conn.close()
+            if process.poll() is not None or time.perf_counter() - start > 30:
+                raise RuntimeError("Server did not become healthy")
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile application startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="Packages and app modules to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dms-startup-") as scratch:
+        env = dict(
+            os.environ,
+            DATABASE_PATH=os.path.join(scratch, "startup.db"),
+            RATE_LIMIT_DATABASE_PATH=os.path.join(scratch, "ratelimit.db"),
+        )
+        migrate = [sys.executable, os.path.join(ROOT, "migrate.py"), "upgrade"]
+        subprocess.run(migrate, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+
+        profiles = [import_profile(env) for _ in range(args.runs)]
+        interpreter = statistics.median(timed([sys.executable, "-c", "pass"], env) for _ in range(args.runs))
+        migrate_current = statistics.median(timed(migrate, env) for _ in range(args.runs))
+        ready = statistics.median(time_to_ready(env) for _ in range(args.runs))
+
+    total_us = statistics.median(p[0] for p in profiles)
+    packages = {k: statistics.median(p[1].get(k, 0) for p in profiles) for k in profiles[0][1]}
+    app_modules = {k: statistics.median(p[2].get(k, 0) for p in profiles) for k in profiles[0][2]}
+
+    print(f"import app.main: {total_us / 1000:.1f} ms (median of {args.runs})\n")
+    print(f"{'package':<32}{'self ms':>10}")
+    print("-" * 42)
+    for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{name:<32}{us / 1000:>10.1f}")
+
+    print(f"\n{'app module':<32}{'self ms':>10}")
+    print("-" * 42)
+    for name, us in sorted(app_modules.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{name:<32}{us / 1000:>10.1f}")
+
+    print(f"\n{'step':<32}{'ms':>10}")
+    print("-" * 42)
+    print(f"{'bare interpreter':<32}{interpreter * 1000:>10.1f}")
+    print(f"{'migrate.py upgrade (current)':<32}{migrate_current * 1000:>10.1f}")
+    print(f"{'uvicorn start to /health':<32}{ready * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
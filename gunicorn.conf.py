@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for serving the API with several worker processes.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Every setting can be overridden from the environment, see the
+"Multi-worker deployment" section of the README.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork it into the workers; the
+# database, rate limiter and event relay open their SQLite connections
+# lazily and drop inherited ones after fork.
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+# On SIGHUP/SIGTERM workers stop accepting, finish in-flight requests and
+# exit; event streams are cut after graceful_timeout and clients reconnect.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Optional periodic recycling of workers, staggered by the jitter.
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+# The app writes its own access log.
+accesslog = None
+
+if workers > 1:
+    # Event stream subscribers may be connected to any worker.
+    os.environ.setdefault("EVENT_BACKEND", "sqlite")
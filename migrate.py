@@ -2,6 +2,25 @@
 Database Migration Runner
 
 This script runs all pending migrations in order or reverts them.
+
+All pending migrations are applied on one connection inside a single
+BEGIN EXCLUSIVE transaction, so several replicas starting at once
+serialize on the lock and only the first one does the work; the others
+find nothing pending once they get it. Either every pending migration is
+applied or none is.
+
+Migrations that set ``ONLINE = True`` (typically index builds on large
+tables) run afterwards, each in its own transaction. Under WAL, readers
+are never blocked by a migration, whatever the transaction mode; an index
+build still holds the write lock, and so blocks the application's
+writes, for as long as it runs. What the split guarantees is that:
+
+- the all-or-nothing schema batch holds the write lock only for the
+  quick schema steps, not for the index builds;
+- the write lock is released between index builds, so queued writes get
+  through between them;
+- ``--skip-online`` applies the schema now and leaves the builds for a
+  quieter time. Later schema migrations must not depend on them.
 """
 
 import os
@@ -9,8 +28,17 @@ import glob
 import importlib.util
 import argparse
 import sqlite3
+import time
 
-from app.database import DATABASE_PATH
+from app.config import DATABASE_PATH, MIGRATION_LOCK_TIMEOUT
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS _migrations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
 
 
 def get_migration_files():
@@ -21,6 +49,35 @@ def get_migration_files():
     return sorted(files)
 
 
+def migration_name(filepath):
+    return os.path.basename(filepath).replace(".py", "")
+
+
+def connect():
+    """Open the runner's connection; transactions are managed explicitly."""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=MIGRATION_LOCK_TIMEOUT, isolation_level=None)
+    # Only takes effect on a new, empty database; existing ones are
+    # converted with 'python vacuum.py enable-incremental'.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def applied_migrations(conn):
+    """Names recorded in _migrations, read with a single query."""
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM _migrations")}
+    except sqlite3.OperationalError:
+        # No _migrations table yet: a fresh database.
+        return set()
+
+
+def pending_migrations(conn):
+    """Return migration files not yet applied, without importing any of them."""
+    applied = applied_migrations(conn)
+    return [f for f in get_migration_files() if migration_name(f) not in applied]
+
+
 def load_migration_module(filepath):
     """Dynamically load a migration module."""
     module_name = os.path.basename(filepath).replace(".py", "")
@@ -30,19 +87,115 @@ def load_migration_module(filepath):
     return module
 
 
-def run_migrations(action="upgrade"):
-    """Run all migrations."""
-    migration_files = get_migration_files()
+def apply(conn, module, action):
+    """Run one migration step and its bookkeeping inside the open transaction."""
+    start = time.perf_counter()
+    if action == "upgrade":
+        module.upgrade(conn)
+        conn.execute("INSERT INTO _migrations (name) VALUES (?)", (module.MIGRATION_NAME,))
+    else:
+        module.downgrade(conn)
+        conn.execute("DELETE FROM _migrations WHERE name = ?", (module.MIGRATION_NAME,))
+    return time.perf_counter() - start
+
+
+def run_locked(conn, steps, action, mode="EXCLUSIVE"):
+    """Apply ``steps`` (modules) in one transaction; returns per-step timings."""
+    timings = []
+    conn.execute(f"BEGIN {mode}")
+    try:
+        # Re-check under the lock: another replica may have got here first.
+        applied = applied_migrations(conn)
+        for module in steps:
+            if (module.MIGRATION_NAME in applied) == (action == "upgrade"):
+                continue
+            timings.append((module.MIGRATION_NAME, apply(conn, module, action)))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return timings
+
+
+def report(timings, action):
+    verb = "Applied" if action == "upgrade" else "Reverted"
+    for name, seconds in timings:
+        print(f"{verb} {name} in {seconds * 1000:.1f} ms")
+
+
+def upgrade(conn, include_online=True):
+    """Apply pending migrations; returns ``[(name, seconds), ...]``."""
+    # Fast path: nothing to do costs one query and no lock.
+    if not pending_migrations(conn):
+        print("Database is up to date.")
+        return []
     
-    if action == "downgrade":
-        migration_files = reversed(migration_files)
+    timings = []
+    lock_start = time.perf_counter()
+    conn.execute("BEGIN EXCLUSIVE")
+    try:
+        conn.execute(MIGRATIONS_TABLE)
+        # Re-check under the lock: another replica may have just finished.
+        modules = [load_migration_module(f) for f in pending_migrations(conn)]
+        online = []
+        for module in modules:
+            if getattr(module, "ONLINE", False):
+                # Online steps run after the batch; later schema steps must
+                # not depend on them.
+                online.append(module)
+                continue
+            timings.append((module.MIGRATION_NAME, apply(conn, module, "upgrade")))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    report(timings, "upgrade")
+    print(f"Schema lock held for {(time.perf_counter() - lock_start) * 1000:.1f} ms")
     
-    for filepath in migration_files:
-        module = load_migration_module(filepath)
+    if include_online:
+        for module in online:
+            step = run_locked(conn, [module], "upgrade", mode="IMMEDIATE")
+            report(step, "upgrade")
+            timings.extend(step)
+    elif online:
+        print(f"Deferred {len(online)} online migration(s); run 'upgrade' again to apply them.")
+    
+    return timings
+
+
+def downgrade(conn):
+    """Revert every applied migration, newest first, in one transaction."""
+    applied = applied_migrations(conn)
+    files = [f for f in reversed(get_migration_files()) if migration_name(f) in applied]
+    timings = run_locked(conn, [load_migration_module(f) for f in files], "downgrade")
+    report(timings, "downgrade")
+    return timings
+
+
+def run_migrations(action="upgrade", include_online=True):
+    """Run all migrations."""
+    conn = connect()
+    try:
         if action == "upgrade":
-            module.upgrade()
+            upgrade(conn, include_online)
         elif action == "downgrade":
-            module.downgrade()
+            downgrade(conn)
+    finally:
+        conn.close()
+
+
+def run_single_migration(module, action):
+    """Apply or revert one migration module, used by its own ``__main__``."""
+    conn = connect()
+    try:
+        conn.execute(MIGRATIONS_TABLE)
+        applied = module.MIGRATION_NAME in applied_migrations(conn)
+        if applied == (action == "upgrade"):
+            print(f"Migration {module.MIGRATION_NAME} is already {'applied' if applied else 'reverted'}. Skipping.")
+            return
+        report(run_locked(conn, [module], action), action)
+    finally:
+        conn.close()
 
 
 def list_migrations():
@@ -51,13 +204,7 @@ def list_migrations():
     cursor = conn.cursor()
     
     # Ensure migrations table exists
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS _migrations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+    cursor.execute(MIGRATIONS_TABLE)
     
     # Get applied migrations
     cursor.execute("SELECT name, applied_at FROM _migrations ORDER BY id")
@@ -71,7 +218,7 @@ def list_migrations():
     print("-" * 60)
     
     for filepath in migration_files:
-        name = os.path.basename(filepath).replace(".py", "")
+        name = migration_name(filepath)
         if name in applied:
             print(f"[APPLIED] {name} (at {applied[name]})")
         else:
@@ -87,10 +234,15 @@ if __name__ == "__main__":
         choices=["upgrade", "downgrade", "list"],
         help="Migration action: upgrade (apply all), downgrade (revert all), list (show status)"
     )
+    parser.add_argument(
+        "--skip-online",
+        action="store_true",
+        help="Apply schema migrations only and leave online migrations (index builds) pending",
+    )
     
     args = parser.parse_args()
     
     if args.action == "list":
         list_migrations()
     else:
-        run_migrations(args.action)
+        run_migrations(args.action, include_online=not args.skip_online)
@@ -0,0 +1,227 @@
+"""
+Blob Migrator
+
+Moves legacy file content out of ``files.content`` (inline base64) into the
+blob store while the API keeps serving.
+
+Rows are processed in id order, a batch at a time. Each row's base64 is
+streamed out of SQLite with an incremental blob handle and decoded chunk
+by chunk, so memory stays flat regardless of file size. The decoded bytes
+are written to a new blob, the blob is re-read and its checksum compared,
+and only then is the row switched over in a short write transaction:
+``storage_key`` is set and ``content`` emptied. The update is conditional
+on ``storage_key IS NULL``, so a row that was deleted or migrated by
+another run in the meantime is left alone and the spare blob removed.
+
+The script is resumable: interrupt it at any point and run it again, it
+picks up the rows that still have no ``storage_key``. ``--max-rate`` and
+``--pause`` bound the I/O it takes away from the API.
+
+Finally, if the database uses ``auto_vacuum = INCREMENTAL``, the freed
+pages are returned to the filesystem in budgeted steps (see vacuum.py).
+"""
+
+import argparse
+import base64
+import sqlite3
+import string
+import time
+from dataclasses import dataclass
+
+from app.config import DATABASE_PATH
+from app.storage import BlobStore, blob_store
+from vacuum import reclaim
+
+# Bytes b64decode would skip anyway; dropping them up front keeps the
+# 4-character alignment between chunks.
+_BASE64_ALPHABET = (string.ascii_letters + string.digits + "+/=").encode()
+_NOT_BASE64 = bytes(set(range(256)) - set(_BASE64_ALPHABET))
+
+PENDING_ROWS = "SELECT id, size FROM files WHERE id > ? AND storage_key IS NULL AND revision_id IS NULL ORDER BY id LIMIT ?"
+
+SWITCH_TO_BLOB = "UPDATE files SET storage_key = ?, sha256 = ?, content = '' WHERE id = ? AND storage_key IS NULL AND revision_id IS NULL"
+
+
+class Base64Decoder:
+    """Decodes base64 that arrives in arbitrarily sized chunks."""
+
+    def __init__(self):
+        self._pending = b""
+
+    def decode(self, chunk: bytes) -> bytes:
+        data = self._pending + chunk.translate(None, _NOT_BASE64)
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        return base64.b64decode(data[:usable])
+
+    def finish(self) -> bytes:
+        pending, self._pending = self._pending, b""
+        if not pending:
+            return b""
+        return base64.b64decode(pending + b"=" * (-len(pending) % 4))
+
+
+class Throttle:
+    """Sleeps as needed to keep the average rate under ``bytes_per_second``."""
+
+    def __init__(self, bytes_per_second: float):
+        self.bytes_per_second = bytes_per_second
+        self.start = time.monotonic()
+        self.total = 0
+
+    def consume(self, amount: int) -> None:
+        self.total += amount
+        if self.bytes_per_second <= 0:
+            return
+        ahead = self.total / self.bytes_per_second - (time.monotonic() - self.start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+@dataclass
+class MigrationStats:
+    rows: int = 0
+    bytes: int = 0
+    skipped: int = 0
+    failed: int = 0
+    last_id: int = 0
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def connect():
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None, timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def migrate_row(conn, store: BlobStore, row_id: int, size: int, chunk_size: int, throttle: Throttle) -> bool:
+    """Move one row's content to the store; returns False if the row was gone."""
+    key = store.new_key()
+    decoder = Base64Decoder()
+    try:
+        # The blob handle reads the column in place, without materialising
+        # the whole base64 string as a Python object.
+        with store.writer(key) as writer, conn.blobopen("files", "content", row_id, readonly=True) as blob:
+            while chunk := blob.read(chunk_size):
+                writer.write(decoder.decode(chunk))
+                throttle.consume(len(chunk))
+            writer.write(decoder.finish())
+
+        if writer.size != size:
+            raise ChecksumMismatch(f"file {row_id}: decoded {writer.size} bytes, expected {size}")
+        if store.checksum(key) != writer.sha256.hexdigest():
+            raise ChecksumMismatch(f"file {row_id}: blob does not match the decoded content")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            switched = conn.execute(SWITCH_TO_BLOB, (key, writer.sha256.hexdigest(), row_id)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    except BaseException:
+        store.delete(key)
+        raise
+
+    if not switched:
+        store.delete(key)
+    return bool(switched)
+
+
+def migrate_blobs(
+    conn,
+    store: BlobStore = blob_store,
+    batch_size: int = 100,
+    chunk_size: int = 4 * 1024 * 1024,
+    max_rate: float = 0,
+    pause: float = 0,
+    start_id: int = 0,
+    limit: int = 0,
+    report_every: float = 5,
+) -> MigrationStats:
+    """Migrate every row without a ``storage_key``, in id order."""
+    # Multiple of 4 so chunks split on base64 quantum boundaries.
+    chunk_size = max(4, chunk_size - chunk_size % 4)
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM files").fetchone()[0]
+    stats = MigrationStats(last_id=start_id)
+    throttle = Throttle(max_rate)
+    started = last_report = time.monotonic()
+
+    while not limit or stats.rows + stats.skipped + stats.failed < limit:
+        batch = conn.execute(PENDING_ROWS, (stats.last_id, batch_size)).fetchall()
+        if not batch:
+            break
+
+        for row_id, size in batch:
+            if limit and stats.rows + stats.skipped + stats.failed >= limit:
+                break
+            stats.last_id = row_id
+            try:
+                if migrate_row(conn, store, row_id, size, chunk_size, throttle):
+                    stats.rows += 1
+                    stats.bytes += size
+                else:
+                    stats.skipped += 1
+            except sqlite3.OperationalError as exc:
+                # The blob handle expires if the row is changed mid-read.
+                print(f"Skipped file {row_id}: {exc}")
+                stats.skipped += 1
+            except (ChecksumMismatch, ValueError) as exc:
+                print(f"Failed file {row_id}: {exc}")
+                stats.failed += 1
+
+            now = time.monotonic()
+            if now - last_report >= report_every:
+                report(stats, max_id, now - started)
+                last_report = now
+
+        if pause:
+            time.sleep(pause)
+
+    report(stats, max_id, time.monotonic() - started)
+    return stats
+
+
+def report(stats: MigrationStats, max_id: int, elapsed: float) -> None:
+    percent = 100 * stats.last_id / max_id if max_id else 100
+    rate = stats.bytes / elapsed / 2**20 if elapsed else 0
+    print(
+        f"id {stats.last_id}/{max_id} ({percent:.1f}%): {stats.rows} migrated, "
+        f"{stats.skipped} skipped, {stats.failed} failed, "
+        f"{stats.bytes / 2**20:.1f} MiB at {rate:.1f} MiB/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move inline file content to the blob store")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows fetched per batch")
+    parser.add_argument("--chunk-size", type=int, default=4 * 1024 * 1024, help="Bytes of base64 read at a time")
+    parser.add_argument("--max-rate", type=float, default=0, help="Max MiB/s of base64 read (0 = unlimited)")
+    parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+    parser.add_argument("--start-id", type=int, default=0, help="Only migrate rows with a larger id")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many rows (0 = all)")
+    parser.add_argument("--report-every", type=float, default=5, help="Seconds between progress lines")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip the incremental vacuum at the end")
+    parser.add_argument("--vacuum-budget-ms", type=float, default=50, help="Write lock budget per vacuum step")
+
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        migrate_blobs(
+            conn,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size,
+            max_rate=args.max_rate * 2**20,
+            pause=args.pause,
+            start_id=args.start_id,
+            limit=args.limit,
+            report_every=args.report_every,
+        )
+        if not args.no_vacuum:
+            reclaim(conn, args.vacuum_budget_ms / 1000)
+    finally:
+        conn.close()
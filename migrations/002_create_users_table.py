@@ -1,32 +1,14 @@
-import sqlite3
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import DATABASE_PATH
-
 MIGRATION_NAME = "002_create_users_table"
 
 
-def upgrade():
-    conn = sqlite3.connect(DATABASE_PATH)
+def upgrade(conn):
     cursor = conn.cursor()
     
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS _migrations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    cursor.execute("SELECT 1 FROM _migrations WHERE name = ?", (MIGRATION_NAME,))
-    if cursor.fetchone():
-        print(f"Migration {MIGRATION_NAME} already applied. Skipping.")
-        conn.close()
-        return
-    
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -35,29 +17,19 @@ def upgrade():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    
-    cursor.execute("INSERT INTO _migrations (name) VALUES (?)", (MIGRATION_NAME,))
-    
-    conn.commit()
-    conn.close()
-    print(f"Migration {MIGRATION_NAME} applied successfully.")
 
 
-def downgrade():
-    conn = sqlite3.connect(DATABASE_PATH)
+def downgrade(conn):
     cursor = conn.cursor()
     
     cursor.execute("DROP TABLE IF EXISTS users")
-    cursor.execute("DELETE FROM _migrations WHERE name = ?", (MIGRATION_NAME,))
-    
-    conn.commit()
-    conn.close()
-    print(f"Migration {MIGRATION_NAME} reverted successfully.")
 
 
 if __name__ == "__main__":
     import argparse
     
+    from migrate import run_single_migration
+    
     parser = argparse.ArgumentParser(description="Run database migration")
     parser.add_argument(
         "action",
@@ -67,7 +39,4 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
-    if args.action == "upgrade":
-        upgrade()
-    elif args.action == "downgrade":
-        downgrade()
+    run_single_migration(sys.modules[__name__], args.action)
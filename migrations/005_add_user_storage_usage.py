@@ -0,0 +1,45 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "005_add_user_storage_usage"
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("ALTER TABLE users ADD COLUMN storage_used INTEGER NOT NULL DEFAULT 0")
+    # NULL means the DEFAULT_STORAGE_QUOTA setting applies.
+    cursor.execute("ALTER TABLE users ADD COLUMN storage_quota INTEGER")
+    
+    # One-off backfill; afterwards the counter is maintained by the routes.
+    cursor.execute("""
+        UPDATE users SET storage_used = (
+            SELECT COALESCE(SUM(size), 0) FROM files WHERE files.user_id = users.id
+        )
+    """)
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("ALTER TABLE users DROP COLUMN storage_quota")
+    cursor.execute("ALTER TABLE users DROP COLUMN storage_used")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
@@ -0,0 +1,45 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "006_add_listing_indexes"
+
+ONLINE = True
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Listings filter on both columns; the root listing (parent IS NULL)
+    # could previously only use the per-user index and scan every file.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_folders_user_parent ON folders(user_id, parent_folder_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_files_user_parent ON files(user_id, parent_folder_id)"
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("DROP INDEX IF EXISTS idx_files_user_parent")
+    cursor.execute("DROP INDEX IF EXISTS idx_folders_user_parent")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
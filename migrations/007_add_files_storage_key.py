@@ -0,0 +1,42 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "007_add_files_storage_key"
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Key of the file's blob in the blob store. NULL means the content is
+    # still inline base64 in files.content; migrate_blobs.py moves it out.
+    cursor.execute("ALTER TABLE files ADD COLUMN storage_key TEXT")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT COUNT(*) FROM files WHERE storage_key IS NOT NULL")
+    if cursor.fetchone()[0]:
+        raise RuntimeError(
+            "Files are stored in the blob store; dropping storage_key would lose their content"
+        )
+    cursor.execute("ALTER TABLE files DROP COLUMN storage_key")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
@@ -0,0 +1,50 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "008_create_jobs_table"
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Background work queued by the routes (see app/jobs.py). run_at is both
+    # when a queued job becomes due and, once claimed, when its claim expires.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_error TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs(status, run_at)")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("DROP TABLE IF EXISTS jobs")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
@@ -0,0 +1,47 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "009_add_files_sha256"
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Hex SHA-256 of the decoded content, computed on upload. NULL for rows
+    # stored before this migration until migrate_blobs.py or a re-upload
+    # fills it in.
+    cursor.execute("ALTER TABLE files ADD COLUMN sha256 TEXT")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    # Without the hash, deletes no longer check whether a blob is shared.
+    cursor.execute(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM files WHERE storage_key IS NOT NULL "
+        "GROUP BY storage_key HAVING COUNT(*) > 1)"
+    )
+    if cursor.fetchone()[0]:
+        raise RuntimeError(
+            "Some blobs are shared by several files; downgrading would let a delete remove content still in use"
+        )
+    cursor.execute("ALTER TABLE files DROP COLUMN sha256")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
@@ -0,0 +1,47 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "010_add_content_indexes"
+
+ONLINE = True
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Instant uploads look up a user's existing content by hash.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_files_user_sha256 ON files(user_id, sha256) "
+        "WHERE sha256 IS NOT NULL"
+    )
+    # Deletes check whether any other file still uses the blob.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_files_storage_key ON files(storage_key) "
+        "WHERE storage_key IS NOT NULL"
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("DROP INDEX IF EXISTS idx_files_storage_key")
+    cursor.execute("DROP INDEX IF EXISTS idx_files_user_sha256")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
@@ -0,0 +1,84 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "011_create_revisions"
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Content-addressed chunks shared by revisions; the blob is named by hash.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_chunks_unreferenced ON chunks(hash) WHERE refcount = 0"
+    )
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_file_revisions_file ON file_revisions(file_id, id)"
+    )
+    
+    # A revision's content: its chunks in order, by byte position.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revision_chunks (
+            revision_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            chunk_hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (revision_id, position),
+            FOREIGN KEY (revision_id) REFERENCES file_revisions(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    
+    # Current revision, set by every upload. NULL only for files stored
+    # before this migration, whose content is in storage_key or inline
+    # until it is first replaced.
+    cursor.execute("ALTER TABLE files ADD COLUMN revision_id INTEGER")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT COUNT(*) FROM files WHERE revision_id IS NOT NULL")
+    if cursor.fetchone()[0]:
+        raise RuntimeError(
+            "Files are stored as revisions; dropping the revision tables would lose their content"
+        )
+    cursor.execute("ALTER TABLE files DROP COLUMN revision_id")
+    cursor.execute("DROP TABLE IF EXISTS revision_chunks")
+    cursor.execute("DROP TABLE IF EXISTS file_revisions")
+    cursor.execute("DROP TABLE IF EXISTS chunks")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
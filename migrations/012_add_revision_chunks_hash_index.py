@@ -0,0 +1,38 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "012_add_revision_chunks_hash_index"
+
+ONLINE = True
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Delta uploads check that referenced chunks belong to the user's files.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_revision_chunks_hash ON revision_chunks(chunk_hash)")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute("DROP INDEX IF EXISTS idx_revision_chunks_hash")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
@@ -0,0 +1,47 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "013_add_trash"
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Set on the root of a trashed subtree only; everything below it is
+    # trashed by being under it.
+    cursor.execute("ALTER TABLE folders ADD COLUMN deleted_at TIMESTAMP")
+    cursor.execute("ALTER TABLE files ADD COLUMN deleted_at TIMESTAMP")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "SELECT (SELECT COUNT(*) FROM folders WHERE deleted_at IS NOT NULL)"
+        " + (SELECT COUNT(*) FROM files WHERE deleted_at IS NOT NULL)"
+    )
+    if cursor.fetchone()[0]:
+        raise RuntimeError(
+            "Items are in the trash; dropping deleted_at would restore them. Empty the trash first"
+        )
+    cursor.execute("ALTER TABLE files DROP COLUMN deleted_at")
+    cursor.execute("ALTER TABLE folders DROP COLUMN deleted_at")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
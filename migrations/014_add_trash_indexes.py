@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MIGRATION_NAME = "014_add_trash_indexes"
+
+ONLINE = True
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+    
+    # Listings only see live rows, so their index leaves the trash out.
+    # Together with the trash index it replaces idx_*_user_parent.
+    for table in ("folders", "files"):
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_live ON {table}(user_id, parent_folder_id) "
+            "WHERE deleted_at IS NULL"
+        )
+        # Trash listings and the purger's look-ups of trashed children.
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_trashed ON {table}(user_id, parent_folder_id) "
+            "WHERE deleted_at IS NOT NULL"
+        )
+        # The purger finds expired trash across all users.
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_deleted_at ON {table}(deleted_at) "
+            "WHERE deleted_at IS NOT NULL"
+        )
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_user_parent")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+    
+    for table in ("files", "folders"):
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_user_parent ON {table}(user_id, parent_folder_id)"
+        )
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_deleted_at")
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_trashed")
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_live")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    from migrate import run_single_migration
+    
+    parser = argparse.ArgumentParser(description="Run database migration")
+    parser.add_argument(
+        "action",
+        choices=["upgrade", "downgrade"],
+        help="Migration action to perform"
+    )
+    
+    args = parser.parse_args()
+    
+    run_single_migration(sys.modules[__name__], args.action)
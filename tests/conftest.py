@@ -1,11 +1,19 @@
 import os
+import shutil
 import sqlite3
 import pytest
 from fastapi.testclient import TestClient
 
 os.environ["DATABASE_PATH"] = "test.db"
+os.environ["ADMIN_EMAILS"] = "admin@example.com"
+os.environ["RATE_LIMIT_STORAGE"] = "memory"
+os.environ["LOGIN_RATE_LIMIT"] = "1000/minute"
+os.environ["BLOB_STORAGE_PATH"] = "test_blobs"
+os.environ["THUMBNAIL_CACHE_PATH"] = "test_thumbnails"
+os.environ["PROFILE_HEADER_ENABLED"] = "true"
 
 from app.main import app
+from app.config import BLOB_STORAGE_PATH, THUMBNAIL_CACHE_PATH
 from app.database import DATABASE_PATH
 
 
@@ -18,7 +26,9 @@ def setup_test_tables():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             email TEXT NOT NULL UNIQUE,
             password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            storage_used INTEGER NOT NULL DEFAULT 0,
+            storage_quota INTEGER
         )
     """)
     
@@ -29,6 +39,7 @@ def setup_test_tables():
             user_id INTEGER NOT NULL,
             parent_folder_id INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            deleted_at TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
             FOREIGN KEY (parent_folder_id) REFERENCES folders(id) ON DELETE CASCADE
         )
@@ -44,26 +55,103 @@ def setup_test_tables():
             user_id INTEGER NOT NULL,
             parent_folder_id INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            storage_key TEXT,
+            sha256 TEXT,
+            revision_id INTEGER,
+            deleted_at TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
             FOREIGN KEY (parent_folder_id) REFERENCES folders(id) ON DELETE CASCADE
         )
     """)
     
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revision_chunks (
+            revision_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            chunk_hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (revision_id, position),
+            FOREIGN KEY (revision_id) REFERENCES file_revisions(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_error TEXT
+        )
+    """)
+    
+    for table in ("folders", "files"):
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_live ON {table}(user_id, parent_folder_id) "
+            "WHERE deleted_at IS NULL"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_trashed ON {table}(user_id, parent_folder_id) "
+            "WHERE deleted_at IS NOT NULL"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_deleted_at ON {table}(deleted_at) WHERE deleted_at IS NOT NULL"
+        )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs(status, run_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chunks_unreferenced ON chunks(hash) WHERE refcount = 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_revisions_file ON file_revisions(file_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_revision_chunks_hash ON revision_chunks(chunk_hash)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_files_user_sha256 ON files(user_id, sha256) WHERE sha256 IS NOT NULL"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_files_storage_key ON files(storage_key) WHERE storage_key IS NOT NULL"
+    )
+    
     conn.commit()
     conn.close()
 
 
+def remove_test_database():
+    for path in (DATABASE_PATH, DATABASE_PATH + "-wal", DATABASE_PATH + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(BLOB_STORAGE_PATH, ignore_errors=True)
+    shutil.rmtree(THUMBNAIL_CACHE_PATH, ignore_errors=True)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
-    if os.path.exists(DATABASE_PATH):
-        os.remove(DATABASE_PATH)
+    remove_test_database()
     
     setup_test_tables()
     
     yield
     
-    if os.path.exists(DATABASE_PATH):
-        os.remove(DATABASE_PATH)
+    remove_test_database()
 
 
 @pytest.fixture
@@ -84,3 +172,18 @@ def auth_headers(client):
     token = response.json()["access_token"]
     
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_headers(client):
+    user_data = {
+        "email": "admin@example.com",
+        "password": "AdminPass123!"
+    }
+    
+    client.post("/auth/register", json=user_data)
+    
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+    
+    return {"Authorization": f"Bearer {token}"}
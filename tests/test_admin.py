@@ -0,0 +1,67 @@
+import base64
+import logging
+import os
+
+import app.database
+from app.database import get_db, query_stats
+
+
+def test_query_stats_requires_admin(client, auth_headers):
+    response = client.get("/admin/query-stats", headers=auth_headers)
+
+    assert response.status_code == 403
+
+
+def test_query_stats_aggregates_by_template(client, admin_headers):
+    client.delete("/admin/query-stats", headers=admin_headers)
+    client.post("/folders", json={"name": "Stats1"}, headers=admin_headers)
+    client.post("/folders", json={"name": "Stats2"}, headers=admin_headers)
+
+    response = client.get("/admin/query-stats", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json()["worker"] == os.getpid()
+    statements = {s["sql"]: s for s in response.json()["statements"]}
+    insert = statements["INSERT INTO folders (name, user_id, parent_folder_id) VALUES (?, ?, ?)"]
+    assert insert["count"] == 2
+    assert insert["rows"] == 2
+    lookup = statements["SELECT id, email FROM users WHERE id = ?"]
+    assert lookup["count"] >= 2
+    assert lookup["rows"] == lookup["count"]
+    assert lookup["max_ms"] >= lookup["mean_ms"] >= 0
+
+
+def test_slow_query_logs_plan(monkeypatch, caplog):
+    monkeypatch.setattr(app.database, "SLOW_QUERY_MS", 0)
+    query_stats.reset()
+
+    with caplog.at_level(logging.WARNING, logger="app.database"):
+        with get_db() as conn:
+            conn.execute("SELECT id FROM folders WHERE user_id = ?", (1,)).fetchall()
+
+    assert "Slow query" in caplog.text
+    assert "plan: SCAN" in caplog.text or "plan: SEARCH" in caplog.text
+
+
+def test_storage_report(client, admin_headers):
+    response = client.get("/admin/storage", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["page_count"] >= data["freelist_count"] >= 0
+    assert data["file_bytes"] == data["page_count"] * data["page_size"]
+    assert data["scheduler"]["running"] is False
+
+
+def test_dedup_report(client, admin_headers):
+    content = base64.b64encode(b"duplicated content").decode()
+    for name in ("first.txt", "second.txt"):
+        client.post("/files", json={"name": name, "content": content}, headers=admin_headers)
+
+    response = client.get("/admin/dedup", headers=admin_headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["logical_bytes"] >= report["stored_bytes"] + len(b"duplicated content")
+    assert report["dedup_ratio"] > 1
+    assert "storage_dedup_ratio" in client.get("/metrics").text
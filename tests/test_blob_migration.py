@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import os
+import sqlite3
+
+import pytest
+
+import migrate_blobs
+from app.database import DATABASE_PATH
+from app.storage import blob_store
+
+
+@pytest.fixture
+def blob_user(client):
+    user_data = {
+        "email": "blobuser@example.com",
+        "password": "BlobPass123!"
+    }
+
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+    conn = sqlite3.connect(DATABASE_PATH)
+    user_id = conn.execute("SELECT id FROM users WHERE email = ?", (user_data["email"],)).fetchone()[0]
+    conn.close()
+
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+def insert_legacy_file(user_id, name, data, wrap=False):
+    encoded = base64.encodebytes(data).decode() if wrap else base64.b64encode(data).decode()
+    conn = sqlite3.connect(DATABASE_PATH)
+    cursor = conn.execute(
+        "INSERT INTO files (name, content, size, mime_type, user_id) VALUES (?, ?, ?, ?, ?)",
+        (name, encoded, len(data), "application/octet-stream", user_id),
+    )
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+
+def stored_row(file_id):
+    conn = sqlite3.connect(DATABASE_PATH)
+    row = conn.execute("SELECT content, storage_key FROM files WHERE id = ?", (file_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_decoder_handles_any_chunking():
+    data = os.urandom(1000)
+    encoded = base64.encodebytes(data)
+
+    for chunk_size in (1, 3, 5, 76, 77, 4096):
+        decoder = migrate_blobs.Base64Decoder()
+        out = b"".join(
+            decoder.decode(encoded[i:i + chunk_size]) for i in range(0, len(encoded), chunk_size)
+        )
+        assert out + decoder.finish() == data
+
+
+def test_legacy_files_are_moved_to_blob_store(client, blob_user):
+    user_id, headers = blob_user
+    payloads = {
+        insert_legacy_file(user_id, "empty.bin", b""): b"",
+        insert_legacy_file(user_id, "small.bin", b"legacy content"): b"legacy content",
+        insert_legacy_file(user_id, "wrapped.bin", os.urandom(5000), wrap=True): None,
+    }
+    wrapped_id = max(payloads)
+    payloads[wrapped_id] = client.get(f"/files/{wrapped_id}/download", headers=headers).content
+
+    conn = migrate_blobs.connect()
+    stats = migrate_blobs.migrate_blobs(conn, chunk_size=7)
+    again = migrate_blobs.migrate_blobs(conn)
+    conn.close()
+
+    assert stats.rows >= 3 and stats.failed == 0
+    assert again.rows == 0
+    for file_id, data in payloads.items():
+        content, storage_key = stored_row(file_id)
+        assert content == ""
+        assert blob_store.read(storage_key) == data
+        response = client.get(f"/files/{file_id}/download", headers=headers)
+        assert response.content == data
+        assert client.get(f"/files/{file_id}", headers=headers).json()["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_size_mismatch_leaves_row_untouched(client, blob_user):
+    user_id, _ = blob_user
+    file_id = insert_legacy_file(user_id, "bad.bin", b"twelve bytes")
+    conn = sqlite3.connect(DATABASE_PATH)
+    conn.execute("UPDATE files SET size = 99 WHERE id = ?", (file_id,))
+    conn.commit()
+    conn.close()
+
+    conn = migrate_blobs.connect()
+    stats = migrate_blobs.migrate_blobs(conn, start_id=file_id - 1, limit=1)
+    conn.close()
+
+    assert stats.failed == 1
+    content, storage_key = stored_row(file_id)
+    assert storage_key is None
+    assert base64.b64decode(content) == b"twelve bytes"
+
+
+def test_new_uploads_are_left_alone(client, blob_user):
+    _, headers = blob_user
+    response = client.post(
+        "/files",
+        json={"name": "new.txt", "content": base64.b64encode(b"fresh").decode()},
+        headers=headers,
+    )
+    file_id = response.json()["id"]
+
+    conn = migrate_blobs.connect()
+    stats = migrate_blobs.migrate_blobs(conn, start_id=file_id - 1, limit=1)
+    conn.close()
+
+    # Uploads are stored as chunks, so there is nothing to migrate.
+    assert stats.rows == 0
+    content, storage_key = stored_row(file_id)
+    assert content == ""
+    assert storage_key is None
+    assert client.get(f"/files/{file_id}/download", headers=headers).content == b"fresh"
@@ -0,0 +1,129 @@
+import base64
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.download_cache import download_cache
+from app.middleware.compression import CompressionMiddleware, is_compressible, negotiate
+
+
+@pytest.fixture
+def user_headers(client):
+    user_data = {"email": f"compress-{uuid.uuid4().hex[:8]}@example.com", "password": "TestPass123!"}
+    client.post("/auth/register", json=user_data)
+    token = client.post("/auth/login", json=user_data).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def upload(client, headers, name, content):
+    response = client.post(
+        "/files",
+        json={"name": name, "content": base64.b64encode(content).decode()},
+        headers=headers,
+    )
+    return response.json()["id"]
+
+
+def test_text_download_is_gzipped(client, user_headers):
+    content = b"hello compression\n" * 500
+    file_id = upload(client, user_headers, "notes.txt", content)
+
+    response = client.get(f"/files/{file_id}/download", headers={**user_headers, "Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) < len(content)
+    assert response.content == content
+
+
+def test_encoded_download_has_weak_etag_and_no_ranges(client, user_headers, monkeypatch):
+    # Served from the blob, not the download cache, so it carries an ETag.
+    monkeypatch.setattr(download_cache, "max_item_bytes", 0)
+    content = b"ranged text\n" * 500
+    file_id = upload(client, user_headers, "ranged.txt", content)
+    url = f"/files/{file_id}/download"
+
+    identity = client.get(url, headers={**user_headers, "Accept-Encoding": "identity"})
+    encoded = client.get(url, headers={**user_headers, "Accept-Encoding": "gzip"})
+
+    assert identity.headers["accept-ranges"] == "bytes"
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["etag"] == "W/" + identity.headers["etag"]
+    assert "accept-ranges" not in encoded.headers
+
+    # A weak validator never satisfies If-Range: the whole body comes back.
+    response = client.get(
+        url,
+        headers={**user_headers, "Accept-Encoding": "gzip", "Range": "bytes=0-9", "If-Range": encoded.headers["etag"]},
+    )
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_compressed_mime_type_is_not_recompressed(client, user_headers):
+    file_id = upload(client, user_headers, "photo.png", b"\x89PNG" + b"\x00" * 5000)
+
+    response = client.get(f"/files/{file_id}/download", headers={**user_headers, "Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_small_responses_are_not_compressed(client, user_headers):
+    response = client.get("/folders/root", headers={**user_headers, "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_without_accept_encoding_body_is_identity(client, user_headers):
+    file_id = upload(client, user_headers, "plain.txt", b"x" * 5000)
+
+    response = client.get(f"/files/{file_id}/download", headers={**user_headers, "Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b"x" * 5000
+
+
+def test_streamed_and_offloaded_bodies():
+    app = FastAPI()
+    chunks = [b"chunk-%d " % i * 200 for i in range(20)]
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(chunks), media_type="text/plain")
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse("y" * 10000)
+
+    app.add_middleware(CompressionMiddleware, minimum_size=100, offload_size=1000)
+    client = TestClient(app)
+
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert "content-length" not in streamed.headers
+    assert streamed.content == b"".join(chunks)
+
+    large = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.text == "y" * 10000
+
+
+def test_negotiation():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") is not None
+    assert negotiate("deflate") is None
+
+
+def test_content_type_rules():
+    assert is_compressible("application/json")
+    assert is_compressible("text/plain; charset=utf-8")
+    assert is_compressible("image/svg+xml")
+    assert not is_compressible("image/jpeg")
+    assert not is_compressible("application/zip")
+    assert not is_compressible("application/epub+zip")
+    assert not is_compressible("text/event-stream")
@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pytest
+
+from app.database import get_db
+
+
+def test_connection_is_reused_within_a_thread():
+    with get_db() as first:
+        pass
+    with get_db() as second:
+        pass
+
+    assert first is second
+
+
+def test_threads_get_their_own_connection():
+    with get_db() as main_conn:
+        pass
+
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(get_db().__enter__()))
+    thread.start()
+    thread.join()
+
+    assert seen[0] is not main_conn
+
+
+def test_nested_block_joins_outer_transaction():
+    with pytest.raises(RuntimeError):
+        with get_db() as conn:
+            conn.execute("INSERT INTO users (email, password_hash) VALUES ('nested@example.com', 'x')")
+            with get_db() as inner:
+                inner.execute("SELECT 1").fetchone()
+            raise RuntimeError("abort")
+
+    with get_db() as conn:
+        row = conn.execute("SELECT id FROM users WHERE email = 'nested@example.com'").fetchone()
+
+    assert row is None
+
+
+@pytest.mark.parametrize("interrupt", [KeyboardInterrupt, GeneratorExit])
+def test_interrupted_block_is_rolled_back(interrupt):
+    with pytest.raises(interrupt):
+        with get_db() as conn:
+            conn.execute("INSERT INTO users (email, password_hash) VALUES ('interrupted@example.com', 'x')")
+            raise interrupt()
+
+    with get_db() as conn:
+        row = conn.execute("SELECT id FROM users WHERE email = 'interrupted@example.com'").fetchone()
+
+    assert row is None
+
+
+def test_forked_child_opens_its_own_connection():
+    with get_db() as parent_conn:
+        pass
+
+    pid = os.fork()
+    if pid == 0:
+        with get_db() as child_conn:
+            child_conn.execute("SELECT 1").fetchone()
+        os._exit(0 if child_conn is not parent_conn else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,70 @@
+import base64
+
+import pytest
+
+from app.download_cache import ContentCache, download_cache
+
+
+@pytest.fixture
+def cache_headers(client):
+    user_data = {
+        "email": "cacheuser@example.com",
+        "password": "CachePass123!"
+    }
+
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_lru_respects_byte_budget():
+    cache = ContentCache(max_bytes=250, max_item_bytes=100)
+    cache.put(1, "a", b"x" * 100)
+    cache.put(2, "a", b"x" * 100)
+    assert cache.get(1, "a") is not None
+
+    cache.put(3, "a", b"x" * 100)
+    cache.put(4, "a", b"x" * 101)
+
+    assert cache.get(2, "a") is None
+    assert cache.get(1, "a") is not None
+    assert cache.get(4, "a") is None
+    assert cache.total == 200
+
+
+def test_new_version_replaces_old_one():
+    cache = ContentCache(max_bytes=1000, max_item_bytes=100)
+    cache.put(1, "v1", b"old")
+
+    assert cache.get(1, "v2") is None
+    assert cache.total == 0
+
+    cache.put(1, "v2", b"new")
+    assert cache.get(1, "v2") == b"new"
+    assert cache.hit_ratio() == 0.5
+
+
+def test_downloads_hit_cache_across_renames(client, cache_headers):
+    download_cache.clear()
+    response = client.post(
+        "/files",
+        json={"name": "logo.txt", "content": base64.b64encode(b"small and popular").decode()},
+        headers=cache_headers,
+    )
+    file_id = response.json()["id"]
+
+    first = client.get(f"/files/{file_id}/download", headers=cache_headers)
+    hits = download_cache.hits
+    client.patch(f"/files/{file_id}", json={"name": "brand.txt"}, headers=cache_headers)
+    second = client.get(f"/files/{file_id}/download", headers=cache_headers)
+
+    assert first.content == second.content == b"small and popular"
+    assert download_cache.hits == hits + 1
+    assert 'filename="brand.txt"' in second.headers["content-disposition"]
+    assert "download_cache_hit_ratio" in client.get("/metrics").text
+
+    client.delete(f"/files/{file_id}", headers=cache_headers)
+    assert download_cache.get(file_id, "anything") is None
+    assert client.get(f"/files/{file_id}/download", headers=cache_headers).status_code == 404
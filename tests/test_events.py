@@ -0,0 +1,171 @@
+import asyncio
+import base64
+import pytest
+
+from app.events import EventHub, SQLiteEventRelay, hub
+from app.main import app
+from app.maintenance import VacuumScheduler
+from app.metrics import REQUESTS_IN_FLIGHT
+
+
+@pytest.fixture
+def event_user(client):
+    user_data = {
+        "email": "eventuser@example.com",
+        "password": "EventPass123!"
+    }
+
+    register_response = client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+
+    return register_response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+
+def test_subscription_buffer_is_bounded():
+    async def scenario():
+        local_hub = EventHub(buffer_size=2)
+        subscription = local_hub.subscribe(1)
+
+        for i in range(5):
+            local_hub.publish(1, "file.created", id=i)
+        await asyncio.sleep(0)
+
+        resync = await subscription.get(timeout=0.1)
+        first = await subscription.get(timeout=0.1)
+        second = await subscription.get(timeout=0.1)
+        empty = await subscription.get(timeout=0.01)
+        return resync, first, second, empty
+
+    resync, first, second, empty = asyncio.run(scenario())
+
+    assert resync == {"type": "resync", "dropped": 3}
+    assert first["id"] == 3
+    assert second["id"] == 4
+    assert empty is None
+
+
+def test_unsubscribe_stops_delivery():
+    async def scenario():
+        local_hub = EventHub()
+        subscription = local_hub.subscribe(1)
+        local_hub.unsubscribe(subscription)
+        local_hub.publish(1, "folder.created", id=1)
+        await asyncio.sleep(0)
+        return local_hub.connection_count(), await subscription.get(timeout=0.01)
+
+    count, event = asyncio.run(scenario())
+
+    assert count == 0
+    assert event is None
+
+
+def test_routes_publish_events(client, event_user):
+    user_id, headers = event_user
+
+    async def scenario():
+        subscription = hub.subscribe(user_id)
+        try:
+            folder = await asyncio.to_thread(
+                client.post, "/folders", json={"name": "Watched"}, headers=headers
+            )
+            folder_id = folder.json()["id"]
+            content = base64.b64encode(b"event").decode()
+            created = await asyncio.to_thread(
+                client.post,
+                "/files",
+                json={"name": "watched.txt", "content": content},
+                headers=headers,
+            )
+            file_id = created.json()["id"]
+            await asyncio.to_thread(
+                client.patch,
+                f"/files/{file_id}",
+                json={"parent_folder_id": folder_id},
+                headers=headers,
+            )
+            await asyncio.to_thread(client.delete, f"/files/{file_id}", headers=headers)
+
+            events = []
+            for _ in range(4):
+                events.append(await subscription.get(timeout=1))
+            return events
+        finally:
+            hub.unsubscribe(subscription)
+
+    events = asyncio.run(scenario())
+
+    assert [event["type"] for event in events] == [
+        "folder.created",
+        "file.created",
+        "file.moved",
+        "file.deleted",
+    ]
+    assert events[1]["name"] == "watched.txt"
+
+
+def test_open_stream_leaves_the_worker_idle(auth_headers):
+    scheduler = VacuumScheduler(max_in_flight=0)
+
+    async def scenario():
+        started = asyncio.Event()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/events",
+            "raw_path": b"/events",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"authorization", auth_headers["Authorization"].encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        stream = asyncio.create_task(app(scope, receive, send))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        during = (hub.connection_count(), REQUESTS_IN_FLIGHT.total(), scheduler.is_idle())
+        disconnect.set()
+        await asyncio.wait_for(stream, timeout=5)
+        return during
+
+    streams, in_flight, idle = asyncio.run(scenario())
+
+    assert streams == 1
+    assert in_flight == 0
+    assert idle
+    assert hub.connection_count() == 0
+    assert REQUESTS_IN_FLIGHT.total() == 0
+
+
+def test_sqlite_relay_reaches_other_processes_hubs(tmp_path):
+    path = str(tmp_path / "events.db")
+
+    async def scenario():
+        publisher, receiver = EventHub(), EventHub()
+        publisher.relay = SQLiteEventRelay(publisher, path=path)
+        relay = SQLiteEventRelay(receiver, path=path)
+        subscription = receiver.subscribe(7)
+
+        publisher.publish(7, "file.created", id=1)
+        publisher.publish(8, "file.created", id=2)
+        delivered = relay.poll_once()
+        await asyncio.sleep(0)
+        return delivered, await subscription.get(timeout=0.1), relay.poll_once()
+
+    delivered, event, again = asyncio.run(scenario())
+
+    assert delivered == 2
+    assert event == {"type": "file.created", "id": 1}
+    assert again == 0
@@ -1,6 +1,22 @@
 import base64
+import hashlib
+import os
+import sqlite3
+
 import pytest
 
+from app.chunks import collect
+from app.database import DATABASE_PATH
+from app.storage import blob_store
+from app.trash import purge_trash
+
+
+def purge_now(client, headers):
+    """Empty the trash and run the purge and chunk collection it queues."""
+    client.delete("/trash", headers=headers)
+    purge_trash({})
+    collect()
+
 
 @pytest.fixture
 def file_user_headers(client):
@@ -225,3 +241,94 @@ def test_move_file_to_root(client, file_user_headers):
     
     assert response.status_code == 200
     assert response.json()["parent_folder_id"] is None
+
+
+def test_upload_records_sha256(client, file_user_headers):
+    data = b"checksummed content"
+    sha256 = hashlib.sha256(data).hexdigest()
+    
+    response = client.post(
+        "/files",
+        json={"name": "sum.txt", "content": base64.b64encode(data).decode(), "sha256": sha256.upper()},
+        headers=file_user_headers
+    )
+    assert response.status_code == 201
+    assert response.json()["sha256"] == sha256
+    
+    response = client.post(
+        "/files",
+        json={"name": "bad.txt", "content": base64.b64encode(data).decode(), "sha256": "0" * 64},
+        headers=file_user_headers
+    )
+    assert response.status_code == 400
+    
+    response = client.post(
+        "/files",
+        json={"name": "bad.txt", "content": base64.b64encode(data).decode(), "sha256": "not-a-hash"},
+        headers=file_user_headers
+    )
+    assert response.status_code == 400
+
+
+def test_instant_upload_shares_content(client, file_user_headers):
+    data = os.urandom(2048)
+    sha256 = hashlib.sha256(data).hexdigest()
+    
+    response = client.post("/files", json={"name": "copy.bin", "sha256": sha256}, headers=file_user_headers)
+    assert response.status_code == 412
+    
+    original = client.post(
+        "/files",
+        json={"name": "original.bin", "content": base64.b64encode(data).decode()},
+        headers=file_user_headers
+    ).json()
+    used = client.get("/users/me/usage", headers=file_user_headers).json()["used"]
+    
+    response = client.post("/files", json={"name": "copy.bin", "sha256": sha256}, headers=file_user_headers)
+    assert response.status_code == 201
+    copy = response.json()
+    assert copy["size"] == 2048
+    assert copy["sha256"] == sha256
+    assert client.get("/users/me/usage", headers=file_user_headers).json()["used"] == used + 2048
+    
+    # Re-uploading known content stores nothing new either.
+    again = client.post(
+        "/files",
+        json={"name": "again.bin", "content": base64.b64encode(data).decode()},
+        headers=file_user_headers
+    ).json()
+    
+    # Content this small is a single chunk, named by the content's hash.
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        [(refcount,)] = conn.execute("SELECT refcount FROM chunks WHERE hash = ?", (sha256,)).fetchall()
+    assert refcount == 3
+    assert again["sha256"] == sha256
+    
+    # The chunk outlives all but the last file that uses it.
+    client.delete(f"/files/{original['id']}", headers=file_user_headers)
+    client.delete(f"/files/{again['id']}", headers=file_user_headers)
+    purge_now(client, file_user_headers)
+    assert client.get(f"/files/{copy['id']}/download", headers=file_user_headers).content == data
+    client.delete(f"/files/{copy['id']}", headers=file_user_headers)
+    purge_now(client, file_user_headers)
+    assert not os.path.exists(blob_store.path(sha256))
+
+
+def test_instant_upload_is_per_user(client, file_user_headers):
+    data = b"private content"
+    client.post(
+        "/files",
+        json={"name": "mine.txt", "content": base64.b64encode(data).decode()},
+        headers=file_user_headers
+    )
+    
+    other = {"email": "otherfileuser@example.com", "password": "OtherPass123!"}
+    client.post("/auth/register", json=other)
+    token = client.post("/auth/login", json=other).json()["access_token"]
+    
+    response = client.post(
+        "/files",
+        json={"name": "guess.txt", "sha256": hashlib.sha256(data).hexdigest()},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 412
@@ -102,7 +102,7 @@ def test_delete_empty_folder(client, folder_user_headers):
     assert response.status_code == 204
 
 
-def test_delete_non_empty_folder(client, folder_user_headers):
+def test_delete_non_empty_folder_trashes_subtree(client, folder_user_headers):
     parent_response = client.post(
         "/folders",
         json={"name": "ParentToDelete"},
@@ -110,19 +110,23 @@ def test_delete_non_empty_folder(client, folder_user_headers):
     )
     parent_id = parent_response.json()["id"]
     
-    client.post(
+    child_response = client.post(
         "/folders",
         json={"name": "ChildFolder", "parent_folder_id": parent_id},
         headers=folder_user_headers
     )
+    child_id = child_response.json()["id"]
     
     response = client.delete(
         f"/folders/{parent_id}",
         headers=folder_user_headers
     )
     
-    assert response.status_code == 400
-    assert "not empty" in response.json()["detail"]
+    assert response.status_code == 204
+    # Everything below the deleted folder is gone with it.
+    assert client.get(f"/folders/{child_id}", headers=folder_user_headers).status_code == 404
+    root = client.get("/folders/root", headers=folder_user_headers).json()
+    assert parent_id not in [folder["id"] for folder in root["folders"]]
 
 
 def test_folder_not_found(client, folder_user_headers):
@@ -0,0 +1,100 @@
+import base64
+import json
+import time
+
+import pytest
+
+from app import jobs, queries
+from app.database import get_db
+from app.thumbnails import thumbnails
+
+
+@pytest.fixture
+def empty_queue():
+    with get_db() as conn:
+        conn.execute("DELETE FROM jobs")
+    yield
+    jobs.handlers.pop("test.job", None)
+
+
+def job_rows():
+    with get_db() as conn:
+        return [dict(row) for row in conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()]
+
+
+def test_job_runs_and_is_deleted(empty_queue):
+    seen = []
+    jobs.job_handler("test.job")(seen.append)
+
+    with get_db() as conn:
+        jobs.enqueue(conn.cursor(), "test.job", {"n": 1})
+
+    assert jobs.run_next() is True
+    assert seen == [{"n": 1}]
+    assert job_rows() == []
+    assert jobs.run_next() is False
+
+
+def test_failed_job_backs_off_then_dies(empty_queue):
+    def fail(payload):
+        raise ValueError("nope")
+
+    jobs.job_handler("test.job")(fail)
+    with get_db() as conn:
+        jobs.enqueue(conn.cursor(), "test.job", {}, max_attempts=2)
+
+    assert jobs.run_next() is True
+    [row] = job_rows()
+    assert row["status"] == "queued"
+    assert row["attempts"] == 1
+    assert row["run_at"] > time.time()
+    assert row["last_error"] == "ValueError: nope"
+    # Backing off: not due yet.
+    assert jobs.run_next() is False
+
+    with get_db() as conn:
+        conn.execute("UPDATE jobs SET run_at = 0")
+    assert jobs.run_next() is True
+    [row] = job_rows()
+    assert row["status"] == "dead"
+    assert jobs.dead_jobs()[0]["id"] == row["id"]
+    assert jobs.run_next() is False
+
+
+def test_claimed_job_reappears_after_visibility_timeout(empty_queue):
+    seen = []
+    jobs.job_handler("test.job")(seen.append)
+    with get_db() as conn:
+        jobs.enqueue(conn.cursor(), "test.job", {})
+        # A worker claims the job and then dies without finishing it.
+        now = time.time()
+        conn.execute(queries.CLAIM_JOB, (now + 0.2, now)).fetchone()
+
+    assert jobs.run_next() is False
+    time.sleep(0.25)
+    assert jobs.run_next() is True
+    assert seen == [{}]
+
+
+def test_retry_delay_grows_and_is_capped():
+    assert 0.9 <= jobs.retry_delay(1) <= 1.1
+    assert 7.2 <= jobs.retry_delay(4) <= 8.8
+    assert jobs.retry_delay(30) <= jobs.JOB_RETRY_MAX * 1.1
+
+
+def test_upload_queues_thumbnail_job(client, auth_headers, empty_queue):
+    response = client.post(
+        "/files",
+        json={"name": "queued.txt", "content": base64.b64encode(b"queued preview").decode()},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+
+    [row] = job_rows()
+    assert row["kind"] == "thumbnails.render"
+    assert jobs.queue_depth() == {"queued": {"thumbnails.render": 1}}
+    assert "job_queue_depth" in client.get("/metrics").text
+
+    assert jobs.run_next() is True
+    source_key = json.loads(row["payload"])["source_key"]
+    assert thumbnails.cache.get(thumbnails.key(source_key, 128)) is not None
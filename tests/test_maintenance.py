@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+import vacuum
+from app.maintenance import VacuumScheduler, fragmentation, storage_stats
+
+
+def make_database(path, incremental=True, rows=50):
+    conn = sqlite3.connect(path, isolation_level=None)
+    if incremental:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, content TEXT NOT NULL)")
+    conn.executemany("INSERT INTO files (content) VALUES (?)", [("x" * 20000,) for _ in range(rows)])
+    conn.execute("DELETE FROM files WHERE id % 2 = 0")
+    return conn
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "maintenance.db")
+    conn = make_database(path)
+    yield path, conn
+    conn.close()
+
+
+def test_scheduler_releases_free_pages(database):
+    path, conn = database
+    before = storage_stats(conn)
+    assert before.auto_vacuum == "incremental"
+    assert before.freelist_count > 0
+
+    scheduler = VacuumScheduler(path, step_budget=0.05, min_free_pages=1, load=lambda: 0)
+    freed = scheduler.run_once()
+    scheduler.stop()
+
+    after = storage_stats(conn)
+    assert freed == before.freelist_count
+    assert after.freelist_count == 0
+    assert after.page_count == before.page_count - freed
+
+
+def test_scheduler_waits_for_low_load(database):
+    path, conn = database
+    scheduler = VacuumScheduler(path, min_free_pages=1, max_in_flight=0, load=lambda: 3)
+
+    assert scheduler.run_once() == 0
+    scheduler.stop()
+    assert storage_stats(conn).freelist_count > 0
+
+
+def test_scheduler_skips_small_freelists(database):
+    path, conn = database
+    scheduler = VacuumScheduler(path, min_free_pages=10**6, load=lambda: 0)
+
+    assert scheduler.run_once() == 0
+    scheduler.stop()
+
+
+def test_step_size_follows_budget(database):
+    path, _ = database
+    scheduler = VacuumScheduler(path, step_budget=0.01)
+
+    # A step took 4x half the budget: shrink 4x; a fast one: grow 2x at most.
+    scheduler._resize(0.02)
+    assert scheduler.pages_per_step == 16
+    scheduler._resize(0.0001)
+    assert scheduler.pages_per_step == 32
+
+    for _ in range(20):
+        scheduler._resize(0.0001)
+    assert scheduler.pages_per_step == VacuumScheduler.MAX_STEP_PAGES
+
+
+def test_reclaim_needs_incremental_mode(tmp_path):
+    conn = make_database(str(tmp_path / "plain.db"), incremental=False)
+
+    assert vacuum.reclaim(conn) == 0
+    assert storage_stats(conn).freelist_count > 0
+
+    vacuum.enable_incremental(conn)
+    assert storage_stats(conn).auto_vacuum == "incremental"
+    conn.close()
+
+
+def test_fragmentation_is_a_ratio(database):
+    _, conn = database
+    value = fragmentation(conn)
+
+    assert value is None or 0 <= value <= 1
@@ -0,0 +1,49 @@
+import os
+
+from app.metrics import Histogram, with_label
+
+
+def test_metrics_endpoint_exposes_route_templates(client, auth_headers):
+    client.get("/folders/99999", headers=auth_headers)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'route="/folders/{folder_id}"' in body
+    assert 'route="/folders/99999"' not in body
+    worker = f'worker="{os.getpid()}"'
+    assert f'http_requests_total{{method="GET",route="/folders/{{folder_id}}",status="404",{worker}}}' in body
+    assert 'quantile="0.99"' in body
+    assert "http_requests_in_flight" in body
+
+
+def test_unmatched_routes_share_one_label(client):
+    client.get("/no-such-path/123")
+    client.get("/no-such-path/456")
+
+    body = client.get("/metrics").text
+
+    assert 'route="unmatched"' in body
+    assert "/no-such-path" not in body
+
+
+def test_with_label():
+    pair = 'worker="7"'
+
+    assert with_label('a_total{route="/files/{file_id}"} 3', pair) == 'a_total{route="/files/{file_id}",worker="7"} 3'
+    assert with_label("a_total 3", pair) == 'a_total{worker="7"} 3'
+    assert with_label("# TYPE a_total counter", pair) == "# TYPE a_total counter"
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.2, 0.3))
+    for value in (0.05,) * 50 + (0.15,) * 45 + (0.25,) * 5:
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert 0 < histogram.quantile(0.5) <= 0.1
+    assert 0.1 < histogram.quantile(0.95) <= 0.2
+    assert 0.2 < histogram.quantile(0.99) <= 0.3
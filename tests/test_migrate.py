@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+
+import pytest
+
+import migrate
+
+ONLINE_MIGRATIONS = [
+    "006_add_listing_indexes",
+    "010_add_content_indexes",
+    "012_add_revision_chunks_hash_index",
+    "014_add_trash_indexes",
+]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = str(tmp_path / "migrate.db")
+    monkeypatch.setattr(migrate, "DATABASE_PATH", path)
+    return path
+
+
+def tables_and_indexes(path):
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    conn.close()
+    return names
+
+
+def test_upgrade_applies_everything_then_takes_fast_path(database):
+    conn = migrate.connect()
+    applied = migrate.upgrade(conn)
+    again = migrate.upgrade(conn)
+    conn.close()
+
+    names = [name for name, _ in applied]
+    assert sorted(names) == [migrate.migration_name(f) for f in migrate.get_migration_files()]
+    # Online migrations run after the batch.
+    assert names[-4:] == ONLINE_MIGRATIONS
+    assert again == []
+    assert {"users", "folders", "files", "idx_files_live"} <= tables_and_indexes(database)
+
+
+def test_failed_migration_rolls_back_the_batch(database, tmp_path, monkeypatch):
+    broken = tmp_path / "999_broken.py"
+    broken.write_text(
+        'MIGRATION_NAME = "999_broken"\n'
+        "def upgrade(conn):\n"
+        '    raise RuntimeError("boom")\n'
+    )
+    files = migrate.get_migration_files() + [str(broken)]
+    monkeypatch.setattr(migrate, "get_migration_files", lambda: files)
+
+    conn = migrate.connect()
+    with pytest.raises(RuntimeError):
+        migrate.upgrade(conn)
+
+    assert migrate.applied_migrations(conn) == set()
+    conn.close()
+    assert "users" not in tables_and_indexes(database)
+
+
+def test_concurrent_upgrades_apply_each_migration_once(database):
+    results, errors = [], []
+
+    def run():
+        conn = migrate.connect()
+        try:
+            results.append(migrate.upgrade(conn))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    applied = [name for timings in results for name, _ in timings]
+    assert errors == []
+    assert sorted(applied) == sorted(migrate.migration_name(f) for f in migrate.get_migration_files())
+
+
+def test_online_migrations_can_be_deferred(database):
+    conn = migrate.connect()
+    migrate.upgrade(conn, include_online=False)
+
+    pending = [migrate.migration_name(f) for f in migrate.pending_migrations(conn)]
+    conn.close()
+
+    assert pending == ONLINE_MIGRATIONS
+    assert "idx_files_live" not in tables_and_indexes(database)
+
+
+def test_new_database_uses_incremental_auto_vacuum(database):
+    conn = migrate.connect()
+    migrate.upgrade(conn)
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    conn.close()
+
+    assert mode == 2
@@ -0,0 +1,59 @@
+import base64
+
+from app.database import get_db
+from app.profiling import Profile, activate, current_profile, span
+
+
+def test_profile_header_adds_server_timing(client, admin_headers):
+    content = base64.b64encode(b"profiled").decode()
+
+    response = client.post(
+        "/files",
+        json={"name": "profiled.txt", "content": content},
+        headers={**admin_headers, "X-Profile": "1"},
+    )
+
+    assert response.status_code == 201
+    timing = response.headers["server-timing"]
+    assert "auth.jwt_decode;dur=" in timing
+    assert "auth.user_lookup;dur=" in timing
+    assert "files.base64_decode;dur=" in timing
+    assert "sql.1;dur=" in timing
+    # No statement text leaves the server.
+    assert "desc=" not in timing
+    assert "total;dur=" in timing
+
+
+def test_profile_header_is_for_admins_only(client, auth_headers):
+    response = client.get("/folders/root", headers={**auth_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+    response = client.get("/health", headers={"X-Profile": "1"})
+    assert "server-timing" not in response.headers
+
+
+def test_unprofiled_requests_have_no_server_timing(client, auth_headers):
+    response = client.get("/folders/root", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+
+def test_queries_record_rows(client, auth_headers):
+    client.post("/folders", json={"name": "ProfiledFolder"}, headers=auth_headers)
+
+    profile = Profile()
+    with activate(profile):
+        with get_db() as conn:
+            conn.execute("SELECT id FROM folders").fetchall()
+
+    assert profile.spans[0].sql == "SELECT id FROM folders"
+    assert profile.spans[0].rows >= 1
+
+
+def test_span_is_noop_without_profile():
+    assert current_profile() is None
+    with span("anything"):
+        pass
+    assert current_profile() is None
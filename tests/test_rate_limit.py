@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.jwt import create_access_token
+from app.middleware.rate_limit import FAIL_OPEN, Limit, MemoryBackend, RateLimitMiddleware, SQLiteBackend
+
+
+def make_client(backend):
+    app = FastAPI()
+
+    @app.get("/items")
+    def items():
+        return {"ok": True}
+
+    @app.post("/files")
+    def upload():
+        return {"ok": True}
+
+    @app.put("/files/{file_id}/content")
+    def replace(file_id: int):
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=backend,
+        default_limit="3/minute",
+        rules=[
+            ("POST", "/files", "upload", "1/minute"),
+            ("PUT", "/files/{file_id}/content", "upload", "1/minute"),
+        ],
+    )
+    return TestClient(app)
+
+
+def test_limit_parsing():
+    limit = Limit("120/minute")
+
+    assert limit.capacity == 120
+    assert limit.rate == 2
+
+
+def test_default_limit_returns_429_with_retry_after():
+    client = make_client(MemoryBackend())
+
+    statuses = [client.get("/items").status_code for _ in range(4)]
+
+    assert statuses == [200, 200, 200, 429]
+    response = client.get("/items")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert "Rate limit exceeded" in response.json()["detail"]
+
+
+def test_authenticated_users_get_their_own_bucket():
+    client = make_client(MemoryBackend())
+    first = {"Authorization": f"Bearer {create_access_token(1)}"}
+    second = {"Authorization": f"Bearer {create_access_token(2)}"}
+
+    for _ in range(3):
+        assert client.get("/items", headers=first).status_code == 200
+
+    assert client.get("/items", headers=first).status_code == 429
+    assert client.get("/items", headers=second).status_code == 200
+    assert client.get("/items").status_code == 200
+
+
+def test_expensive_routes_use_separate_limit():
+    client = make_client(MemoryBackend())
+
+    assert client.post("/files").status_code == 200
+    assert client.post("/files").status_code == 429
+    assert client.get("/items").status_code == 200
+
+
+def test_templated_routes_share_the_rule_bucket():
+    client = make_client(MemoryBackend())
+
+    assert client.put("/files/1/content").status_code == 200
+    assert client.put("/files/2/content").status_code == 429
+    assert client.post("/files").status_code == 429
+    assert client.get("/items").status_code == 200
+
+
+def test_sqlite_backend_is_shared_and_refills(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    limit = Limit("2/second")
+    worker_a = SQLiteBackend(path)
+    worker_b = SQLiteBackend(path)
+
+    assert worker_a.take("k", limit, 100.0)[0]
+    assert worker_b.take("k", limit, 100.0)[0]
+    assert not worker_a.take("k", limit, 100.0)[0]
+    assert worker_b.take("k", limit, 100.5)[0]
+    assert not worker_a.take("k", limit, 100.5)[0]
+
+
+def test_sqlite_backend_is_atomic_across_threads(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "ratelimit.db"), busy_timeout_ms=5000)
+    limit = Limit("50/day")
+    results = []
+
+    def hammer():
+        for _ in range(20):
+            results.append(backend.take("shared", limit, 1000.0)[0])
+
+    threads = [threading.Thread(target=hammer) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 50
+
+
+def test_sqlite_backend_runs_off_the_event_loop_and_counts_failing_open(tmp_path):
+    threads = []
+
+    class LockedBackend(SQLiteBackend):
+        def _connection(self):
+            threads.append(threading.current_thread())
+            raise sqlite3.OperationalError("database is locked")
+
+    before = FAIL_OPEN._values.get((), 0)
+    client = make_client(LockedBackend(str(tmp_path / "ratelimit.db")))
+
+    assert all(client.get("/items").status_code == 200 for _ in range(5))
+    assert FAIL_OPEN._values.get((), 0) == before + 5
+    assert threading.main_thread() not in threads
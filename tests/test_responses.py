@@ -0,0 +1,103 @@
+import asyncio
+import base64
+
+import pytest
+
+from app.responses import BlobResponse, RangeNotSatisfiable, parse_range
+
+CONTENT = bytes(range(256)) * 1200
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 10)
+    assert parse_range("bytes=90-", 100) == (90, 100)
+    assert parse_range("bytes=95-200", 100) == (95, 100)
+    assert parse_range("bytes=-10", 100) == (90, 100)
+    assert parse_range("bytes=-500", 100) == (0, 100)
+    # Several ranges or other units: the whole file.
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+
+    for header in ("bytes=100-", "bytes=5-2", "bytes=-0"):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 100)
+
+
+@pytest.fixture
+def blob_file(client, auth_headers):
+    response = client.post(
+        "/files",
+        json={"name": "large.bin", "content": base64.b64encode(CONTENT).decode()},
+        headers=auth_headers,
+    )
+    return response.json()["id"]
+
+
+def test_full_download_advertises_ranges(client, auth_headers, blob_file):
+    response = client.get(f"/files/{blob_file}/download", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["etag"]
+
+
+def test_range_download(client, auth_headers, blob_file):
+    response = client.get(
+        f"/files/{blob_file}/download",
+        headers={**auth_headers, "Range": "bytes=1000-299999"},
+    )
+    assert response.status_code == 206
+    assert response.content == CONTENT[1000:300000]
+    assert response.headers["content-range"] == f"bytes 1000-299999/{len(CONTENT)}"
+
+    response = client.get(f"/files/{blob_file}/download", headers={**auth_headers, "Range": "bytes=-16"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-16:]
+
+    response = client.get(
+        f"/files/{blob_file}/download",
+        headers={**auth_headers, "Range": f"bytes={len(CONTENT)}-"},
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_mismatch_sends_whole_file(client, auth_headers, blob_file):
+    etag = client.get(f"/files/{blob_file}/download", headers=auth_headers).headers["etag"]
+
+    response = client.get(
+        f"/files/{blob_file}/download",
+        headers={**auth_headers, "Range": "bytes=0-9", "If-Range": etag},
+    )
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+    response = client.get(
+        f"/files/{blob_file}/download",
+        headers={**auth_headers, "Range": "bytes=0-9", "If-Range": '"stale"'},
+    )
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_zerocopysend_hands_file_to_server(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(CONTENT)
+    sent = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message["file"].seek(message["offset"])
+            message = {**message, "body": message["file"].read(message["count"])}
+        sent.append(message)
+
+    response = BlobResponse(str(path), range_header="bytes=10-19")
+    scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(response(scope, None, send))
+
+    assert sent[0]["status"] == 206
+    assert sent[1]["type"] == "http.response.zerocopysend"
+    assert sent[1]["body"] == CONTENT[10:20]
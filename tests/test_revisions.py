@@ -0,0 +1,175 @@
+import base64
+import os
+import random
+import sqlite3
+
+import pytest
+
+from app import jobs
+from app.chunks import collect, cut_points, split
+from app.database import DATABASE_PATH
+from app.revisions import prune
+from app.storage import blob_store
+
+ORIGINAL = random.Random(48).randbytes(600_000)
+# One edit in the middle: a few bytes inserted.
+EDITED = ORIGINAL[:300_000] + b"edited" + ORIGINAL[300_000:]
+
+
+def encode(data):
+    return base64.b64encode(data).decode()
+
+
+def stored_chunks():
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        return dict(conn.execute("SELECT hash, refcount FROM chunks").fetchall())
+    finally:
+        conn.close()
+
+
+def run_jobs():
+    while jobs.run_next():
+        pass
+
+
+@pytest.fixture
+def file_id(client, auth_headers):
+    response = client.post(
+        "/files",
+        json={"name": "data.bin", "content": encode(ORIGINAL)},
+        headers=auth_headers,
+    )
+    return response.json()["id"]
+
+
+def test_cut_points_follow_the_content():
+    cuts = cut_points(ORIGINAL, 1024, 4096, 16384)
+    sizes = [end - start for start, end in zip([0] + cuts, cuts)]
+    assert cuts[-1] == len(ORIGINAL)
+    assert all(1024 <= size <= 16384 for size in sizes[:-1])
+
+    shifted = cut_points(b"x" * 100 + ORIGINAL, 1024, 4096, 16384)
+    # After the first few cuts resynchronise, every cut moves by the insert.
+    assert set(cut + 100 for cut in cuts[5:]) <= set(shifted)
+
+
+def test_update_content_shares_unchanged_chunks(client, auth_headers, file_id):
+    before = [chunk["sha256"] for chunk in client.get(f"/files/{file_id}/chunks", headers=auth_headers).json()]
+    response = client.put(
+        f"/files/{file_id}/content",
+        json={"content": encode(EDITED)},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["size"] == len(EDITED)
+
+    chunks = stored_chunks()
+    revisions = client.get(f"/files/{file_id}/revisions", headers=auth_headers).json()
+    assert [revision["size"] for revision in revisions] == [len(EDITED), len(ORIGINAL)]
+    assert [revision["current"] for revision in revisions] == [True, False]
+    # Only the chunks around the edit are new; the rest are shared.
+    after = [chunk["sha256"] for chunk in client.get(f"/files/{file_id}/chunks", headers=auth_headers).json()]
+    assert len(set(after) - set(before)) <= 2
+    assert all(chunks[chunk_hash] >= 2 for chunk_hash in set(after) & set(before))
+
+    download = client.get(f"/files/{file_id}/download", headers=auth_headers)
+    assert download.content == EDITED
+
+    ranged = client.get(
+        f"/files/{file_id}/download",
+        headers={**auth_headers, "Range": "bytes=299990-300009"},
+    )
+    assert ranged.status_code == 206
+    assert ranged.content == EDITED[299990:300010]
+
+
+def test_update_content_checks_sha256(client, auth_headers, file_id):
+    response = client.put(
+        f"/files/{file_id}/content",
+        json={"content": encode(EDITED), "sha256": "0" * 64},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+    assert client.get(f"/files/{file_id}/download", headers=auth_headers).content == ORIGINAL
+
+
+def test_restore_revision(client, auth_headers, file_id):
+    client.put(f"/files/{file_id}/content", json={"content": encode(EDITED)}, headers=auth_headers)
+    original = client.get(f"/files/{file_id}/revisions", headers=auth_headers).json()[-1]
+
+    response = client.post(f"/files/{file_id}/revisions/{original['id']}/restore", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["size"] == len(ORIGINAL)
+    assert client.get(f"/files/{file_id}/download", headers=auth_headers).content == ORIGINAL
+    assert len(client.get(f"/files/{file_id}/revisions", headers=auth_headers).json()) == 3
+
+    response = client.post(f"/files/{file_id}/revisions/999999/restore", headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_prune_and_delete_release_chunks(client, auth_headers):
+    # Content no other test stores, so its chunks are this file's alone.
+    original = random.Random(49).randbytes(400_000)
+    edited = original[:200_000] + b"edited" + original[200_000:]
+    file_id = client.post(
+        "/files",
+        json={"name": "pruned.bin", "content": encode(original)},
+        headers=auth_headers,
+    ).json()["id"]
+    client.put(f"/files/{file_id}/content", json={"content": encode(edited)}, headers=auth_headers)
+    run_jobs()
+    hashes = [chunk.hash for chunk in split(original) + split(edited)]
+
+    assert prune(file_id, keep=1) == 1
+    collect()
+    chunks = stored_chunks()
+    assert {chunk.hash for chunk in split(edited)} <= set(chunks)
+    assert not set(hashes) - {chunk.hash for chunk in split(edited)} & set(chunks)
+    assert client.get(f"/files/{file_id}/download", headers=auth_headers).content == edited
+
+    client.delete(f"/files/{file_id}", headers=auth_headers)
+    client.delete("/trash", headers=auth_headers)
+    run_jobs()
+    assert not set(hashes) & set(stored_chunks())
+    assert not any(os.path.exists(blob_store.path(chunk_hash)) for chunk_hash in hashes)
+
+
+def test_delta_upload_sends_only_new_chunks(client, auth_headers, file_id):
+    stored = client.get(f"/files/{file_id}/chunks", headers=auth_headers).json()
+    # A copy with a new first chunk: everything else is sent by hash.
+    head = b"new beginning"
+    rest = ORIGINAL[stored[0]["size"]:]
+    manifest = [{"content": encode(head)}] + [{"sha256": chunk["sha256"]} for chunk in stored[1:]]
+
+    response = client.post(
+        "/files",
+        json={"name": "edited copy.bin", "chunks": manifest},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    assert response.json()["size"] == len(head) + len(rest)
+    download = client.get(f"/files/{response.json()['id']}/download", headers=auth_headers)
+    assert download.content == head + rest
+
+
+def test_delta_upload_only_references_own_chunks(client, auth_headers, file_id):
+    stored = client.get(f"/files/{file_id}/chunks", headers=auth_headers).json()
+
+    other = {"email": "deltaother@example.com", "password": "DeltaPass123!"}
+    client.post("/auth/register", json=other)
+    token = client.post("/auth/login", json=other).json()["access_token"]
+
+    response = client.post(
+        "/files",
+        json={"name": "guess.bin", "chunks": [{"sha256": stored[0]["sha256"]}]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/files",
+        json={"name": "both.bin", "content": encode(b"x"), "chunks": []},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
@@ -0,0 +1,151 @@
+import base64
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.revisions import prune
+from app.thumbnails import DerivativeCache, thumbnails
+from app.trash import purge_trash
+
+
+@pytest.fixture
+def preview_headers(client):
+    user_data = {
+        "email": "previewuser@example.com",
+        "password": "PreviewPass123!"
+    }
+
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+
+    return {"Authorization": f"Bearer {token}"}
+
+
+def upload(client, headers, name, data):
+    response = client.post(
+        "/files",
+        json={"name": name, "content": base64.b64encode(data).decode()},
+        headers=headers,
+    )
+    return response.json()["id"]
+
+
+def test_text_preview_is_svg_with_caching_headers(client, preview_headers):
+    file_id = upload(client, preview_headers, "notes.txt", b"first line\n<second> & third\n")
+
+    response = client.get(f"/files/{file_id}/thumbnail?size=128", headers=preview_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert "first line" in response.text
+    assert "&lt;second&gt; &amp; third" in response.text
+    assert response.headers["cache-control"] == "private, max-age=86400"
+
+    etag = response.headers["etag"]
+    cached = client.get(
+        f"/files/{file_id}/thumbnail?size=128",
+        headers={**preview_headers, "If-None-Match": etag},
+    )
+    assert cached.status_code == 304
+
+
+def test_unsupported_size_and_type(client, preview_headers):
+    file_id = upload(client, preview_headers, "data.bin", b"\x00\x01\x02")
+
+    assert client.get(f"/files/{file_id}/thumbnail?size=99", headers=preview_headers).status_code == 400
+    assert client.get(f"/files/{file_id}/thumbnail", headers=preview_headers).status_code == 404
+    assert client.get("/files/999999/thumbnail", headers=preview_headers).status_code == 404
+
+
+def test_image_thumbnail_is_scaled(client, preview_headers):
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 400), "red").save(buffer, "JPEG")
+    file_id = upload(client, preview_headers, "photo.jpg", buffer.getvalue())
+
+    response = client.get(f"/files/{file_id}/thumbnail?size=64", headers=preview_headers)
+
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.content)).size == (64, 32)
+
+
+def test_delete_removes_derivatives(client, preview_headers):
+    file_id = upload(client, preview_headers, "gone.txt", b"soon deleted")
+    etag = client.get(f"/files/{file_id}/thumbnail?size=64", headers=preview_headers).headers["etag"]
+    path = thumbnails.cache.get(etag.strip('"')).path
+
+    client.delete(f"/files/{file_id}", headers=preview_headers)
+    client.delete("/trash", headers=preview_headers)
+    purge_trash({})
+
+    assert not os.path.exists(path)
+
+
+def test_replaced_and_pruned_revisions_lose_their_previews(client, preview_headers):
+    file_id = upload(client, preview_headers, "edited.txt", b"first draft")
+    etag = client.get(f"/files/{file_id}/thumbnail?size=64", headers=preview_headers).headers["etag"]
+    path = thumbnails.cache.get(etag.strip('"')).path
+
+    client.put(
+        f"/files/{file_id}/content",
+        json={"content": base64.b64encode(b"second draft").decode()},
+        headers=preview_headers,
+    )
+    assert not os.path.exists(path)
+
+    etag = client.get(f"/files/{file_id}/thumbnail?size=64", headers=preview_headers).headers["etag"]
+    stale = thumbnails.cache.put(etag.strip('"').replace("-64", "-128"), b"<svg/>", ".svg")
+    current = client.get(f"/files/{file_id}/revisions", headers=preview_headers).json()
+    restored = [revision["id"] for revision in current if not revision["current"]][0]
+    client.post(f"/files/{file_id}/revisions/{restored}/restore", headers=preview_headers)
+    assert not os.path.exists(stale.path)
+
+    # A preview rendered for a revision that is pruned later goes with it.
+    orphan = thumbnails.cache.put(f"rev{restored}-64", b"<svg/>", ".svg")
+    prune(file_id, keep=1)
+    assert not os.path.exists(orphan.path)
+
+
+def test_derivatives_are_sharded_by_source(tmp_path):
+    cache = DerivativeCache(str(tmp_path))
+    paths = [cache.put(f"rev{i}-64", b"x", ".svg").path for i in range(20)]
+
+    assert len({os.path.dirname(path) for path in paths}) > 1
+    assert os.path.dirname(cache.put("rev0-128", b"x", ".svg").path) == os.path.dirname(paths[0])
+
+
+def test_derivative_cache_evicts_least_recently_used(tmp_path):
+    cache = DerivativeCache(str(tmp_path), max_bytes=250)
+    cache.put("aa-1", b"x" * 100, ".svg")
+    cache.put("bb-1", b"x" * 100, ".svg")
+    assert cache.get("aa-1") is not None
+
+    cache.put("cc-1", b"x" * 100, ".svg")
+
+    assert cache.get("bb-1") is None
+    assert cache.get("aa-1") is not None
+    assert cache.total == 200
+
+    reloaded = DerivativeCache(str(tmp_path), max_bytes=250)
+    assert reloaded.get("cc-1").media_type == "image/svg+xml"
+    assert reloaded.total == 200
+
+
+def test_workers_share_discards_and_budget(tmp_path):
+    first = DerivativeCache(str(tmp_path), max_bytes=250)
+    second = DerivativeCache(str(tmp_path), max_bytes=250)
+    kept = first.put("aa-1", b"x" * 100, ".svg")
+    discarded = second.put("bb-1", b"x" * 100, ".svg")
+
+    first.discard("bb-")
+    assert not os.path.exists(discarded.path)
+
+    second.put("cc-1", b"x" * 100, ".svg")
+    second.put("dd-1", b"x" * 100, ".svg")
+
+    # The second worker counted the first one's file and evicted it.
+    assert not os.path.exists(kept.path)
+    assert second.total == 200
+    assert first.get("aa-1") is None
@@ -0,0 +1,176 @@
+import base64
+import sqlite3
+import time
+
+import pytest
+
+from app import queries
+from app.config import TRASH_RETENTION_DAYS
+from app.database import DATABASE_PATH
+from app.trash import purge_batch, purge_trash
+
+
+@pytest.fixture
+def trash_headers(client):
+    user_data = {
+        "email": "trashuser@example.com",
+        "password": "TrashPass123!"
+    }
+
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+
+    return {"Authorization": f"Bearer {token}"}
+
+
+def upload(client, headers, name, folder_id=None):
+    response = client.post(
+        "/files",
+        json={"name": name, "content": base64.b64encode(name.encode()).decode(), "parent_folder_id": folder_id},
+        headers=headers,
+    )
+    return response.json()["id"]
+
+
+def folder(client, headers, name, parent_id=None):
+    response = client.post("/folders", json={"name": name, "parent_folder_id": parent_id}, headers=headers)
+    return response.json()["id"]
+
+
+def test_delete_and_restore_file(client, trash_headers):
+    file_id = upload(client, trash_headers, "undo.txt")
+
+    assert client.delete(f"/files/{file_id}", headers=trash_headers).status_code == 204
+    assert client.get(f"/files/{file_id}", headers=trash_headers).status_code == 404
+    trash = client.get("/trash", headers=trash_headers).json()
+    assert [file["id"] for file in trash["files"]] == [file_id]
+    assert trash["files"][0]["deleted_at"]
+
+    response = client.post(f"/trash/files/{file_id}/restore", headers=trash_headers)
+    assert response.status_code == 200
+    assert client.get(f"/files/{file_id}/download", headers=trash_headers).content == b"undo.txt"
+    assert client.get("/trash", headers=trash_headers).json()["files"] == []
+
+    response = client.post(f"/trash/files/{file_id}/restore", headers=trash_headers)
+    assert response.status_code == 404
+
+
+def test_trashed_folder_hides_its_subtree(client, trash_headers):
+    top = folder(client, trash_headers, "Top")
+    middle = folder(client, trash_headers, "Middle", top)
+    file_id = upload(client, trash_headers, "deep.txt", middle)
+
+    client.delete(f"/folders/{top}", headers=trash_headers)
+
+    assert client.get(f"/folders/{middle}", headers=trash_headers).status_code == 404
+    assert client.get(f"/files/{file_id}", headers=trash_headers).status_code == 404
+    assert client.get(f"/files/{file_id}/download", headers=trash_headers).status_code == 404
+    response = client.post("/folders", json={"name": "New", "parent_folder_id": middle}, headers=trash_headers)
+    assert response.status_code == 404
+    # Only the deleted folder itself is in the trash.
+    assert [item["id"] for item in client.get("/trash", headers=trash_headers).json()["folders"]] == [top]
+
+    client.post(f"/trash/folders/{top}/restore", headers=trash_headers)
+    assert client.get(f"/files/{file_id}/download", headers=trash_headers).content == b"deep.txt"
+
+
+def test_restore_into_trashed_folder_goes_to_root(client, trash_headers):
+    parent = folder(client, trash_headers, "Parent")
+    file_id = upload(client, trash_headers, "orphan.txt", parent)
+    client.delete(f"/files/{file_id}", headers=trash_headers)
+    client.delete(f"/folders/{parent}", headers=trash_headers)
+
+    response = client.post(f"/trash/files/{file_id}/restore", headers=trash_headers)
+
+    assert response.status_code == 200
+    assert response.json()["parent_folder_id"] is None
+
+
+def test_purge_runs_in_bounded_batches(client, trash_headers):
+    used = client.get("/users/me/usage", headers=trash_headers).json()["used"]
+    top = folder(client, trash_headers, "Big")
+    file_ids = []
+    for i in range(3):
+        sub = folder(client, trash_headers, f"Sub{i}", top)
+        file_ids += [upload(client, trash_headers, f"file{i}-{j}.txt", sub) for j in range(3)]
+
+    client.delete(f"/folders/{top}", headers=trash_headers)
+    client.delete("/trash", headers=trash_headers)
+
+    batches = 0
+    while purge_batch(limit=2):
+        batches += 1
+    assert batches > 3
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM files WHERE id IN (SELECT value FROM json_each(?))", (str(file_ids),)
+        ).fetchone()[0]
+        folders = conn.execute("SELECT COUNT(*) FROM folders WHERE id = ?", (top,)).fetchone()[0]
+    finally:
+        conn.close()
+    assert remaining == 0
+    assert folders == 0
+    assert client.get("/users/me/usage", headers=trash_headers).json()["used"] == used
+
+
+def test_purge_in_the_same_second_as_the_delete(client, trash_headers):
+    used = client.get("/users/me/usage", headers=trash_headers).json()["used"]
+    file_id = upload(client, trash_headers, "quick.txt")
+    client.delete(f"/files/{file_id}", headers=trash_headers)
+
+    # With no retention the file expires the second it is deleted.
+    while purge_batch(days=0):
+        pass
+
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM files WHERE id = ?", (file_id,)).fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert client.get("/users/me/usage", headers=trash_headers).json()["used"] == used
+
+
+def queued_purges():
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        return [
+            row[0] for row in conn.execute("SELECT run_at FROM jobs WHERE kind = 'trash.purge' AND status = 'queued'")
+        ]
+    finally:
+        conn.close()
+
+
+def test_purge_requeues_itself_while_trash_remains(client, trash_headers):
+    file_id = upload(client, trash_headers, "later.txt")
+    client.delete(f"/files/{file_id}", headers=trash_headers)
+    # As if the purge queued by the delete had run too early and finished.
+    conn = sqlite3.connect(DATABASE_PATH)
+    conn.execute("DELETE FROM jobs WHERE kind = 'trash.purge'")
+    conn.commit()
+    conn.close()
+
+    purge_trash({})
+    purge_trash({})
+
+    run_at = queued_purges()
+    assert len(run_at) == 1
+    # Due when the oldest item left in the trash expires.
+    retention = TRASH_RETENTION_DAYS * 86400
+    assert time.time() < run_at[0] <= time.time() + retention + 2
+
+
+def test_listings_use_live_indexes():
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        for query, params, index in (
+            (queries.ROOT_FILES, (1,), "idx_files_live"),
+            (queries.SUBFOLDERS, (1, 1), "idx_folders_live"),
+            (queries.NEXT_TRASH_EXPIRY, ("-30 days",), "idx_files_deleted_at"),
+        ):
+            plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+            assert index in plan
+    finally:
+        conn.close()
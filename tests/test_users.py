@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import sqlite3
+import pytest
+
+import app.quotas
+import app.routes.files
+from app.database import DATABASE_PATH
+from app.trash import purge_trash
+
+
+@pytest.fixture
+def quota_user_headers(client):
+    user_data = {
+        "email": "quotauser@example.com",
+        "password": "QuotaPass123!"
+    }
+
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+
+    return {"Authorization": f"Bearer {token}"}
+
+
+def set_quota(email, quota):
+    conn = sqlite3.connect(DATABASE_PATH)
+    conn.execute("UPDATE users SET storage_quota = ? WHERE email = ?", (quota, email))
+    conn.commit()
+    conn.close()
+
+
+def test_usage_tracks_uploads_and_deletes(client, quota_user_headers):
+    before = client.get("/users/me/usage", headers=quota_user_headers).json()
+
+    content = base64.b64encode(b"x" * 100).decode()
+    create_response = client.post(
+        "/files",
+        json={"name": "counted.bin", "content": content},
+        headers=quota_user_headers
+    )
+    file_id = create_response.json()["id"]
+
+    after_upload = client.get("/users/me/usage", headers=quota_user_headers).json()
+    assert after_upload["used"] == before["used"] + 100
+    assert after_upload["available"] == after_upload["quota"] - after_upload["used"]
+
+    client.delete(f"/files/{file_id}", headers=quota_user_headers)
+
+    # Trashed files count until they are purged.
+    after_delete = client.get("/users/me/usage", headers=quota_user_headers).json()
+    assert after_delete["used"] == before["used"] + 100
+
+    client.delete("/trash", headers=quota_user_headers)
+    purge_trash({})
+    after_purge = client.get("/users/me/usage", headers=quota_user_headers).json()
+    assert after_purge["used"] == before["used"]
+
+
+def test_upload_over_quota_is_rejected(client, quota_user_headers):
+    used = client.get("/users/me/usage", headers=quota_user_headers).json()["used"]
+    set_quota("quotauser@example.com", used + 10)
+
+    try:
+        content = base64.b64encode(b"y" * 11).decode()
+        response = client.post(
+            "/files",
+            json={"name": "toolarge.bin", "content": content},
+            headers=quota_user_headers
+        )
+
+        assert response.status_code == 413
+        assert "quota" in response.json()["detail"]
+
+        content = base64.b64encode(b"y" * 10).decode()
+        response = client.post(
+            "/files",
+            json={"name": "fits.bin", "content": content},
+            headers=quota_user_headers
+        )
+
+        assert response.status_code == 201
+        usage = client.get("/users/me/usage", headers=quota_user_headers).json()
+        assert usage["available"] == 0
+    finally:
+        set_quota("quotauser@example.com", None)
+
+
+def test_growth_over_quota_is_rejected_before_writing(client, quota_user_headers, monkeypatch):
+    file_id = client.post(
+        "/files",
+        json={"name": "growing.txt", "content": base64.b64encode(b"small").decode()},
+        headers=quota_user_headers
+    ).json()["id"]
+    used = client.get("/users/me/usage", headers=quota_user_headers).json()["used"]
+    set_quota("quotauser@example.com", used + 10)
+
+    def store(chunks):
+        raise AssertionError("content stored before the quota check")
+
+    monkeypatch.setattr(app.routes.files, "store_chunks", store)
+    content = base64.b64encode(b"grown well past the quota").decode()
+    try:
+        for method, url, body in (
+            ("PUT", f"/files/{file_id}/content", {"content": content}),
+            ("PUT", f"/files/{file_id}/content", {"chunks": [{"content": content}]}),
+            ("POST", "/files", {"name": "delta.txt", "chunks": [{"content": content}]}),
+        ):
+            response = client.request(method, url, json=body, headers=quota_user_headers)
+            assert response.status_code == 413
+    finally:
+        set_quota("quotauser@example.com", None)
+
+
+def test_delta_upload_is_sized_before_chunks_are_read(client, quota_user_headers, monkeypatch):
+    content = b"a chunk referenced many times"
+    client.post(
+        "/files",
+        json={"name": "stored.txt", "content": base64.b64encode(content).decode()},
+        headers=quota_user_headers
+    )
+
+    def read(key):
+        raise AssertionError("chunk read before the size check")
+
+    monkeypatch.setattr(app.routes.files.blob_store, "read", read)
+    chunks = [{"sha256": hashlib.sha256(content).hexdigest()}] * 1000
+
+    set_quota("quotauser@example.com", 1000)
+    try:
+        response = client.post("/files", json={"name": "big.txt", "chunks": chunks}, headers=quota_user_headers)
+        assert response.status_code == 413
+        assert response.json()["detail"] == "Storage quota exceeded"
+    finally:
+        set_quota("quotauser@example.com", None)
+
+    monkeypatch.setattr(app.quotas, "MAX_UPLOAD_BYTES", 1000)
+    response = client.post("/files", json={"name": "big.txt", "chunks": chunks}, headers=quota_user_headers)
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Upload larger than 1000 bytes"
+
+
+def test_usage_unauthorized(client):
+    response = client.get("/users/me/usage")
+
+    assert response.status_code == 403
@@ -0,0 +1,79 @@
+"""
+Storage Maintenance
+
+Reports how much of the database file is free space and releases it.
+
+- ``status`` prints page counts, the freelist and fragmentation.
+- ``reclaim`` releases free pages now, in the same budgeted steps the
+  in-process scheduler uses (see app.maintenance), so it is safe to run
+  while the API is serving.
+- ``enable-incremental`` switches an existing database to
+  ``auto_vacuum = INCREMENTAL``. This needs a full ``VACUUM``, which
+  rewrites the file and blocks writers until it finishes, so run it in a
+  maintenance window. Databases created by migrate.py already use it.
+"""
+
+import argparse
+import sqlite3
+import time
+
+from app.config import DATABASE_PATH, MAINTENANCE_STEP_BUDGET_MS
+from app.maintenance import VacuumScheduler, fragmentation, storage_stats
+
+
+def connect():
+    return sqlite3.connect(DATABASE_PATH, isolation_level=None)
+
+
+def status(conn):
+    stats = storage_stats(conn).to_dict()
+    stats["fragmentation"] = fragmentation(conn)
+    for key, value in stats.items():
+        print(f"{key:<16}{value}")
+    return stats
+
+
+def reclaim(conn, step_budget=MAINTENANCE_STEP_BUDGET_MS / 1000):
+    """Release every free page in budgeted steps; returns pages freed."""
+    if storage_stats(conn).auto_vacuum != "incremental":
+        print(
+            "auto_vacuum is not INCREMENTAL; freed pages stay in the file and are reused. "
+            "Run 'python vacuum.py enable-incremental' in a maintenance window to enable it."
+        )
+        return 0
+    start = time.perf_counter()
+    freed = VacuumScheduler(step_budget=step_budget).reclaim(conn)
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    print(f"Released {freed} free pages in {time.perf_counter() - start:.1f} s")
+    return freed
+
+
+def enable_incremental(conn):
+    start = time.perf_counter()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    print(f"auto_vacuum is now {storage_stats(conn).auto_vacuum} ({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database storage maintenance")
+    parser.add_argument("action", choices=["status", "reclaim", "enable-incremental"])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=MAINTENANCE_STEP_BUDGET_MS,
+        help="Write lock budget per reclaim step",
+    )
+
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.action == "status":
+            status(conn)
+        elif args.action == "reclaim":
+            reclaim(conn, args.budget_ms / 1000)
+        else:
+            enable_incremental(conn)
+    finally:
+        conn.close()